@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+from functools import partial
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+# .env загружается до импорта сервисов: их настройки читаются из окружения при импорте
+load_dotenv()
+
+from backend.app.services import llm_client
+from backend.app.services.batch import (
+    BATCH_CONCURRENCY,
+    SUPPORTED_SUFFIXES,
+    BatchItem,
+    expand_zip,
+    run_batch,
+)
+from backend.app.services.parser import create_parse_pool, parse_document_detailed
+from backend.app.services.profiles import registry as profiles
+from backend.app.services.uploads import MAX_UPLOAD_BYTES
+
+DEFAULT_CONTRACT_TYPE = profiles.default.name
+
+
+def _collect(paths: list[Path], workdir: Path) -> list[BatchItem]:
+    items: list[BatchItem] = []
+    for path in paths:
+        if path.is_dir():
+            items.extend(_collect(sorted(p for p in path.iterdir() if p.is_file()), workdir))
+            continue
+        suffix = path.suffix.lower()
+        if suffix == ".zip":
+            items.extend(expand_zip(path, workdir, MAX_UPLOAD_BYTES))
+        elif suffix in SUPPORTED_SUFFIXES:
+            items.append(BatchItem(name=str(path), path=path))
+    return items
+
+
+async def _run(args: argparse.Namespace) -> int:
+    workdir = Path(tempfile.mkdtemp(prefix="risq-batch-"))
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    # Один пул процессов на весь пакет: разбор DOCX и диапазоны страниц PDF
+    pool = create_parse_pool()
+    try:
+        items = _collect([Path(p) for p in args.paths], workdir)
+        if not items:
+            print("Нет файлов PDF/DOCX для анализа", file=sys.stderr)
+            return 2
+
+        failed = 0
+        async for record in run_batch(
+            items,
+            args.contract_type,
+            concurrency=args.concurrency,
+            parse=partial(parse_document_detailed, executor=pool),
+            mode=args.mode,
+        ):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            if "summary" in record:
+                continue
+            if record["status"] == "error":
+                failed += 1
+            print(
+                f"[{record['done']}/{record['total']}] {record['status']}: {record['file']}",
+                file=sys.stderr,
+            )
+        return 1 if failed else 0
+    finally:
+        pool.shutdown(cancel_futures=True)
+        if out is not sys.stdout:
+            out.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.app.cli",
+        description="Пакетный анализ договоров (PDF/DOCX/ZIP/каталоги), результат — NDJSON",
+    )
+    parser.add_argument("paths", nargs="+", help="файлы, ZIP-архивы или каталоги")
+    parser.add_argument(
+        "--type",
+        dest="contract_type",
+        default=DEFAULT_CONTRACT_TYPE,
+        choices=profiles.names(),
+        help="тип договора",
+    )
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--output", "-o", help="файл NDJSON (по умолчанию stdout)")
+    parser.add_argument(
+        "--fast",
+        action="store_const",
+        const="fast",
+        default="full",
+        dest="mode",
+        help="быстрый режим: только локальные правила, без LLM",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        return asyncio.run(_run(args))
+    finally:
+        llm_client.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,58 +1,365 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import os
+import shutil
 import tempfile
+import time
+import zipfile
+from contextlib import asynccontextmanager
+from datetime import date
 from pathlib import Path
+from typing import AsyncIterator, Iterator
 
 from dotenv import load_dotenv
-from fastapi import BackgroundTasks, FastAPI, File, Form, HTTPException, UploadFile
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    Response,
+    StreamingResponse,
+)
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from starlette.requests import Request
 
-from backend.app.schemas.report import Report
-from backend.app.services.analyzer_llm import analyze_contract
-from backend.app.services.parser import parse_document
-from backend.app.services.pdf_render import PdfRenderer
-from backend.app.services.storage import InMemoryStorage
-
+# .env загружается до импорта сервисов: их настройки читаются из окружения при импорте
 load_dotenv()
 
+from backend.app.schemas.report import Report
+from backend.app.services.analyzer_llm import (
+    ANALYSIS_MODES,
+    analyze_contract,
+    analyze_revision,
+    model_name,
+    prompt_version,
+)
+from backend.app.services import compression, llm_client, metrics, ocr, startup
+from backend.app.services.llm_client import TokenUsage
+from backend.app.services.batch import BATCH_MAX_FILES, BatchItem, expand_zip, run_batch
+from backend.app.services.cache import ReportCache, cache_key
+from backend.app.services.contract_diff import diff_clauses, diff_reports
+from backend.app.services.events import JobEvents
+from backend.app.services.json_repair import validation_stats
+from backend.app.services.metrics import (
+    REGISTRY,
+    Profiler,
+    ProfilerBusyError,
+    ProfilerUnavailableError,
+    StageTimings,
+    requested_profiler,
+)
+from backend.app.services.parser import (
+    PDF_WORKERS,
+    ParseResult,
+    mark_parse_worker,
+    parse_document_detailed,
+)
+from backend.app.services.pdf_render import PdfRenderPool, report_context
+from backend.app.services.profiles import registry as profiles
+from backend.app.services.report_codec import select_fields
+from backend.app.services.scheduler import JobScheduler, QueueFullError
+from backend.app.services.startup import WarmupStep, import_modules, wait_futures
+from backend.app.services.storage import Job, create_storage
+from backend.app.services.tokens import count_tokens
+from backend.app.services.uploads import (
+    MAX_BATCH_UPLOAD_BYTES,
+    MAX_UPLOAD_BYTES,
+    UploadError,
+    UploadLimitMiddleware,
+    save_upload,
+)
+
 BASE_DIR = Path(__file__).resolve().parent
 TEMPLATES_DIR = BASE_DIR / "templates"
 STATIC_DIR = BASE_DIR / "static"
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    # Задачи, брошенные упавшим или перезапущенным процессом, не должны висеть в processing
+    await asyncio.to_thread(storage.fail_stale)
+    scheduler.start()
+    # Тяжёлые зависимости и пулы процессов прогреваются в фоне: сервер сразу
+    # принимает /health, а /health/ready ждёт окончания прогрева
+    if startup.WARMUP_ENABLED:
+        warmup.start(_warmup_steps())
+    else:
+        warmup.mark_ready()
+    try:
+        yield
+    finally:
+        scheduler.shutdown(wait=False)
+        pdf_renderer.shutdown()
+        ocr.shutdown()
+        llm_client.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={
+        "/analyze": MAX_UPLOAD_BYTES,
+        "/analyze/revision": MAX_UPLOAD_BYTES,
+        "/api/batch": MAX_BATCH_UPLOAD_BYTES,
+    },
+)
 
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
-storage = InMemoryStorage()
-pdf_renderer = PdfRenderer(TEMPLATES_DIR, STATIC_DIR)
+storage = create_storage()
+job_events = JobEvents()
+storage.add_listener(job_events.publish)
+pdf_renderer = PdfRenderPool(
+    TEMPLATES_DIR,
+    STATIC_DIR,
+    workers=int(os.getenv("RISQ_PDF_RENDER_WORKERS", "2")),
+)
+# Рендерить PDF сразу после готовности отчёта, не дожидаясь скачивания
+PDF_PRERENDER = os.getenv("RISQ_PDF_PRERENDER", "1") == "1"
+scheduler = JobScheduler(
+    workers=int(os.getenv("RISQ_WORKERS", "16")),
+    max_queue=int(os.getenv("RISQ_QUEUE_SIZE", "32")),
+    # Единственный пул процессов парсинга: и документы целиком, и диапазоны страниц PDF
+    parse_workers=int(os.getenv("RISQ_PARSE_WORKERS") or PDF_WORKERS),
+    parse_initializer=mark_parse_worker,
+)
+report_cache = ReportCache(
+    Path(os.getenv("RISQ_CACHE_PATH", "data/report_cache.sqlite3")),
+    prompt_versions=profiles.versions,
+    ttl_seconds=int(os.getenv("RISQ_CACHE_TTL", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("RISQ_CACHE_MAX_ENTRIES", "1000")),
+    max_bytes=int(os.getenv("RISQ_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+)
+
+# Типы договоров — из профилей анализаторов (analyzer_profiles.json)
+CONTRACT_TYPES = profiles.names()
+
+# Интервал, через который SSE перечитывает задачу из storage. События об изменениях
+# приходят только из своего процесса: задачу другого воркера uvicorn опрашиваем часто,
+# свою — редко, на случай пропущенного события
+SSE_REFRESH_SECONDS = 15.0
+SSE_POLL_SECONDS = 1.5
+
+# Пауза перед повторной постановкой файла пакета, если очередь задач заполнена
+BATCH_QUEUE_RETRY_SECONDS = 1.0
+
+
+def _runtime_metrics() -> Iterator[metrics.Metric]:
+    """
+    Состояние очереди, LLM-лимитера и кэша на момент скрейпа /metrics
+    """
+    workers = scheduler.stats()
+    yield metrics.gauge("risq_queue_depth", "Задач в очереди", workers["queued"])
+    yield metrics.gauge("risq_workers_active", "Занятые воркеры", workers["active"])
+    yield metrics.gauge("risq_workers_alive", "Живые воркеры", workers["alive"])
+
+    limiter = llm_client.llm_client.limiter.stats()
+    yield metrics.gauge("risq_llm_in_flight", "Запросы к LLM в работе", limiter["in_flight"])
+    yield metrics.gauge("risq_llm_concurrency_limit", "Текущий лимит параллелизма LLM", limiter["limit"])
+    yield metrics.counter("risq_llm_throttled", "Ответы LLM с троттлингом", limiter["throttled"])
+
+    cache = report_cache.stats()
+    yield metrics.counter("risq_cache_hits", "Попадания в кэш отчётов", cache["hits"])
+    yield metrics.counter("risq_cache_misses", "Промахи кэша отчётов", cache["misses"])
+    yield metrics.gauge("risq_cache_entries", "Отчётов в кэше", cache["entries"])
+
+    yield metrics.labeled_counter(
+        "risq_report_validation",
+        "Как получен валидный отчёт",
+        "outcome",
+        validation_stats.snapshot(),
+    )
+    yield metrics.gauge("risq_sse_subscribers", "Открытые SSE-подписки", job_events.subscriber_count())
 
-CONTRACT_TYPES = ["Договор оказания услуг"]
 
+metrics.add_source(_runtime_metrics)
 
-def _render_report_context(report: Report) -> dict:
+warmup = startup.Warmup()
+metrics.add_source(warmup.collect)
+
+
+def _warm_imports() -> None:
+    seconds, errors = import_modules(startup.HEAVY_MODULES)
+    warmup.record_imports(seconds)
+    if errors:
+        raise ImportError("; ".join(f"{name}: {error}" for name, error in errors.items()))
+
+
+def _warmup_steps() -> list[WarmupStep]:
+    return [
+        WarmupStep("imports", _warm_imports, required=False),
+        WarmupStep("llm_client", llm_client.llm_client.warmup),
+        # Без сети словарь токенизатора не скачается — это не повод не принимать задачи
+        WarmupStep("tokenizer", lambda: count_tokens("прогрев", model_name()), required=False),
+        WarmupStep(
+            "parse_pool",
+            lambda: wait_futures(scheduler.warmup(import_modules, ("pdfplumber", "pypdfium2"))),
+        ),
+        WarmupStep(
+            "pdf_render",
+            lambda: wait_futures(pdf_renderer.warmup("report.html")) if PDF_PRERENDER else None,
+            required=False,
+        ),
+    ]
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
     """
-    Контекст для HTML / PDF отчёта
+    Профилирование запроса по заголовку X-RISQ-Profile (при RISQ_PROFILING=1)
     """
-    return {
-        "report": report,
-        "analysis_date": report.cover.analysis_date,
-        "text_chars": getattr(report.cover, "chars", None),
-        "text_words": getattr(report.cover, "words", None),
-    }
+    try:
+        kind = requested_profiler(request.headers)
+    except ProfilerUnavailableError as exc:
+        return JSONResponse({"detail": str(exc)}, status_code=400)
+    if kind is None:
+        return await call_next(request)
+
+    name = request.url.path.strip("/").replace("/", "-") or "index"
+    profiler = Profiler(kind, name, async_mode=True)
+    try:
+        profiler.start()
+    except ProfilerBusyError as exc:
+        return JSONResponse({"detail": str(exc)}, status_code=409)
+    try:
+        response = await call_next(request)
+    finally:
+        # Хук снимается в потоке event loop, где был поставлен; запись файла — в потоке
+        profiler.disable()
+    path = await asyncio.to_thread(profiler.save)
+    response.headers["X-RISQ-Profile-File"] = str(path)
+    return response
 
 
-def _run_analysis(job_id: str, contract_type: str, file_path: Path) -> None:
+def _report_etag(report: Report) -> str:
+    payload = report.model_dump_json(warnings=False).encode("utf-8")
+    return '"' + hashlib.sha256(payload).hexdigest()[:32] + '"'
+
+
+def _record_pdf_render(job_id: str, timings: StageTimings) -> None:
+    """
+    Дописывает время рендера PDF к таймингам задачи
+    """
+    job = storage.get_job(job_id)
+    if not job:
+        return
+    storage.set_timings(job_id, {**(job.timings or {}), **timings.as_dict()})
+
+
+def _prerender_pdf(job_id: str, report: Report) -> None:
+    """
+    Фоновый рендер PDF в пул процессов; результат кладётся в storage
+    """
+    if not PDF_PRERENDER:
+        return
+
+    started = time.perf_counter()
+
+    def _store(future) -> None:
+        try:
+            pdf_bytes = future.result()
+        except Exception:
+            metrics.STAGE_ERRORS.labels("pdf_render").inc()
+            return
+        timings = StageTimings()
+        timings.add("pdf_render", time.perf_counter() - started)
+        storage.set_pdf(job_id, pdf_bytes)
+        _record_pdf_render(job_id, timings)
+
+    pdf_renderer.submit("report.html", report_context(report)).add_done_callback(_store)
+
+
+def _report_key(file_hash: str, contract_type: str, mode: str) -> str:
+    return cache_key(
+        file_hash,
+        contract_type,
+        model_name(contract_type),
+        f"{prompt_version(contract_type)}:{mode}",
+    )
+
+
+def _store_cached_report(report_key: str, report: Report) -> str:
+    """
+    Новая задача с готовым отчётом из кэша; текст договора тоже берётся из кэша,
+    чтобы следующую редакцию можно было анализировать по изменённым пунктам
+    """
+    report.cover.analysis_date = date.today()
+    job = storage.create_job()
+    text = report_cache.get_text(report_key)
+    if text is not None:
+        storage.set_text(job.job_id, text)
+    storage.set_report(job.job_id, report)
+    _prerender_pdf(job.job_id, report)
+    return job.job_id
+
+
+def _parse_file(job_id: str, file_path: Path, timings: StageTimings) -> ParseResult:
+    """
+    Текст договора: парсинг в пуле процессов и OCR страниц-сканов
     """
-    Фоновая задача анализа договора
+    storage.set_status(job_id, "processing", "Извлечение текста…")
+    with timings.stage("parse"):
+        parsed = parse_document_detailed(file_path, scheduler.parse_pool)
+
+    # Страницы-сканы без текстового слоя — через OCR
+    if parsed.empty_pages:
+        storage.set_status(job_id, "processing", "Распознавание скана…")
+        with timings.stage("ocr"):
+            parsed = ocr.fill_scanned_pages(
+                file_path,
+                parsed,
+                lambda done, total: storage.set_status(
+                    job_id, "processing", f"Распознавание скана: {done}/{total} стр."
+                ),
+            )
+    storage.set_parse_info(job_id, parsed.info())
+    # Текст нужен для сравнения со следующей редакцией договора
+    storage.set_text(job_id, parsed.text)
+    return parsed
+
+
+def _start_job_profiler(profile: str | None, job_id: str) -> Profiler | None:
     """
+    Профиль задачи; если уже профилируется другой запрос или задача — задача идёт без него
+    """
+    if not profile:
+        return None
+    profiler = Profiler(profile, f"job-{job_id}")
     try:
-        storage.set_status(job_id, "processing", "Извлечение текста…")
+        profiler.start()
+    except ProfilerBusyError:
+        return None
+    return profiler
+
+
+def _run_analysis(
+    job_id: str,
+    contract_type: str,
+    file_path: Path,
+    report_key: str | None = None,
+    mode: str = "full",
+    timings: StageTimings | None = None,
+    submitted_at: float | None = None,
+    profile: str | None = None,
+) -> None:
+    """
+    Фоновая задача анализа договора (выполняется воркером планировщика)
+    """
+    timings = timings or StageTimings()
+    if submitted_at is not None:
+        timings.add("queue_wait", time.perf_counter() - submitted_at)
 
-        # 1. Парсим документ
-        text, pages = parse_document(file_path)
+    profiler = _start_job_profiler(profile, job_id)
+
+    try:
+        # 1. Парсим документ (в пуле процессов — CPU), сканы — через OCR
+        parsed = _parse_file(job_id, file_path, timings)
+        text, pages = parsed.text, parsed.pages
 
         # 2. Считаем объём текста
         text_chars = len(text)
@@ -60,7 +367,19 @@ def _run_analysis(job_id: str, contract_type: str, file_path: Path) -> None:
 
         # 3. Анализ
         storage.set_status(job_id, "processing", "Анализ структуры…")
-        report = analyze_contract(contract_type, text, pages)
+        usage = TokenUsage()
+        try:
+            report = analyze_contract(
+                contract_type,
+                text,
+                pages,
+                mode,
+                usage,
+                timings,
+                on_partial=lambda partial: storage.set_partial(job_id, partial),
+            )
+        finally:
+            storage.set_usage(job_id, usage.as_dict())
 
         # 4. Прокидываем объём текста в отчёт
         try:
@@ -71,12 +390,121 @@ def _run_analysis(job_id: str, contract_type: str, file_path: Path) -> None:
 
         # 5. Сохраняем результат
         storage.set_status(job_id, "processing", "Формирование отчёта…")
+        storage.set_timings(job_id, timings.as_dict())
+        storage.set_report(job_id, report)
+        _prerender_pdf(job_id, report)
+
+        # 6. Кэшируем отчёт (и текст — для анализа следующей редакции) для повторных загрузок
+        if report_key:
+            try:
+                report_cache.put(
+                    report_key,
+                    model_name(contract_type),
+                    prompt_version(contract_type),
+                    report,
+                    text,
+                )
+            except Exception:
+                pass
+
+    except Exception as exc:
+        storage.set_timings(job_id, timings.as_dict())
+        storage.set_status(job_id, "error", "Ошибка анализа", str(exc))
+
+    finally:
+        if profiler:
+            profiler.stop()
+        if file_path.exists():
+            file_path.unlink(missing_ok=True)
+
+
+def _run_revision(
+    job_id: str,
+    previous_job_id: str,
+    file_path: Path,
+    mode: str = "full",
+    timings: StageTimings | None = None,
+    submitted_at: float | None = None,
+    profile: str | None = None,
+) -> None:
+    """
+    Анализ новой редакции договора: повторно анализируются только изменённые пункты,
+    выводы по остальным берутся из отчёта предыдущей редакции
+    """
+    timings = timings or StageTimings()
+    if submitted_at is not None:
+        timings.add("queue_wait", time.perf_counter() - submitted_at)
+
+    profiler = _start_job_profiler(profile, job_id)
+
+    try:
+        previous = storage.get_job(previous_job_id)
+        if not previous or not previous.report:
+            raise ValueError("Предыдущая редакция не найдена (срок хранения истёк)")
+        contract_type = previous.report.cover.contract_type
+
+        parsed = _parse_file(job_id, file_path, timings)
+        text, pages = parsed.text, parsed.pages
+
+        storage.set_status(job_id, "processing", "Сравнение редакций…")
+        previous_text = storage.get_text(previous_job_id)
+        clause_diff = None
+        if previous_text is not None:
+            with timings.stage("diff"):
+                clause_diff = diff_clauses(previous_text, text)
+
+        storage.set_status(job_id, "processing", "Анализ изменённых пунктов…")
+        usage = TokenUsage()
+
+        def on_partial(partial: dict) -> None:
+            storage.set_partial(job_id, partial)
+
+        try:
+            if clause_diff is not None and mode == "full":
+                report = analyze_revision(
+                    contract_type,
+                    previous.report,
+                    clause_diff,
+                    text,
+                    pages,
+                    usage,
+                    timings,
+                    on_partial,
+                )
+            else:
+                # Нет текста прошлой редакции (старый кэш) или быстрый режим — полный анализ
+                report = analyze_contract(
+                    contract_type, text, pages, mode, usage, timings, on_partial
+                )
+        finally:
+            storage.set_usage(job_id, usage.as_dict())
+
+        try:
+            report.cover.chars = len(text)
+            report.cover.words = len(text.split())
+        except Exception:
+            pass
+
+        storage.set_diff(
+            job_id,
+            {
+                "previous_job_id": previous_job_id,
+                "clauses": clause_diff.summary() if clause_diff is not None else None,
+                "risks": diff_reports(previous.report, report),
+            },
+        )
+        storage.set_status(job_id, "processing", "Формирование отчёта…")
+        storage.set_timings(job_id, timings.as_dict())
         storage.set_report(job_id, report)
+        _prerender_pdf(job_id, report)
 
     except Exception as exc:
+        storage.set_timings(job_id, timings.as_dict())
         storage.set_status(job_id, "error", "Ошибка анализа", str(exc))
 
     finally:
+        if profiler:
+            profiler.stop()
         if file_path.exists():
             file_path.unlink(missing_ok=True)
 
@@ -99,32 +527,122 @@ async def upload(request: Request) -> Response:
 
 @app.post("/analyze")
 async def analyze(
-    background_tasks: BackgroundTasks,
+    request: Request,
     contract_type: str = Form(...),
     file: UploadFile = File(...),
+    mode: str = Form("full"),
 ) -> Response:
     if contract_type not in CONTRACT_TYPES:
         raise HTTPException(status_code=400, detail="Неизвестный тип договора")
 
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail="Неизвестный режим анализа")
+
     if not file.filename:
         raise HTTPException(status_code=400, detail="Файл не выбран")
 
     suffix = Path(file.filename).suffix.lower()
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        content = await file.read()
-        tmp.write(content)
-        temp_path = Path(tmp.name)
+    # Пишем на диск кусками, сразу считаем хэш и проверяем сигнатуру/размер
+    timings = StageTimings()
+    try:
+        with timings.stage("upload_write"):
+            temp_path, file_hash = await save_upload(file, suffix)
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
 
-    job = storage.create_job()
-    background_tasks.add_task(_run_analysis, job.job_id, contract_type, temp_path)
+    report_key = _report_key(file_hash, contract_type, mode)
+
+    # Тот же файл уже анализировался -> отдаём готовый отчёт без вызова LLM
+    cached = await asyncio.to_thread(report_cache.get, report_key)
+    if cached is not None:
+        temp_path.unlink(missing_ok=True)
+        job_id = await asyncio.to_thread(_store_cached_report, report_key, cached)
+        return RedirectResponse(url=f"/report/{job_id}", status_code=303)
+
+    job = await asyncio.to_thread(storage.create_job)
+    try:
+        scheduler.submit(
+            job.job_id,
+            _run_analysis,
+            contract_type,
+            temp_path,
+            report_key,
+            mode,
+            timings=timings,
+            submitted_at=time.perf_counter(),
+            profile=requested_profiler(request.headers),
+        )
+    except QueueFullError as exc:
+        temp_path.unlink(missing_ok=True)
+        await asyncio.to_thread(
+            storage.set_status, job.job_id, "error", "Очередь переполнена", str(exc)
+        )
+        raise HTTPException(
+            status_code=429,
+            detail="Сервис перегружен, попробуйте позже",
+            headers={"Retry-After": "30"},
+        )
+
+    return RedirectResponse(url=f"/analyzing/{job.job_id}", status_code=303)
+
+
+@app.post("/analyze/revision")
+async def analyze_revision_endpoint(
+    request: Request,
+    previous_job_id: str = Form(...),
+    file: UploadFile = File(...),
+    mode: str = Form("full"),
+) -> Response:
+    """
+    Новая редакция уже проанализированного договора (previous_job_id — задача прошлой редакции)
+    """
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail="Неизвестный режим анализа")
+
+    previous = await asyncio.to_thread(storage.get_job, previous_job_id)
+    if not previous or previous.status != "done" or not previous.report:
+        raise HTTPException(status_code=404, detail="Отчёт по предыдущей редакции не найден")
+
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Файл не выбран")
+
+    timings = StageTimings()
+    try:
+        with timings.stage("upload_write"):
+            temp_path, _ = await save_upload(file, Path(file.filename).suffix.lower())
+    except UploadError as exc:
+        raise HTTPException(status_code=exc.status_code, detail=str(exc))
+
+    job = await asyncio.to_thread(storage.create_job)
+    try:
+        scheduler.submit(
+            job.job_id,
+            _run_revision,
+            previous_job_id,
+            temp_path,
+            mode,
+            timings=timings,
+            submitted_at=time.perf_counter(),
+            profile=requested_profiler(request.headers),
+        )
+    except QueueFullError as exc:
+        temp_path.unlink(missing_ok=True)
+        await asyncio.to_thread(
+            storage.set_status, job.job_id, "error", "Очередь переполнена", str(exc)
+        )
+        raise HTTPException(
+            status_code=429,
+            detail="Сервис перегружен, попробуйте позже",
+            headers={"Retry-After": "30"},
+        )
 
     return RedirectResponse(url=f"/analyzing/{job.job_id}", status_code=303)
 
 
 @app.get("/analyzing/{job_id}", response_class=HTMLResponse)
 async def analyzing(request: Request, job_id: str) -> Response:
-    job = storage.get_job(job_id)
+    job = await asyncio.to_thread(storage.get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
@@ -136,31 +654,46 @@ async def analyzing(request: Request, job_id: str) -> Response:
 
 @app.get("/report/{job_id}", response_class=HTMLResponse)
 async def report(request: Request, job_id: str) -> Response:
-    job = storage.get_job(job_id)
+    job = await asyncio.to_thread(storage.get_job, job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Задача не найдена")
 
     if job.status != "done" or not job.report:
         raise HTTPException(status_code=409, detail="Отчёт ещё не готов")
 
-    context = _render_report_context(job.report)
-    context.update({"request": request, "job_id": job_id})
+    context = report_context(job.report)
+    context.update({"request": request, "job_id": job_id, "diff": job.diff})
 
     return templates.TemplateResponse("report.html", context)
 
 
 @app.get("/report/{job_id}/pdf")
-async def report_pdf(job_id: str) -> Response:
-    job = storage.get_job(job_id)
+async def report_pdf(request: Request, job_id: str) -> Response:
+    job = await asyncio.to_thread(storage.get_job, job_id)
     if not job or job.status != "done" or not job.report:
         raise HTTPException(status_code=404, detail="Отчёт не найден")
 
-    context = _render_report_context(job.report)
-    pdf_bytes = pdf_renderer.render("report.html", context)
-
+    etag = _report_etag(job.report)
     headers = {
-        "Content-Disposition": f"attachment; filename=risq-report-{job_id}.pdf"
+        "Content-Disposition": f"attachment; filename=risq-report-{job_id}.pdf",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600",
     }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+
+    pdf_bytes = await asyncio.to_thread(storage.get_pdf, job_id)
+    if pdf_bytes is None:
+        context = report_context(job.report)
+        timings = StageTimings()
+        with timings.stage("pdf_render"):
+            pdf_bytes = await pdf_renderer.render("report.html", context)
+        await asyncio.to_thread(storage.set_pdf, job_id, pdf_bytes)
+        await asyncio.to_thread(_record_pdf_render, job_id, timings)
+
     return Response(
         content=pdf_bytes,
         media_type="application/pdf",
@@ -168,12 +701,120 @@ async def report_pdf(job_id: str) -> Response:
     )
 
 
-@app.get("/api/job/{job_id}")
-async def api_job(job_id: str) -> JSONResponse:
-    job = storage.get_job(job_id)
-    if not job:
-        raise HTTPException(status_code=404, detail="Задача не найдена")
+async def _wait_job(job_id: str) -> Job:
+    """
+    Ждёт завершения задачи этого процесса (по событиям storage, со страховочным опросом)
+    """
+    queue = job_events.subscribe(job_id)
+    try:
+        while True:
+            job = await asyncio.to_thread(storage.get_job, job_id)
+            if job is None or job.status in ("done", "error"):
+                return job
+            try:
+                await asyncio.wait_for(queue.get(), timeout=SSE_REFRESH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+    finally:
+        job_events.unsubscribe(job_id, queue)
+
+
+async def _analyze_batch_item(item: BatchItem, contract_type: str, mode: str) -> Report:
+    """
+    Файл пакета анализируется как обычная задача: через кэш отчётов и общую
+    ограниченную очередь планировщика
+    """
+    report_key = _report_key(item.file_hash, contract_type, mode) if item.file_hash else None
+    if report_key:
+        cached = await asyncio.to_thread(report_cache.get, report_key)
+        if cached is not None:
+            item.job_id = await asyncio.to_thread(_store_cached_report, report_key, cached)
+            return cached
+
+    job = await asyncio.to_thread(storage.create_job)
+    item.job_id = job.job_id
+    while True:
+        try:
+            scheduler.submit(
+                job.job_id,
+                _run_analysis,
+                contract_type,
+                item.path,
+                report_key,
+                mode,
+                submitted_at=time.perf_counter(),
+            )
+            break
+        except QueueFullError:
+            # Очередь общая для всех запросов: пакет ждёт свободного места, а не обходит лимит
+            await asyncio.sleep(BATCH_QUEUE_RETRY_SECONDS)
+
+    finished = await _wait_job(job.job_id)
+    if finished is None:
+        raise RuntimeError("Задача не найдена")
+    if finished.status == "error" or not finished.report:
+        raise RuntimeError(finished.error or finished.step)
+    return finished.report
+
+
+@app.post("/api/batch")
+async def api_batch(
+    contract_type: str = Form(...),
+    files: list[UploadFile] = File(...),
+    mode: str = Form("full"),
+) -> StreamingResponse:
+    """
+    Пакетный анализ (файлы или ZIP). Ответ — NDJSON: строка на каждый готовый файл
+    и итоговая сводка по портфелю.
+    """
+    if contract_type not in CONTRACT_TYPES:
+        raise HTTPException(status_code=400, detail="Неизвестный тип договора")
 
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail="Неизвестный режим анализа")
+
+    workdir = Path(tempfile.mkdtemp(prefix="risq-batch-"))
+    items: list[BatchItem] = []
+    try:
+        for index, upload in enumerate(files):
+            if not upload.filename:
+                continue
+            suffix = Path(upload.filename).suffix.lower()
+            path, file_hash = await save_upload(upload, suffix, allow_zip=True)
+            target = workdir / f"upload-{index:05d}{suffix}"
+            shutil.move(str(path), target)
+            if suffix == ".zip":
+                items.extend(await asyncio.to_thread(expand_zip, target, workdir, MAX_UPLOAD_BYTES))
+                target.unlink(missing_ok=True)
+            else:
+                items.append(BatchItem(name=upload.filename, path=target, file_hash=file_hash))
+            if len(items) > BATCH_MAX_FILES:
+                raise ValueError(f"В пакете больше {BATCH_MAX_FILES} файлов")
+    except (ValueError, zipfile.BadZipFile) as exc:
+        shutil.rmtree(workdir, ignore_errors=True)
+        status_code = exc.status_code if isinstance(exc, UploadError) else 400
+        raise HTTPException(status_code=status_code, detail=str(exc))
+
+    if not items:
+        shutil.rmtree(workdir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="Нет файлов PDF/DOCX для анализа")
+
+    async def stream() -> AsyncIterator[str]:
+        try:
+            async for record in run_batch(
+                items,
+                contract_type,
+                mode=mode,
+                analyze=lambda item: _analyze_batch_item(item, contract_type, mode),
+            ):
+                yield json.dumps(record, ensure_ascii=False) + "\n"
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def _job_payload(job: Job) -> dict:
     payload = {
         "status": job.status,
         "step": job.step,
@@ -181,10 +822,163 @@ async def api_job(job_id: str) -> JSONResponse:
     if job.error:
         payload["error"] = job.error
 
+    if job.parse_info:
+        payload["parse"] = job.parse_info
+
+    if job.usage:
+        payload["usage"] = job.usage
+
+    if job.timings:
+        payload["timings"] = job.timings
+
+    if job.diff:
+        payload["diff"] = job.diff
+
+    if job.partial and job.status == "processing":
+        payload["partial"] = job.partial
+
+    if job.status == "queued":
+        payload["queue_position"] = scheduler.position(job.job_id)
+    return payload
+
+
+@app.get("/api/job/{job_id}")
+async def api_job(job_id: str) -> JSONResponse:
+    job = await asyncio.to_thread(storage.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    payload = _job_payload(job)
+    # Нагрузка воркеров — только в ответе API: в события SSE не входит, чтобы событие
+    # менялось лишь вместе с самой задачей
+    payload["workers"] = scheduler.stats()
     return JSONResponse(payload)
 
 
+@app.get("/api/report/{job_id}")
+async def api_report(request: Request, job_id: str, fields: str | None = None) -> Response:
+    """
+    Отчёт в JSON для внешних систем. fields — поля через запятую, в том числе
+    вложенные: ?fields=cover.overall_status,risk_map. Ответ сжимается br/gzip.
+    """
+    data = await asyncio.to_thread(storage.get_report_data, job_id)
+    if data is None:
+        if not await asyncio.to_thread(storage.get_job, job_id):
+            raise HTTPException(status_code=404, detail="Задача не найдена")
+        raise HTTPException(status_code=409, detail="Отчёт ещё не готов")
+
+    if fields:
+        try:
+            data = select_fields(data, [f.strip() for f in fields.split(",") if f.strip()])
+        except KeyError as exc:
+            raise HTTPException(status_code=400, detail=f"Неизвестное поле отчёта: {exc.args[0]}")
+
+    body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+    headers = {
+        "ETag": etag,
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "private, max-age=3600",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in candidates or "*" in candidates:
+        return Response(status_code=304, headers=headers)
+
+    encoding = compression.negotiate(request.headers.get("accept-encoding"))
+    if encoding and len(body) >= compression.MIN_SIZE:
+        body = compression.compress(body, encoding)
+        headers["Content-Encoding"] = encoding
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/job/{job_id}/diff")
+async def api_job_diff(job_id: str) -> JSONResponse:
+    job = await asyncio.to_thread(storage.get_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+    if not job.diff:
+        raise HTTPException(status_code=404, detail="Задача не является анализом новой редакции")
+
+    return JSONResponse(job.diff)
+
+
+@app.get("/api/job/{job_id}/events")
+async def api_job_events(request: Request, job_id: str) -> StreamingResponse:
+    """
+    Server-Sent Events: статус задачи отправляется при каждом изменении
+    """
+    if not await asyncio.to_thread(storage.get_job, job_id):
+        raise HTTPException(status_code=404, detail="Задача не найдена")
+
+    async def stream() -> AsyncIterator[str]:
+        queue = job_events.subscribe(job_id)
+        last: str | None = None
+        try:
+            while True:
+                job = await asyncio.to_thread(storage.get_job, job_id)
+                if not job:
+                    return
+                data = json.dumps(_job_payload(job), ensure_ascii=False)
+                if data != last:
+                    last = data
+                    yield f"data: {data}\n\n"
+                else:
+                    yield ": ping\n\n"
+                if job.status in ("done", "error") or await request.is_disconnected():
+                    return
+                timeout = SSE_REFRESH_SECONDS if scheduler.has_job(job_id) else SSE_POLL_SECONDS
+                try:
+                    await asyncio.wait_for(queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            job_events.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/cache")
+async def api_cache() -> JSONResponse:
+    return JSONResponse(report_cache.stats())
+
+
+@app.delete("/api/cache")
+async def api_cache_clear() -> JSONResponse:
+    return JSONResponse({"removed": report_cache.clear()})
+
+
+@app.get("/api/llm")
+async def api_llm() -> JSONResponse:
+    return JSONResponse(
+        {
+            "limiter": llm_client.llm_client.limiter.stats(),
+            "validation": validation_stats.snapshot(),
+        }
+    )
+
+
+@app.get("/metrics")
+async def prometheus_metrics() -> Response:
+    return Response(content=generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/health")
+@app.get("/health/live")
 async def health() -> JSONResponse:
+    # Liveness: процесс жив и отвечает, прогрев не ждём
     return JSONResponse({"ok": True})
 
+
+@app.get("/health/ready")
+async def health_ready() -> JSONResponse:
+    # Readiness: обязательные шаги прогрева выполнены, задачи не ждут загрузки зависимостей
+    state = warmup.state()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
@@ -1,114 +1,200 @@
 from __future__ import annotations
 
+import asyncio
+import math
 import os
+import re
+import time
+from dataclasses import dataclass, field
 from datetime import date
+from typing import Callable, Optional, Sequence
 
-from openai import OpenAI
 from pydantic import ValidationError
 
-from backend.app.schemas.report import Report
-
-SYSTEM_PROMPT = (
-    "Ты формируешь автоматический предварительный отчёт по договору оказания услуг. "
-    "Сервис НЕ является юридической консультацией.\n\n"
-    "Запрещено:\n"
-    "- рекомендации (\"следует\", \"рекомендуется\", \"нужно сделать\")\n"
-    "- оценка законности (\"незаконно\", \"нарушает\")\n"
-    "- выводы о выгоде/невыгоде\n\n"
-    "Разрешено:\n"
-    "- нейтральные наблюдения (\"обратите внимание\", \"может содержать риск\", "
-    "\"требует дополнительной проверки\", \"отсутствует раздел\")\n\n"
-    "Формат ответа: ТОЛЬКО валидный JSON. Без Markdown. Без комментариев. Без лишних полей.\n"
+from backend.app.schemas.report import DutiesBalance, Report
+from backend.app.services.chunker import split_into_chunks
+from backend.app.services.contract_diff import ClauseDiff, prune_report
+from backend.app.services.json_repair import (
+    DEFAULT_OVERALL_STATUS,
+    repair_report,
+    validation_stats,
 )
+from backend.app.services.llm_client import TokenUsage, llm_client, run_sync, submit
+from backend.app.services.metrics import StageTimings, timed
+from backend.app.services.profiles import OVERALL_STATUSES, AnalyzerProfile, registry
+from backend.app.services.report_stream import LatestDraft, PartialReport, ReportStreamParser
+from backend.app.services.rules import (
+    RuleFindings,
+    analyze_rules,
+    apply_findings,
+    hints_message,
+    rule_report,
+)
+from backend.app.services.tokens import compact_text, count_tokens
+
+# full — LLM с подсказками локального разбора, fast — только правила, без LLM
+ANALYSIS_MODES = ("full", "fast")
 
-# Жёсткий шаблон ответа: модель должна заполнить поля внутри этой структуры
-JSON_TEMPLATE_EXAMPLE = """{
-  "cover": {
-    "contract_type": "Договор оказания услуг",
-    "analysis_date": "2026-01-21",
-    "pages": 2,
-    "overall_status": "Средний уровень внимания"
-  },
-  "summary": [
-    "Обратите внимание на сроки оказания услуг и порядок согласования этапов.",
-    "Может содержать риск из-за отсутствия/неясности порядка приёмки результата.",
-    "Уточните условия оплаты (сроки, основания для удержаний, штрафы).",
-    "Проверьте условия ответственности и ограничения ответственности сторон.",
-    "Обратите внимание на условия расторжения и сроки уведомления."
-  ],
-  "risk_map": [
-    {
-      "category": "сроки",
-      "description": "Сроки выполнения сформулированы неоднозначно, может потребоваться уточнение механизма продления/переноса.",
-      "clause_ref": "п. —"
-    }
-  ],
-  "atypical": [
-    {
-      "quote": "Исполнитель вправе изменять условия оказания услуг в одностороннем порядке…",
-      "note": "Нетипично: одностороннее изменение условий может требовать дополнительной проверки."
-    }
-  ],
-  "contradictions": [
-    {
-      "description": "В разных пунктах указаны разные сроки оплаты (например, 5 и 10 рабочих дней).",
-      "clause_refs": ["п. —", "п. —"]
-    }
-  ],
-  "duties_balance": {
-    "customer_count": 0,
-    "provider_count": 0,
-    "note": "Требуется дополнительная проверка распределения обязанностей: количество обязанностей сторон может быть неравномерным."
-  },
-  "needs_specialist": [
-    {
-      "item": "Сложная формулировка ответственности/штрафов — требуется проверка специалистом.",
-      "clause_ref": "п. —"
-    }
-  ],
-  "missing_sections": ["форс-мажор"],
-  "disclaimer": "Отчёт сформирован автоматически и не является юридической консультацией."
-}"""
-
-INSTRUCTIONS = (
-    "Сформируй отчёт строго по структуре и типам, как в примере JSON.\n"
-    "Правила заполнения:\n"
-    "- summary: строго 5–7 пунктов.\n"
-    "- clause_ref, если неизвестно: ставь \"—\".\n"
-    "- risk_map/atypical/contradictions/needs_specialist/missing_sections могут быть пустыми, "
-    "но старайся найти хотя бы 2–4 элемента в risk_map, если в тексте есть материал.\n"
-    "- duties_balance: заполни численно (примерно), если нельзя — поставь 0 и нейтральную note.\n"
-    "- overall_status выбирай из: "
-    "\"Низкий уровень внимания\" / \"Средний уровень внимания\" / \"Повышенное внимание\".\n"
-    "- missing_sections выбирай из: \"форс-мажор\" / \"ответственность\" / \"порядок расторжения\".\n"
+# Бюджет токенов на один запрос; длинные договоры делятся на фрагменты
+# под этот бюджет и анализируются параллельно (map-reduce)
+PROMPT_TOKEN_BUDGET = int(os.getenv("RISQ_PROMPT_TOKEN_BUDGET", "24000"))
+
+# Заголовок текста при повторном анализе новой редакции: в запрос идут только изменённые пункты
+REVISION_SCOPE = (
+    "Изменённые и новые пункты новой редакции договора (остальные пункты не менялись "
+    "и уже проанализированы; missing_sections заполняй только по этим пунктам):\n"
 )
 
-def _client() -> OpenAI:
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY не задан")
-    return OpenAI(api_key=api_key)
+def model_name(contract_type: str | None = None) -> str:
+    return registry.get(contract_type).model_name()
+
+def prompt_version(contract_type: str | None = None) -> str:
+    # Версия промпта профиля типа договора: часть ключа кэша отчётов
+    return registry.get(contract_type).version
 
-def _build_user_message(contract_type: str, text: str, pages: int) -> str:
+def _build_user_message(
+    text: str,
+    pages: int,
+    part: tuple[int, int] | None = None,
+    hints: str = "",
+    scope: str | None = None,
+) -> str:
+    # Всё неизменное для типа договора — в системном сообщении профиля; здесь только
+    # то, что зависит от конкретного договора, чтобы общий префикс запросов совпадал
+    if scope and part:
+        text_header = f"{scope}Фрагмент {part[0]} из {part[1]}:\n"
+    elif scope:
+        text_header = scope
+    elif part:
+        text_header = (
+            f"Фрагмент договора {part[0]} из {part[1]} "
+            "(остальные фрагменты анализируются отдельно; "
+            "missing_sections заполняй только по этому фрагменту):\n"
+        )
+    else:
+        text_header = "Текст договора:\n"
+    hints_block = f"{hints}\n\n" if hints else ""
     return (
-        f"Тип договора: {contract_type}\n"
         f"Страниц (по файлу): {pages}\n\n"
-        "Ниже пример СТРОГОЙ структуры JSON (ориентир по полям и типам):\n"
-        f"{JSON_TEMPLATE_EXAMPLE}\n\n"
-        f"{INSTRUCTIONS}\n\n"
-        "Текст договора (может быть обрезан):\n"
+        f"{hints_block}"
+        f"{text_header}"
         f"{text}"
     )
 
+def _messages(profile: AnalyzerProfile, user_message: str) -> list[dict]:
+    return [
+        {"role": "system", "content": profile.system_prompt},
+        {"role": "user", "content": user_message},
+    ]
+
+def _plan_chunks(
+    profile: AnalyzerProfile, text: str, pages: int, hints: str, scope: str | None = None
+) -> list[str]:
+    """
+    Делит текст так, чтобы каждый запрос (системный промпт + инструкции + фрагмент)
+    укладывался в PROMPT_TOKEN_BUDGET
+    """
+    model = profile.model_name()
+    overhead = count_tokens(
+        profile.system_prompt + _build_user_message("", pages, (99, 99), hints, scope), model
+    )
+    available = max(1000, PROMPT_TOKEN_BUDGET - overhead)
+    text_tokens = count_tokens(text, model)
+    if text_tokens <= available:
+        return [text]
+
+    # Символов на токен именно для этого текста; небольшой запас на неровность
+    chars_per_token = len(text) / max(1, text_tokens)
+    chunks = split_into_chunks(text, max(1000, int(available * chars_per_token * 0.95)))
+
+    result: list[str] = []
+    for chunk in chunks:
+        tokens = count_tokens(chunk, model)
+        if tokens <= available:
+            result.append(chunk)
+        else:
+            result.extend(split_into_chunks(chunk, max(1000, len(chunk) * available // tokens)))
+    return result
+
+@dataclass
+class PromptPart:
+    user_message: str
+    # Оценка токенов запроса (системное сообщение + user), посчитанная заранее
+    prompt_tokens: int
+    part: tuple[int, int] | None = None
+
+@dataclass
+class PreparedAnalysis:
+    """
+    Всё CPU-тяжёлое до обращения к LLM: правила, сжатие текста, деление на фрагменты,
+    подсчёт токенов. Готовится в потоке воркера, а не в общем event loop LLM-клиента,
+    чтобы большие тексты не задерживали потоки ответов других задач.
+    """
+
+    profile: AnalyzerProfile
+    contract_type: str
+    pages: int
+    findings: RuleFindings
+    parts: list[PromptPart] = field(default_factory=list)
+    # Для новой редакции: выводы прошлого отчёта по неизменённым пунктам
+    kept: Optional[Report] = None
+
+def _prompt_parts(
+    profile: AnalyzerProfile, text: str, pages: int, hints: str, scope: str | None = None
+) -> list[PromptPart]:
+    model = profile.model_name()
+    chunks = _plan_chunks(profile, text, pages, hints, scope)
+    total = len(chunks)
+    parts: list[PromptPart] = []
+    for i, chunk in enumerate(chunks):
+        part = (i + 1, total) if total > 1 else None
+        user_message = _build_user_message(chunk, pages, part, hints, scope)
+        parts.append(
+            PromptPart(
+                user_message=user_message,
+                prompt_tokens=count_tokens(profile.system_prompt + user_message, model),
+                part=part,
+            )
+        )
+    return parts
+
 def _validate_report(payload: str) -> Report:
     return Report.model_validate_json(payload)
 
-def _post_fix(report: Report, contract_type: str, pages: int) -> Report:
+# Дополнение summary до 5 пунктов, если в профиле нет своих формулировок
+SUMMARY_FILL = (
+    "Обратите внимание на сроки и порядок исполнения обязательств.",
+    "Проверьте условия оплаты: сроки, этапность, основания для удержаний/штрафов.",
+    "Проверьте ответственность сторон и возможные ограничения ответственности.",
+    "Обратите внимание на порядок расторжения и сроки уведомления.",
+    "Проверьте порядок разрешения споров и применимое право (если указано).",
+)
+
+# Синонимы уровней внимания по корню слова -> допустимый статус (по порядку OVERALL_STATUSES)
+_STATUS_STEMS = (("низк",), ("средн", "умерен"), ("повыш", "высок"))
+
+def _normalize_status(status: str | None) -> str:
+    if status in OVERALL_STATUSES:
+        return status
+    lowered = (status or "").lower()
+    for stems, known in zip(_STATUS_STEMS, OVERALL_STATUSES):
+        if any(stem in lowered for stem in stems):
+            return known
+    return DEFAULT_OVERALL_STATUS
+
+def _post_fix(
+    report: Report, contract_type: str, pages: int, base_fill: Sequence[str] = SUMMARY_FILL
+) -> Report:
     # Принудительно проставляем то, что точно знаем из файла/контекста
     try:
         report.cover.contract_type = contract_type
     except Exception:
         pass
+    # Статус — только из OVERALL_STATUSES: модель может вернуть синоним вне схемы
+    try:
+        report.cover.overall_status = _normalize_status(report.cover.overall_status)
+    except Exception:
+        pass
     try:
         report.cover.pages = int(pages) if pages else 1
     except Exception:
@@ -119,15 +205,7 @@ def _post_fix(report: Report, contract_type: str, pages: int) -> Report:
         pass
 
     # summary строго 5–7 пунктов
-    base_fill = [
-        "Обратите внимание на сроки и порядок исполнения обязательств.",
-        "Обратите внимание на порядок приёмки результата и подтверждающие документы.",
-        "Проверьте условия оплаты: сроки, этапность, основания для удержаний/штрафов.",
-        "Проверьте ответственность сторон и возможные ограничения ответственности.",
-        "Обратите внимание на порядок расторжения и сроки уведомления.",
-        "Проверьте раздел конфиденциальности и условия передачи информации третьим лицам.",
-        "Проверьте порядок разрешения споров и применимое право (если указано).",
-    ]
+    base_fill = base_fill or SUMMARY_FILL
     try:
         summary = list(report.summary) if getattr(report, "summary", None) else []
         summary = [s for s in summary if isinstance(s, str) and s.strip()]
@@ -141,42 +219,330 @@ def _post_fix(report: Report, contract_type: str, pages: int) -> Report:
 
     return report
 
-def analyze_contract(contract_type: str, text: str, pages: int) -> Report:
-    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    client = _client()
-    user_message = _build_user_message(contract_type, text, pages)
-
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": user_message},
-        ],
-        temperature=0.2,
-        response_format={"type": "json_object"},
+def _dedup_key(*parts: str | None) -> str:
+    return " | ".join(re.sub(r"\W+", " ", (p or "").lower()).strip() for p in parts)
+
+def _unique(items: list, key) -> list:
+    seen: set[str] = set()
+    result = []
+    for item in items:
+        k = key(item)
+        if k in seen:
+            continue
+        seen.add(k)
+        result.append(item)
+    return result
+
+def _merge_reports(reports: list[Report]) -> Report:
+    """
+    Сводит отчёты по фрагментам в один, убирая дубликаты
+    """
+    first = reports[0]
+
+    statuses = [r.cover.overall_status for r in reports]
+    overall = max(
+        statuses,
+        key=lambda s: OVERALL_STATUSES.index(s) if s in OVERALL_STATUSES else -1,
     )
-    content = response.choices[0].message.content or ""
+    cover = first.cover.model_copy(update={"overall_status": overall})
+
+    # summary: по кругу из фрагментов, чтобы все части договора были представлены
+    summary: list[str] = []
+    longest = max(len(r.summary) for r in reports)
+    for i in range(longest):
+        for r in reports:
+            if i < len(r.summary):
+                summary.append(r.summary[i])
+    summary = _unique(summary, _dedup_key)
+
+    # Раздел отсутствует в договоре, только если его нет ни в одном фрагменте
+    missing = set(first.missing_sections)
+    for r in reports[1:]:
+        missing &= set(r.missing_sections)
+
+    notes = [r.duties_balance.note for r in reports if r.duties_balance.note]
 
+    return Report(
+        cover=cover,
+        summary=summary,
+        risk_map=_unique(
+            [x for r in reports for x in r.risk_map],
+            lambda x: _dedup_key(x.category, x.description),
+        ),
+        atypical=_unique(
+            [x for r in reports for x in r.atypical],
+            lambda x: _dedup_key(x.quote, x.note),
+        ),
+        contradictions=_unique(
+            [x for r in reports for x in r.contradictions],
+            lambda x: _dedup_key(x.description),
+        ),
+        duties_balance=DutiesBalance(
+            customer_count=sum(r.duties_balance.customer_count for r in reports),
+            provider_count=sum(r.duties_balance.provider_count for r in reports),
+            note=notes[0] if notes else None,
+        ),
+        needs_specialist=_unique(
+            [x for r in reports for x in r.needs_specialist],
+            lambda x: _dedup_key(x.item, x.clause_ref),
+        ),
+        missing_sections=[m for m in first.missing_sections if m in missing],
+        disclaimer=first.disclaimer,
+    )
+
+async def _analyze_part(
+    profile: AnalyzerProfile,
+    prompt: PromptPart,
+    usage: TokenUsage | None = None,
+    timings: StageTimings | None = None,
+    partial: PartialReport | None = None,
+) -> Report:
+    if usage is not None:
+        usage.prompt_tokens_estimated += prompt.prompt_tokens
+
+    on_delta = None
+    if partial is not None:
+        part_index = prompt.part[0] if prompt.part else 0
+        parser = ReportStreamParser()
+
+        def on_delta(delta: str | None) -> None:
+            nonlocal parser
+            if delta is None:
+                parser = ReportStreamParser()
+                partial.reset(part_index)
+                return
+            events = parser.feed(delta)
+            if events:
+                partial.apply(part_index, events)
+
+    # Фрагмент — только в гистограмму: в задачу пишется время всех фрагментов по стене
+    with timed(None, "llm_request"):
+        content = await llm_client.chat(
+            usage=usage,
+            on_delta=on_delta,
+            model=profile.model_name(),
+            messages=_messages(profile, prompt.user_message),
+            temperature=0.2,
+            response_format=profile.response_format,
+        )
+
+    with timed(timings, "validation"):
+        return await _validate_or_repair(content, profile, usage)
+
+async def _validate_or_repair(
+    content: str, profile: AnalyzerProfile, usage: TokenUsage | None
+) -> Report:
     try:
         report = _validate_report(content)
-        return _post_fix(report, contract_type, pages)
+        validation_stats.record("valid")
+        return report
     except ValidationError:
-        retry_response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {
-                    "role": "user",
-                    "content": (
-                        "Исправь JSON: он должен быть строго по структуре примера. "
-                        "Верни только валидный JSON без лишних полей.\n\n" + content
-                    ),
-                },
-            ],
-            temperature=0.2,
-            response_format={"type": "json_object"},
+        pass
+
+    # Сначала чиним локально: второй запрос к LLM — только если не получилось
+    repaired = repair_report(content)
+    if repaired is not None:
+        validation_stats.record("repaired")
+        return repaired
+
+    validation_stats.record("llm_retry")
+    retry_content = await llm_client.chat(
+        usage=usage,
+        model=profile.model_name(),
+        messages=_messages(
+            profile,
+            "Исправь JSON: он должен быть строго по заданной структуре. "
+            "Верни только валидный JSON без лишних полей.\n\n" + content,
+        ),
+        temperature=0.2,
+        response_format=profile.response_format,
+    )
+    try:
+        return _validate_report(retry_content)
+    except ValidationError:
+        repaired = repair_report(retry_content)
+        if repaired is None:
+            validation_stats.record("failed")
+            raise
+        return repaired
+
+def prepare_contract(
+    contract_type: str, text: str, pages: int, mode: str = "full"
+) -> PreparedAnalysis:
+    profile = registry.get(contract_type)
+    findings = analyze_rules(text, profile.rules)
+    prepared = PreparedAnalysis(profile, contract_type, pages, findings)
+    if mode != "fast":
+        prepared.parts = _prompt_parts(
+            profile, compact_text(text), pages, hints_message(findings)
+        )
+    return prepared
+
+def _kept_status(previous: Report, kept: Report) -> str:
+    """
+    Статус по выводам прошлого отчёта, оставшимся в силе: уровень прошлой обложки
+    пропорционально доле сохранившихся рисков и противоречий. Снятые пункты
+    понижают статус, а не наследуют его со старой обложки.
+    """
+    before = len(previous.risk_map) + len(previous.contradictions)
+    after = len(kept.risk_map) + len(kept.contradictions)
+    level = OVERALL_STATUSES.index(_normalize_status(previous.cover.overall_status))
+    if before:
+        level = math.ceil(level * after / before)
+    return OVERALL_STATUSES[level]
+
+def prepare_revision(
+    contract_type: str, previous: Report, diff: ClauseDiff, text: str, pages: int
+) -> PreparedAnalysis:
+    profile = registry.get(contract_type)
+    # Правила — по всему тексту, чтобы missing_sections и баланс были по новой редакции
+    findings = analyze_rules(text, profile.rules)
+    kept = prune_report(previous, diff)
+    # При сведении берётся максимум со статусами изменённых пунктов
+    kept.cover.overall_status = _kept_status(previous, kept)
+    prepared = PreparedAnalysis(profile, contract_type, pages, findings, kept=kept)
+    delta_text = compact_text(diff.changed_text())
+    if delta_text:
+        prepared.parts = _prompt_parts(
+            profile, delta_text, pages, hints_message(findings), REVISION_SCOPE
         )
-        retry_content = retry_response.choices[0].message.content or ""
-        report = _validate_report(retry_content)
-        return _post_fix(report, contract_type, pages)
+    return prepared
+
+async def analyze_prepared_async(
+    prepared: PreparedAnalysis,
+    usage: TokenUsage | None = None,
+    timings: StageTimings | None = None,
+    on_partial: Callable[[dict], None] | None = None,
+) -> list[Report]:
+    """
+    Только запросы к LLM по готовым фрагментам (выполняется в общем event loop).
+    Фрагменты уходят параллельно: время ≈ самый медленный фрагмент.
+    on_partial вызывается в event loop: только быстрые действия без I/O (LatestDraft.put).
+    """
+    partial = (
+        PartialReport(prepared.contract_type, prepared.pages, on_partial) if on_partial else None
+    )
+    started = time.perf_counter()
+    try:
+        return list(
+            await asyncio.gather(
+                *(
+                    _analyze_part(prepared.profile, prompt, usage, timings, partial)
+                    for prompt in prepared.parts
+                )
+            )
+        )
+    finally:
+        if timings is not None:
+            timings.add("llm_request", time.perf_counter() - started, observe=False)
+
+def _run_prepared(
+    prepared: PreparedAnalysis,
+    usage: TokenUsage | None,
+    timings: StageTimings | None,
+    on_partial: Callable[[dict], None] | None,
+) -> list[Report]:
+    """
+    Запросы — в общем LLM-loop, черновики пишет вызывающий поток воркера:
+    запись в storage (commit SQLite) не останавливает loop, общий для всех задач
+    """
+    if not prepared.parts:
+        return []
+    if on_partial is None:
+        return run_sync(analyze_prepared_async(prepared, usage, timings))
+    drafts = LatestDraft()
+    future = submit(analyze_prepared_async(prepared, usage, timings, drafts.put))
+    future.add_done_callback(lambda _: drafts.close())
+    drafts.drain(on_partial)
+    return future.result()
+
+def finish_analysis(
+    prepared: PreparedAnalysis, reports: list[Report], timings: StageTimings | None = None
+) -> Report:
+    """
+    Сводит отчёты фрагментов и проставляет детерминированные поля
+    """
+    profile, findings = prepared.profile, prepared.findings
+    contract_type, pages = prepared.contract_type, prepared.pages
+    with timed(timings, "post_fix"):
+        if prepared.kept is not None:
+            if reports:
+                # Прошлый отчёт идёт последним: при дубликатах остаются свежие формулировки
+                report = _merge_reports(reports + [prepared.kept])
+                # Обязанности по изменённым пунктам не складываем с подсчётом по всему договору
+                report.duties_balance = prepared.kept.duties_balance
+            else:
+                report = prepared.kept
+        elif not prepared.parts:
+            report = rule_report(findings, contract_type, pages, profile.rules)
+        elif len(reports) == 1:
+            report = reports[0]
+        else:
+            report = _merge_reports(reports)
+        return _post_fix(
+            apply_findings(report, findings), contract_type, pages, profile.summary_fill
+        )
+
+async def analyze_contract_async(
+    contract_type: str,
+    text: str,
+    pages: int,
+    mode: str = "full",
+    usage: TokenUsage | None = None,
+    timings: StageTimings | None = None,
+    on_partial: Callable[[dict], None] | None = None,
+) -> Report:
+    """
+    on_partial получает черновик отчёта (dict) по мере потоковой генерации.
+    Промпт, разделы, стороны и модель берутся из профиля типа договора.
+    CPU-часть выполняется в отдельном потоке, не в event loop.
+    """
+    with timed(timings, "prompt_build"):
+        prepared = await asyncio.to_thread(prepare_contract, contract_type, text, pages, mode)
+    if on_partial is None:
+        reports = await analyze_prepared_async(prepared, usage, timings)
+    else:
+        # Черновики пишутся в отдельном потоке, не в event loop
+        drafts = LatestDraft()
+        writer = asyncio.ensure_future(asyncio.to_thread(drafts.drain, on_partial))
+        try:
+            reports = await analyze_prepared_async(prepared, usage, timings, drafts.put)
+        finally:
+            drafts.close()
+            await writer
+    return await asyncio.to_thread(finish_analysis, prepared, reports, timings)
+
+def analyze_contract(
+    contract_type: str,
+    text: str,
+    pages: int,
+    mode: str = "full",
+    usage: TokenUsage | None = None,
+    timings: StageTimings | None = None,
+    on_partial: Callable[[dict], None] | None = None,
+) -> Report:
+    # Синхронная обёртка для воркеров: подготовка — в потоке воркера,
+    # в общий async-клиент уходят только запросы по готовым фрагментам
+    with timed(timings, "prompt_build"):
+        prepared = prepare_contract(contract_type, text, pages, mode)
+    reports = _run_prepared(prepared, usage, timings, on_partial)
+    return finish_analysis(prepared, reports, timings)
 
+def analyze_revision(
+    contract_type: str,
+    previous: Report,
+    diff: ClauseDiff,
+    text: str,
+    pages: int,
+    usage: TokenUsage | None = None,
+    timings: StageTimings | None = None,
+    on_partial: Callable[[dict], None] | None = None,
+) -> Report:
+    """
+    Новая редакция договора: в LLM уходят только изменённые и новые пункты,
+    выводы прошлого отчёта по остальным пунктам сохраняются
+    """
+    with timed(timings, "prompt_build"):
+        prepared = prepare_revision(contract_type, previous, diff, text, pages)
+    reports = _run_prepared(prepared, usage, timings, on_partial)
+    return finish_analysis(prepared, reports, timings)
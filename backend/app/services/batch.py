@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import zipfile
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from backend.app.schemas.report import Report
+from backend.app.services import ocr
+from backend.app.services.analyzer_llm import analyze_contract_async
+from backend.app.services.llm_client import run_async
+from backend.app.services.parser import ParseResult, parse_document_detailed
+
+BATCH_CONCURRENCY = int(os.getenv("RISQ_BATCH_CONCURRENCY", "4"))
+BATCH_MAX_FILES = int(os.getenv("RISQ_BATCH_MAX_FILES", "500"))
+
+SUPPORTED_SUFFIXES = (".pdf", ".docx")
+
+
+@dataclass
+class BatchItem:
+    name: str
+    path: Path
+    # sha256 содержимого (ключ кэша отчётов), если посчитан при загрузке/распаковке
+    file_hash: Optional[str] = None
+    # Задача, созданная для файла (при анализе через планировщик сервиса)
+    job_id: Optional[str] = None
+
+
+def expand_zip(archive: Path, target_dir: Path, max_member_bytes: int) -> list[BatchItem]:
+    """
+    Распаковывает из ZIP только PDF/DOCX (без вложенных путей, с лимитом размера).
+    Каждый архив — в свой подкаталог target_dir: имена файлов разных архивов не пересекаются.
+    """
+    items: list[BatchItem] = []
+    target_dir = Path(tempfile.mkdtemp(prefix="zip-", dir=target_dir))
+    with zipfile.ZipFile(archive) as zf:
+        for index, info in enumerate(zf.infolist()):
+            name = Path(info.filename).name
+            if info.is_dir() or name.startswith(".") or "__MACOSX" in info.filename:
+                continue
+            if Path(name).suffix.lower() not in SUPPORTED_SUFFIXES:
+                continue
+            if info.file_size > max_member_bytes:
+                raise ValueError(f"{info.filename}: файл в архиве слишком большой")
+            if len(items) >= BATCH_MAX_FILES:
+                raise ValueError(f"В пакете больше {BATCH_MAX_FILES} файлов")
+            target = target_dir / f"{index:05d}{Path(name).suffix.lower()}"
+            digest = hashlib.sha256()
+            with zf.open(info) as src, open(target, "wb") as dst:
+                while chunk := src.read(1024 * 1024):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            items.append(BatchItem(name=info.filename, path=target, file_hash=digest.hexdigest()))
+    return items
+
+
+async def _analyze_item(
+    item: BatchItem,
+    contract_type: str,
+    parse: Callable[[Path], ParseResult],
+    mode: str = "full",
+) -> Report:
+    parsed = await asyncio.to_thread(parse, item.path)
+    if parsed.empty_pages:
+        parsed = await asyncio.to_thread(ocr.fill_scanned_pages, item.path, parsed)
+    report = await run_async(
+        analyze_contract_async(contract_type, parsed.text, parsed.pages, mode)
+    )
+    report.cover.chars = len(parsed.text)
+    report.cover.words = len(parsed.text.split())
+    return report
+
+
+async def run_batch(
+    items: list[BatchItem],
+    contract_type: str,
+    concurrency: int = BATCH_CONCURRENCY,
+    parse: Callable[[Path], ParseResult] = parse_document_detailed,
+    mode: str = "full",
+    analyze: Optional[Callable[[BatchItem], Awaitable[Report]]] = None,
+) -> AsyncIterator[dict]:
+    """
+    Анализирует файлы с ограниченным параллелизмом; результаты отдаются по мере готовности.
+    Последняя запись — сводка по портфелю. analyze(item) заменяет встроенный анализ
+    (сервис ставит файлы в свою очередь задач и берёт отчёты из кэша).
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    total = len(items)
+
+    async def worker(item: BatchItem) -> tuple[BatchItem, Optional[Report], Optional[str]]:
+        async with semaphore:
+            try:
+                if analyze is not None:
+                    return item, await analyze(item), None
+                return item, await _analyze_item(item, contract_type, parse, mode), None
+            except Exception as exc:
+                return item, None, str(exc) or exc.__class__.__name__
+
+    tasks = [asyncio.create_task(worker(item)) for item in items]
+    reports: list[Report] = []
+    failed = 0
+    try:
+        for done, next_task in enumerate(asyncio.as_completed(tasks), start=1):
+            item, report, error = await next_task
+            record: dict = {"file": item.name, "done": done, "total": total}
+            if item.job_id:
+                record["job_id"] = item.job_id
+            if report is not None:
+                reports.append(report)
+                record["status"] = "done"
+                record["report"] = report.model_dump(mode="json", warnings=False)
+            else:
+                failed += 1
+                record["status"] = "error"
+                record["error"] = error
+            yield record
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    yield {"summary": summarize(reports, total=total, failed=failed)}
+
+
+def summarize(reports: Iterable[Report], total: int = 0, failed: int = 0, top: int = 10) -> dict:
+    """
+    Сводка по портфелю: статусы, частые отсутствующие разделы и категории рисков
+    """
+    statuses: Counter[str] = Counter()
+    missing: Counter[str] = Counter()
+    categories: Counter[str] = Counter()
+    analyzed = 0
+    for report in reports:
+        analyzed += 1
+        statuses[report.cover.overall_status] += 1
+        missing.update(set(report.missing_sections))
+        categories.update(item.category.strip().lower() for item in report.risk_map)
+
+    return {
+        "total": total or analyzed,
+        "analyzed": analyzed,
+        "failed": failed,
+        "overall_status": dict(statuses.most_common()),
+        "missing_sections": missing.most_common(top),
+        "risk_categories": categories.most_common(top),
+    }
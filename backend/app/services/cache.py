@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from backend.app.schemas.report import Report
+from backend.app.services.report_codec import decode_report, encode_report
+
+
+def cache_key(file_hash: str, contract_type: str, model: str, prompt_version: str) -> str:
+    raw = "\x1f".join([file_hash, contract_type, model, prompt_version])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """
+    Персистентный кэш готовых отчётов (SQLite).
+
+    Ключ — хэш содержимого файла + тип договора + модель + версия промпта профиля.
+    Вытеснение: по TTL и по лимитам количества записей / суммарного размера (LRU).
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        prompt_versions: Iterable[str],
+        ttl_seconds: int = 7 * 24 * 3600,
+        max_entries: int = 1000,
+        max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.path = path
+        # Действующие версии промптов всех профилей
+        self.prompt_versions = frozenset(prompt_versions)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS reports (
+                    key TEXT PRIMARY KEY,
+                    prompt_version TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    text BLOB,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            # Миграция кэша, созданного до появления колонки text
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(reports)")}
+            if "text" not in columns:
+                conn.execute("ALTER TABLE reports ADD COLUMN text BLOB")
+            conn.execute("CREATE INDEX IF NOT EXISTS reports_accessed ON reports (accessed_at)")
+
+        # Промпт профиля поменялся -> отчёты этого типа договора больше не актуальны
+        self.invalidate_stale()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(str(self.path), timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str) -> Optional[Report]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT payload, created_at FROM reports WHERE key = ?", (key,)
+            ).fetchone()
+            if row and now - row[1] > self.ttl_seconds:
+                conn.execute("DELETE FROM reports WHERE key = ?", (key,))
+                row = None
+            if row:
+                conn.execute("UPDATE reports SET accessed_at = ? WHERE key = ?", (now, key))
+
+        report: Optional[Report] = None
+        if row:
+            try:
+                report = decode_report(row[0])
+            except Exception:
+                report = None
+
+        with self._lock:
+            if report is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return report
+
+    def get_text(self, key: str) -> Optional[str]:
+        """
+        Текст договора, по которому построен отчёт (нужен для анализа следующей редакции)
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT text FROM reports WHERE key = ?", (key,)
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row and row[0] is not None else None
+
+    def put(
+        self,
+        key: str,
+        model: str,
+        prompt_version: str,
+        report: Report,
+        text: Optional[str] = None,
+    ) -> None:
+        payload = encode_report(report)
+        text_payload = zlib.compress(text.encode("utf-8")) if text is not None else None
+        size = len(payload) + len(text_payload or b"")
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports "
+                "(key, prompt_version, model, payload, text, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, prompt_version, model, payload, text_payload, size, now, now),
+            )
+            evicted = self._evict(conn, now)
+
+        with self._lock:
+            self.stores += 1
+            self.evictions += evicted
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        evicted = conn.execute(
+            "DELETE FROM reports WHERE created_at < ?", (now - self.ttl_seconds,)
+        ).rowcount
+
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return evicted
+
+        # Самые давно не читавшиеся — первыми
+        rows = conn.execute("SELECT key, size FROM reports ORDER BY accessed_at").fetchall()
+        stale: list[str] = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            stale.append(key)
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM reports WHERE key = ?", [(k,) for k in stale])
+        return evicted + len(stale)
+
+    def invalidate_stale(self) -> int:
+        """
+        Удаляет записи, сформированные версией промпта, которой нет ни у одного профиля
+        """
+        versions = sorted(self.prompt_versions)
+        placeholders = ", ".join("?" * len(versions))
+        with self._connect() as conn:
+            removed = conn.execute(
+                f"DELETE FROM reports WHERE prompt_version NOT IN ({placeholders})", versions
+            ).rowcount
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def clear(self) -> int:
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM reports").rowcount
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            count, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports"
+            ).fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": count,
+                "bytes": total,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "prompt_versions": sorted(self.prompt_versions),
+            }
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import re
+
+# Начало пункта/раздела: "5.", "5.2.", "5.2.1", "Раздел 3", "Статья 7", "Глава II", "ПРИЛОЖЕНИЕ"
+_SECTION_START = re.compile(
+    r"^\s*(?:\d{1,3}(?:\.\d{1,3}){0,3}\.?\s+\S|(?:раздел|статья|глава|приложение)\b)",
+    re.IGNORECASE | re.MULTILINE,
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?;])\s+")
+
+
+def split_sections(text: str) -> list[str]:
+    starts = [m.start() for m in _SECTION_START.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    bounds = starts + [len(text)]
+    return [text[a:b] for a, b in zip(bounds, bounds[1:]) if text[a:b].strip()]
+
+
+def _split_oversized(section: str, max_chars: int) -> list[str]:
+    """
+    Пункт длиннее лимита: режем по абзацам, затем по предложениям, в крайнем случае — жёстко
+    """
+    pieces: list[str] = []
+    for paragraph in section.split("\n"):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph + "\n")
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            pieces.append(sentence + " ")
+    return pieces
+
+
+def split_into_chunks(text: str, max_chars: int) -> list[str]:
+    """
+    Делит текст договора на фрагменты не длиннее max_chars по границам пунктов/разделов
+    """
+    if len(text) <= max_chars:
+        return [text]
+
+    chunks: list[str] = []
+    current = ""
+    for section in split_sections(text):
+        parts = [section] if len(section) <= max_chars else _split_oversized(section, max_chars)
+        for part in parts:
+            if current and len(current) + len(part) > max_chars:
+                chunks.append(current.strip())
+                current = ""
+            current += part
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import gzip
+import os
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен: без него отдаём gzip
+    brotli = None
+
+# Ответы меньше порога не сжимаем: выигрыш меньше накладных расходов
+MIN_SIZE = int(os.getenv("RISQ_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = 6
+# 4–5 — почти максимум сжатия для JSON при времени, сопоставимом с gzip
+BROTLI_QUALITY = 5
+
+
+def supported() -> tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Лучшая кодировка из Accept-Encoding (br предпочтительнее gzip), None — без сжатия
+    """
+    weights: dict[str, float] = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in supported():
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br" and brotli is not None:
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    raise ValueError(f"Неподдерживаемая кодировка: {encoding}")
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Any, Iterable, Optional
+
+from backend.app.schemas.report import Report
+from backend.app.services.chunker import split_sections
+
+# Номер пункта в начале: "5", "5.2", "5.2.1."
+_CLAUSE_REF = re.compile(r"^\s*(\d{1,3}(?:\.\d{1,3}){0,3})\.?\s+")
+# Номера пунктов внутри clause_ref отчёта: "п. 5.2", "пп. 5.2, 6.1"
+_REF_NUMBER = re.compile(r"\d{1,3}(?:\.\d{1,3}){0,3}")
+_NON_WORD = re.compile(r"\W+")
+
+# Пункт считается изменённым (а не удалённым + добавленным), если похож хотя бы так
+CHANGED_MIN_RATIO = 0.6
+
+
+@dataclass
+class Clause:
+    ref: str
+    text: str
+    # Текст без номера и пунктуации: перенумерация пунктов не считается изменением
+    key: str = field(repr=False, default="")
+
+    @classmethod
+    def parse(cls, section: str) -> "Clause":
+        match = _CLAUSE_REF.match(section)
+        ref = match.group(1) if match else ""
+        body = section[match.end():] if match else section
+        return cls(ref=ref, text=section.strip(), key=_NON_WORD.sub(" ", body.lower()).strip())
+
+
+@dataclass
+class ClauseDiff:
+    added: list[Clause] = field(default_factory=list)
+    removed: list[Clause] = field(default_factory=list)
+    changed: list[tuple[Clause, Clause]] = field(default_factory=list)
+    unchanged: int = 0
+    # Старый номер пункта -> новый (для неизменённых и изменённых пунктов)
+    ref_map: dict[str, str] = field(default_factory=dict)
+    # Новые пункты, которые нужно проанализировать, в порядке нового текста
+    _to_analyze: list[Clause] = field(default_factory=list, repr=False)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+    def changed_text(self) -> str:
+        return "\n".join(clause.text for clause in self._to_analyze)
+
+    def stale_refs(self) -> set[str]:
+        """
+        Номера пунктов старой редакции, выводы по которым больше не действуют
+        """
+        refs = {c.ref for c in self.removed} | {old.ref for old, _ in self.changed}
+        return {ref for ref in refs if ref}
+
+    def stale_texts(self) -> list[str]:
+        return [c.key for c in self.removed] + [old.key for old, _ in self.changed]
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "added": [c.ref or c.text[:60] for c in self.added],
+            "removed": [c.ref or c.text[:60] for c in self.removed],
+            "changed": [new.ref or old.ref for old, new in self.changed],
+            "unchanged": self.unchanged,
+        }
+
+
+def split_clauses(text: str) -> list[Clause]:
+    return [Clause.parse(section) for section in split_sections(text)]
+
+
+def diff_clauses(old_text: str, new_text: str) -> ClauseDiff:
+    """
+    Выравнивает пункты двух редакций договора: добавленные, удалённые, изменённые
+    """
+    old, new = split_clauses(old_text), split_clauses(new_text)
+    result = ClauseDiff()
+    matcher = SequenceMatcher(None, [c.key for c in old], [c.key for c in new], autojunk=False)
+
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            result.unchanged += i2 - i1
+            for a, b in zip(old[i1:i2], new[j1:j2]):
+                if a.ref and b.ref:
+                    result.ref_map[a.ref] = b.ref
+            continue
+
+        # replace / insert / delete: внутри блока ищем пары похожих пунктов
+        candidates = list(old[i1:i2])
+        for clause in new[j1:j2]:
+            best, best_ratio = None, CHANGED_MIN_RATIO
+            for candidate in candidates:
+                pair = SequenceMatcher(None, candidate.key, clause.key, autojunk=False)
+                if pair.real_quick_ratio() < best_ratio or pair.quick_ratio() < best_ratio:
+                    continue
+                ratio = pair.ratio()
+                if ratio >= best_ratio:
+                    best, best_ratio = candidate, ratio
+            if best is None:
+                result.added.append(clause)
+            else:
+                candidates.remove(best)
+                result.changed.append((best, clause))
+                if best.ref and clause.ref:
+                    result.ref_map[best.ref] = clause.ref
+            result._to_analyze.append(clause)
+        result.removed.extend(candidates)
+    return result
+
+
+def _refs(value: Optional[str]) -> list[str]:
+    return _REF_NUMBER.findall(value or "")
+
+
+def _is_stale(refs: Iterable[str], stale: set[str]) -> bool:
+    # "5" устаревает вместе с "5.2" и наоборот
+    for ref in refs:
+        for other in stale:
+            if ref == other or ref.startswith(other + ".") or other.startswith(ref + "."):
+                return True
+    return False
+
+
+def _renumber(value: Optional[str], ref_map: dict[str, str]) -> Optional[str]:
+    if not value:
+        return value
+    return _REF_NUMBER.sub(lambda m: ref_map.get(m.group(), m.group()), value)
+
+
+def prune_report(report: Report, diff: ClauseDiff) -> Report:
+    """
+    Прошлый отчёт без выводов по изменённым/удалённым пунктам; номера пунктов — новые
+    """
+    stale = diff.stale_refs()
+    stale_texts = diff.stale_texts()
+    ref_map = diff.ref_map
+
+    def quoted_in_stale(quote: Optional[str]) -> bool:
+        key = _NON_WORD.sub(" ", (quote or "").lower()).strip()
+        return bool(key) and any(key in text for text in stale_texts)
+
+    pruned = report.model_copy(deep=True)
+    pruned.risk_map = [
+        r.model_copy(update={"clause_ref": _renumber(r.clause_ref, ref_map)})
+        for r in pruned.risk_map
+        if not _is_stale(_refs(r.clause_ref), stale)
+    ]
+    pruned.needs_specialist = [
+        s.model_copy(update={"clause_ref": _renumber(s.clause_ref, ref_map)})
+        for s in pruned.needs_specialist
+        if not _is_stale(_refs(s.clause_ref), stale)
+    ]
+    pruned.contradictions = [
+        c.model_copy(update={"clause_refs": [_renumber(ref, ref_map) for ref in c.clause_refs]})
+        for c in pruned.contradictions
+        if not _is_stale([n for ref in c.clause_refs for n in _refs(ref)], stale)
+    ]
+    pruned.atypical = [a for a in pruned.atypical if not quoted_in_stale(a.quote)]
+    return pruned
+
+
+def _risk_key(item: Any) -> tuple[str, str]:
+    return (item.category.strip().lower(), " ".join(_refs(item.clause_ref)))
+
+
+def diff_reports(old: Report, new: Report) -> dict[str, Any]:
+    """
+    Что изменилось в карте рисков: добавленные, снятые и изменённые (тот же пункт
+    и категория, другое описание) риски
+    """
+    before = {_risk_key(r): r for r in old.risk_map}
+    after = {_risk_key(r): r for r in new.risk_map}
+    return {
+        "overall_status": {"before": old.cover.overall_status, "after": new.cover.overall_status},
+        "added": [after[k].model_dump() for k in after if k not in before],
+        "removed": [before[k].model_dump() for k in before if k not in after],
+        "changed": [
+            {"before": before[k].model_dump(), "after": after[k].model_dump()}
+            for k in after
+            if k in before and before[k].description.strip() != after[k].description.strip()
+        ],
+    }
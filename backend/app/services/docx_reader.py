@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import posixpath
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Optional
+from xml.etree import ElementTree
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_REL = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_APP = "{http://schemas.openxmlformats.org/officeDocument/2006/extended-properties}"
+
+_P, _T, _TAB, _BR, _CR = _W + "p", _W + "t", _W + "tab", _W + "br", _W + "cr"
+_TBL, _TR, _TC = _W + "tbl", _W + "tr", _W + "tc"
+_RENDERED_BREAK = _W + "lastRenderedPageBreak"
+_HEADER_REF, _FOOTER_REF = _W + "headerReference", _W + "footerReference"
+
+DOCUMENT_PART = "word/document.xml"
+
+
+@dataclass
+class DocxText:
+    text: str
+    pages: int
+    # Страницы из docProps/app.xml (как сохранил Word), 0 — если их там нет
+    app_pages: int = 0
+    tables: int = 0
+
+
+class _PartReader:
+    """
+    Потоковый проход по одной XML-части (document/header/footer): абзацы и строки
+    таблиц в порядке документа, уже разобранные элементы сразу освобождаются
+    """
+
+    def __init__(self, max_chars: int) -> None:
+        self.max_chars = max_chars
+        self.lines: list[str] = []
+        self.chars = 0
+        self.tables = 0
+        self.page_breaks = 0
+        self.rendered_breaks = 0
+        self.header_refs: list[str] = []
+        self.footer_refs: list[str] = []
+
+    def read(self, source: IO[bytes]) -> None:
+        runs: list[str] = []
+        # Стек таблиц (ячейки текущей строки) и стек ячеек (их абзацы)
+        tables: list[list[str]] = []
+        cells: list[list[str]] = []
+        parents: list[ElementTree.Element] = []
+
+        for event, elem in ElementTree.iterparse(source, events=("start", "end")):
+            if event == "start":
+                parents.append(elem)
+                if elem.tag == _TBL:
+                    tables.append([])
+                    self.tables += 1
+                elif elem.tag == _TC:
+                    cells.append([])
+                continue
+
+            parents.pop()
+            tag = elem.tag
+            if tag == _T:
+                runs.append(elem.text or "")
+            elif tag == _TAB:
+                runs.append("\t")
+            elif tag in (_BR, _CR):
+                if elem.get(_W + "type") == "page":
+                    self.page_breaks += 1
+                else:
+                    runs.append("\n")
+            elif tag == _RENDERED_BREAK:
+                self.rendered_breaks += 1
+            elif tag == _HEADER_REF:
+                self.header_refs.append(elem.get(_R + "id", ""))
+            elif tag == _FOOTER_REF:
+                self.footer_refs.append(elem.get(_R + "id", ""))
+            elif tag == _P:
+                text = "".join(runs).strip()
+                runs.clear()
+                if text:
+                    if cells:
+                        cells[-1].append(text)
+                    else:
+                        self._add(text)
+            elif tag == _TC:
+                cell = " ".join(cells.pop())
+                if tables:
+                    tables[-1].append(cell)
+            elif tag == _TR and tables:
+                row = " | ".join(c for c in tables[-1] if c)
+                tables[-1].clear()
+                if row:
+                    # Вложенная таблица становится текстом ячейки внешней
+                    if cells:
+                        cells[-1].append(row)
+                    else:
+                        self._add(row)
+            elif tag == _TBL and tables:
+                tables.pop()
+            else:
+                continue
+
+            # Разобранный элемент больше не нужен: память не растёт с размером файла
+            elem.clear()
+            if parents and tag in (_P, _TBL):
+                parents[-1].remove(elem)
+            if self.chars >= self.max_chars:
+                return
+
+    def _add(self, line: str) -> None:
+        self.lines.append(line)
+        self.chars += len(line) + 1
+
+
+def _relationships(archive: zipfile.ZipFile) -> dict[str, str]:
+    name = "word/_rels/document.xml.rels"
+    if name not in archive.namelist():
+        return {}
+    with archive.open(name) as source:
+        root = ElementTree.parse(source).getroot()
+    return {
+        rel.get("Id", ""): posixpath.normpath(posixpath.join("word", rel.get("Target", "")))
+        for rel in root.iter(_REL + "Relationship")
+    }
+
+
+def _app_pages(archive: zipfile.ZipFile) -> int:
+    if "docProps/app.xml" not in archive.namelist():
+        return 0
+    with archive.open("docProps/app.xml") as source:
+        pages: Optional[str] = ElementTree.parse(source).getroot().findtext(_APP + "Pages")
+    try:
+        return int(pages or 0)
+    except ValueError:
+        return 0
+
+
+def _read_parts(
+    archive: zipfile.ZipFile, rels: dict[str, str], refs: list[str], max_chars: int
+) -> list[str]:
+    lines: list[str] = []
+    seen: set[str] = set()
+    for ref in refs:
+        part = rels.get(ref)
+        if not part or part in seen or part not in archive.namelist():
+            continue
+        seen.add(part)
+        reader = _PartReader(max_chars)
+        with archive.open(part) as source:
+            reader.read(source)
+        lines.extend(line for line in reader.lines if line not in lines)
+    return lines
+
+
+def extract_docx(path: Path, max_chars: int) -> DocxText:
+    """
+    Текст DOCX прямо из zip: колонтитулы, абзацы и таблицы в порядке документа.
+
+    Число страниц — из docProps/app.xml; если там меньше, чем видно по разрывам
+    страниц в самом документе (файл сохранён не Word'ом), берём оценку по разрывам.
+    """
+    with zipfile.ZipFile(path) as archive:
+        if DOCUMENT_PART not in archive.namelist():
+            raise ValueError("Файл не похож на DOCX: нет word/document.xml")
+
+        body = _PartReader(max_chars)
+        with archive.open(DOCUMENT_PART) as source:
+            body.read(source)
+
+        rels = _relationships(archive)
+        headers = _read_parts(archive, rels, body.header_refs, max_chars)
+        footers = _read_parts(archive, rels, body.footer_refs, max_chars)
+        app_pages = _app_pages(archive)
+
+    estimated = max(body.page_breaks, body.rendered_breaks) + 1
+    text = "\n".join(headers + body.lines + footers)
+    return DocxText(
+        text=text[:max_chars],
+        pages=max(app_pages, estimated),
+        app_pages=app_pages,
+        tables=body.tables,
+    )
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+
+class JobEvents:
+    """
+    Уведомления об изменении задачи для push-канала (SSE).
+
+    publish() можно вызывать из любого потока (воркеры планировщика),
+    подписчики живут в event loop приложения.
+    """
+
+    def __init__(self) -> None:
+        self._subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add((loop, queue))
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(job_id)
+            if not subscribers:
+                return
+            for item in [s for s in subscribers if s[1] is queue]:
+                subscribers.discard(item)
+            if not subscribers:
+                self._subscribers.pop(job_id, None)
+
+    def publish(self, job_id: str) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers.get(job_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._put, queue)
+            except RuntimeError:
+                # loop уже закрыт
+                pass
+
+    @staticmethod
+    def _put(queue: asyncio.Queue) -> None:
+        # Достаточно одного сигнала «изменилось»: актуальное состояние читается из storage
+        if queue.empty():
+            queue.put_nowait(True)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subscribers.values())
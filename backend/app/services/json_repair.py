@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+import typing
+from datetime import date, datetime
+from typing import Any, Optional
+
+from pydantic import BaseModel, ValidationError
+
+from backend.app.schemas.report import Report
+
+_FENCE = re.compile(r"^\s*```(?:json)?\s*|\s*```\s*$", re.IGNORECASE)
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_INT = re.compile(r"-?\d+")
+
+# Куда класть строку, если модель вернула её вместо объекта
+_TEXT_FIELDS = ("description", "note", "item")
+DEFAULT_OVERALL_STATUS = "Средний уровень внимания"
+
+# Ремонт принимается, только если ответ похож на отчёт: обложка и основные поля нужных
+# типов. Ошибка API, обрывок или посторонний JSON не достраиваются значениями по
+# умолчанию — анализатор повторит запрос к модели.
+_REQUIRED_SHAPE = {"cover": dict, "summary": list, "risk_map": list}
+_COVER_KEYS = ("contract_type", "overall_status")
+
+
+class ValidationStats:
+    """
+    Как чаще всего удаётся получить валидный отчёт: сразу, локальным ремонтом, повтором LLM
+    """
+
+    OUTCOMES = ("valid", "repaired", "llm_retry", "failed")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.OUTCOMES, 0)
+
+    def record(self, outcome: str) -> None:
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def snapshot(self) -> dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+
+validation_stats = ValidationStats()
+
+
+def _close_truncated(text: str, drop_dangling: bool) -> str:
+    """
+    Дописывает закрывающие кавычки/скобки у оборванного ответа
+    """
+    stack: list[str] = []
+    in_string = False
+    escaped = False
+    for ch in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]" and stack:
+            stack.pop()
+
+    tail = '"' if in_string else ""
+    body = (text + tail).rstrip()
+    if drop_dangling:
+        # Оборванный "ключ" (с двоеточием или без) в конце объекта — убираем
+        body = re.sub(r'[,{]\s*"[^"]*"\s*:?\s*$', lambda m: m.group()[0].strip(","), body)
+    body = re.sub(r"[,:]\s*$", "", body)
+    return body + "".join(reversed(stack))
+
+
+def tolerant_loads(content: str) -> Optional[Any]:
+    text = _FENCE.sub("", content.strip())
+    start = text.find("{")
+    if start < 0:
+        return None
+    end = text.rfind("}")
+    candidates = []
+    if end > start:
+        candidates.append(text[start:end + 1])
+    candidates.append(text[start:])
+
+    for candidate in candidates:
+        for variant in (candidate, _TRAILING_COMMA.sub(r"\1", candidate)):
+            try:
+                return json.loads(variant, strict=False)
+            except json.JSONDecodeError:
+                pass
+    for drop_dangling in (False, True):
+        closed = _close_truncated(text[start:], drop_dangling)
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r"\1", closed), strict=False)
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def _unwrap_optional(annotation: Any) -> Any:
+    if typing.get_origin(annotation) is typing.Union:
+        args = [a for a in typing.get_args(annotation) if a is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return annotation
+
+
+def _coerce_value(annotation: Any, value: Any, required: bool) -> Any:
+    target = _unwrap_optional(annotation)
+    origin = typing.get_origin(target)
+
+    if origin in (list, typing.List):
+        (item_type,) = typing.get_args(target) or (Any,)
+        if value is None:
+            return []
+        if not isinstance(value, list):
+            value = [value]
+        items = [_coerce_value(item_type, item, True) for item in value]
+        return [item for item in items if item is not None]
+
+    if isinstance(target, type) and issubclass(target, BaseModel):
+        if isinstance(value, str) and value.strip():
+            # Строка вместо объекта: кладём её в основное текстовое поле
+            fields = target.model_fields
+            text_field = next((n for n in _TEXT_FIELDS if n in fields), None) or next(
+                (n for n, f in fields.items() if _unwrap_optional(f.annotation) is str), None
+            )
+            value = {text_field: value} if text_field else {}
+        if not isinstance(value, dict):
+            return coerce_model(target, {}) if required else None
+        return coerce_model(target, value)
+
+    if target is int:
+        if isinstance(value, bool):
+            return int(value)
+        if isinstance(value, (int, float)):
+            return int(value)
+        if isinstance(value, str) and (match := _INT.search(value)):
+            return int(match.group())
+        return 0 if required else None
+
+    if target is str:
+        if value is None:
+            return "" if required else None
+        if isinstance(value, (date, datetime)):
+            return value.isoformat()
+        if isinstance(value, (list, tuple)):
+            return "; ".join(str(v) for v in value)
+        return str(value)
+
+    return value
+
+
+def coerce_model(model: type[BaseModel], data: dict) -> dict:
+    """
+    Приводит dict к полям модели: лишние ключи отбрасываются, типы приводятся,
+    отсутствующие поля заполняются значениями по умолчанию
+    """
+    result: dict[str, Any] = {}
+    for name, field in model.model_fields.items():
+        if name in data:
+            value = _coerce_value(field.annotation, data[name], field.is_required())
+            if value is None and field.is_required():
+                continue
+            result[name] = value
+        elif field.is_required():
+            result[name] = _coerce_value(field.annotation, None, True)
+    return result
+
+
+def _looks_like_report(data: dict) -> bool:
+    if any(not isinstance(data.get(key), kind) for key, kind in _REQUIRED_SHAPE.items()):
+        return False
+    cover = data["cover"]
+    if not any(isinstance(cover.get(key), str) and cover[key].strip() for key in _COVER_KEYS):
+        return False
+    return any(isinstance(item, str) and item.strip() for item in data["summary"])
+
+
+def repair_report(content: str) -> Optional[Report]:
+    """
+    Локальный ремонт ответа модели; None — если отчёт восстановить не удалось
+    """
+    data = tolerant_loads(content)
+    if not isinstance(data, dict):
+        return None
+    # Иногда модель заворачивает отчёт в {"report": {...}}
+    if "cover" not in data and len(data) == 1:
+        inner = next(iter(data.values()))
+        if isinstance(inner, dict):
+            data = inner
+    if not _looks_like_report(data):
+        return None
+    coerced = coerce_model(Report, data)
+    if not coerced["cover"].get("overall_status"):
+        coerced["cover"]["overall_status"] = DEFAULT_OVERALL_STATUS
+    try:
+        return Report.model_validate(coerced)
+    except ValidationError:
+        return None
+
+
+def coerce_field(model: type[BaseModel], name: str, value: Any) -> Any:
+    """
+    Приводит значение одного поля модели (для черновика отчёта при потоковом ответе)
+    """
+    field = model.model_fields[name]
+    return _coerce_value(field.annotation, value, field.is_required())
+
+
+def coerce_item(model: type[BaseModel], name: str, value: Any) -> Any:
+    """
+    Приводит один элемент списочного поля модели; None — если поле не список
+    """
+    annotation = _unwrap_optional(model.model_fields[name].annotation)
+    if typing.get_origin(annotation) not in (list, typing.List):
+        return None
+    (item_type,) = typing.get_args(annotation) or (Any,)
+    return _coerce_value(item_type, value, True)
@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Mapping, Optional, TypeVar
+
+import httpx
+
+if TYPE_CHECKING:
+    # openai импортируется при первом запросе (или фоновым прогревом): ~0.7 с на старте воркера
+    from openai import AsyncOpenAI
+
+T = TypeVar("T")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+def _retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    if not headers:
+        return None
+    for name in ("retry-after-ms", "retry-after"):
+        value = headers.get(name)
+        if not value:
+            continue
+        try:
+            seconds = float(value)
+        except ValueError:
+            continue
+        return seconds / 1000 if name.endswith("-ms") else seconds
+    return None
+
+
+@dataclass
+class TokenUsage:
+    """
+    Расход токенов и время LLM по одной задаче (накапливается по всем запросам)
+    """
+
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    prompt_tokens_estimated: int = 0
+    # Токены промпта, взятые провайдером из кэша (общий префикс запросов)
+    cached_tokens: int = 0
+    llm_seconds: float = 0.0
+
+    def add(self, usage: Any, seconds: float) -> None:
+        self.requests += 1
+        self.llm_seconds += seconds
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            details = getattr(usage, "prompt_tokens_details", None)
+            self.cached_tokens += getattr(details, "cached_tokens", 0) or 0
+
+    def as_dict(self) -> dict:
+        data = asdict(self)
+        data["llm_seconds"] = round(self.llm_seconds, 3)
+        data["total_tokens"] = self.prompt_tokens + self.completion_tokens
+        return data
+
+
+class AdaptiveLimiter:
+    """
+    Ограничитель числа одновременных запросов к LLM (AIMD).
+
+    - успешный ответ: лимит медленно растёт (+1 за «окно» успешных запросов)
+    - 429: лимит делится пополам, новые запросы ждут Retry-After
+    - заголовок x-ratelimit-remaining-requests поджимает лимит сверху
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.in_flight = 0
+        self.throttled = 0
+        self._resume_at = 0.0
+        self._cond: Optional[asyncio.Condition] = None
+
+    def _condition(self) -> asyncio.Condition:
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self) -> None:
+        cond = self._condition()
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self._resume_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            async with cond:
+                await cond.wait_for(lambda: self.in_flight < int(self.limit))
+                if self._resume_at <= loop.time():
+                    self.in_flight += 1
+                    return
+
+    async def release(
+        self,
+        headers: Optional[Mapping[str, str]] = None,
+        throttled: bool = False,
+    ) -> None:
+        cond = self._condition()
+        async with cond:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self.limit = max(float(self.minimum), self.limit / 2)
+                pause = _retry_after(headers)
+                if pause:
+                    loop = asyncio.get_running_loop()
+                    self._resume_at = max(self._resume_at, loop.time() + pause)
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / max(self.limit, 1.0))
+                remaining = (headers or {}).get("x-ratelimit-remaining-requests")
+                if remaining and remaining.isdigit():
+                    self.limit = max(float(self.minimum), min(self.limit, float(remaining)))
+            cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "throttled": self.throttled,
+        }
+
+
+class _LoopThread:
+    """
+    Отдельный event loop в фоновом потоке: общий пул соединений для всех воркеров
+    """
+
+    def __init__(self) -> None:
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="risq-llm-loop", daemon=True)
+                thread.start()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop())
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        return self.submit(coro).result()
+
+    def stop(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread:
+            thread.join(timeout=5)
+        loop.close()
+
+
+class LLMClient:
+    """
+    Общий асинхронный клиент OpenAI: пул соединений, ретраи с джиттером, таймауты
+    """
+
+    def __init__(self) -> None:
+        self.timeout = _env_float("OPENAI_TIMEOUT", 120.0)
+        self.max_retries = _env_int("OPENAI_MAX_RETRIES", 5)
+        self.backoff_base = _env_float("OPENAI_BACKOFF_BASE", 1.0)
+        self.backoff_cap = _env_float("OPENAI_BACKOFF_CAP", 30.0)
+        self.limiter = AdaptiveLimiter(
+            initial=_env_int("OPENAI_INITIAL_CONCURRENCY", 8),
+            minimum=_env_int("OPENAI_MIN_CONCURRENCY", 1),
+            maximum=_env_int("OPENAI_MAX_CONCURRENCY", 32),
+        )
+        # Потоковые ответы: черновик отчёта виден до конца генерации
+        self.streaming = os.getenv("OPENAI_STREAM", "1") == "1"
+        self._client: Optional[AsyncOpenAI] = None
+
+    def _openai(self) -> AsyncOpenAI:
+        if self._client is None:
+            from openai import AsyncOpenAI
+
+            api_key = os.getenv("OPENAI_API_KEY")
+            if not api_key:
+                raise RuntimeError("OPENAI_API_KEY не задан")
+            max_connections = self.limiter.maximum
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                    keepalive_expiry=60,
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=10.0),
+            )
+            self._client = AsyncOpenAI(
+                api_key=api_key,
+                base_url=os.getenv("OPENAI_BASE_URL") or None,
+                http_client=http_client,
+                max_retries=0,
+            )
+        return self._client
+
+    def warmup(self) -> None:
+        """
+        Загружает openai заранее, чтобы первый запрос не ждал импорта
+        """
+        import openai  # noqa: F401
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(self.backoff_cap, retry_after) + random.uniform(0, self.backoff_base)
+        # full jitter
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** attempt))
+
+    async def _read_stream(
+        self, stream: Any, on_delta: Callable[[Optional[str]], None]
+    ) -> tuple[str, Any]:
+        parts: list[str] = []
+        usage = None
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            for choice in chunk.choices:
+                delta = choice.delta.content
+                if delta:
+                    parts.append(delta)
+                    on_delta(delta)
+        return "".join(parts), usage
+
+    async def chat(
+        self,
+        usage: Optional[TokenUsage] = None,
+        on_delta: Optional[Callable[[Optional[str]], None]] = None,
+        **kwargs: Any,
+    ) -> str:
+        """
+        Один chat.completions-запрос с ретраями; возвращает content ответа.
+
+        on_delta — приём ответа по мере генерации (stream=True); None в нём
+        означает, что ответ начинается заново после повтора.
+        """
+        from openai import APIConnectionError, APIStatusError, InternalServerError, RateLimitError
+
+        client = self._openai()
+        stream = on_delta is not None and self.streaming
+        if stream:
+            kwargs = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+        started = time.perf_counter()
+        attempt = 0
+        last_error: Optional[Exception] = None
+        while True:
+            await self.limiter.acquire()
+            try:
+                raw = await client.chat.completions.with_raw_response.create(
+                    timeout=self.timeout, **kwargs
+                )
+                if stream:
+                    content, completion_usage = await self._read_stream(raw.parse(), on_delta)
+                else:
+                    completion = raw.parse()
+                    content = completion.choices[0].message.content or ""
+                    completion_usage = completion.usage
+            except RateLimitError as exc:
+                last_error = exc
+                headers = exc.response.headers
+                await self.limiter.release(headers, throttled=True)
+                delay = self._backoff(attempt, _retry_after(headers))
+            except (APIConnectionError, InternalServerError, httpx.TransportError) as exc:
+                # httpx.TransportError — обрыв соединения посреди потокового ответа
+                last_error = exc
+                await self.limiter.release()
+                headers = exc.response.headers if isinstance(exc, APIStatusError) else None
+                delay = self._backoff(attempt, _retry_after(headers))
+            except BaseException:
+                await self.limiter.release()
+                raise
+            else:
+                await self.limiter.release(raw.headers)
+                if usage is not None:
+                    usage.add(completion_usage, time.perf_counter() - started)
+                return content
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise RuntimeError("LLM недоступна: превышено число повторных попыток") from last_error
+            if stream:
+                on_delta(None)
+            await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+llm_client = LLMClient()
+_runner = _LoopThread()
+
+
+def run_sync(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    Выполняет корутину на общем LLM-loop из синхронного кода (воркеры планировщика)
+    """
+    return _runner.run(coro)
+
+
+def submit(coro: Coroutine[Any, Any, T]) -> Future[T]:
+    """
+    Запускает корутину на общем LLM-loop, не дожидаясь результата
+    """
+    return _runner.submit(coro)
+
+
+async def run_async(coro: Coroutine[Any, Any, T]) -> T:
+    """
+    То же из другого event loop (приложение, CLI): ждём результат без блокировки
+    """
+    return await asyncio.wrap_future(_runner.submit(coro))
+
+
+def shutdown() -> None:
+    if llm_client._client is None:
+        _runner.stop()
+        return
+    try:
+        _runner.run(llm_client.aclose())
+    finally:
+        _runner.stop()
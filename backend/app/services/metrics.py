@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import cProfile
+import importlib.util
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+
+# Стадии конвейера, по которым пишутся тайминги задачи и гистограммы
+STAGES = (
+    "upload_write",
+    "queue_wait",
+    "parse",
+    "ocr",
+    "diff",
+    "prompt_build",
+    "llm_request",
+    "validation",
+    "post_fix",
+    "pdf_render",
+)
+
+REGISTRY = CollectorRegistry(auto_describe=True)
+
+STAGE_SECONDS = Histogram(
+    "risq_stage_seconds",
+    "Длительность стадии конвейера анализа",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120, 300),
+    registry=REGISTRY,
+)
+STAGE_ERRORS = Counter(
+    "risq_stage_errors",
+    "Ошибки по стадиям конвейера",
+    ["stage"],
+    registry=REGISTRY,
+)
+
+
+class StageTimings:
+    """
+    Тайминги стадий одной задачи (сек). Повторы стадии суммируются; для параллельных
+    фрагментов задача пишет общее время по стене (llm_request), а длительности
+    отдельных фрагментов идут только в гистограмму.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.seconds: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float, observe: bool = True) -> None:
+        """
+        observe=False — только в тайминги задачи (гистограмму уже пополнили фрагменты)
+        """
+        if observe:
+            STAGE_SECONDS.labels(stage).observe(seconds)
+        with self._lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            STAGE_ERRORS.labels(stage).inc()
+            raise
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def as_dict(self) -> dict[str, float]:
+        with self._lock:
+            return {stage: round(value, 4) for stage, value in self.seconds.items()}
+
+
+@contextmanager
+def timed(timings: Optional[StageTimings], stage: str) -> Iterator[None]:
+    """
+    То же, что timings.stage(), но работает и без объекта задачи (только гистограмма)
+    """
+    with (timings or StageTimings()).stage(stage):
+        yield
+
+
+class _StatsCollector:
+    """
+    Метрики из уже существующих счётчиков (очередь, LLM, кэш) — собираются при скрейпе
+    """
+
+    def __init__(self) -> None:
+        self._sources: list[Callable[[], Iterable[Metric]]] = []
+
+    def add_source(self, source: Callable[[], Iterable[Metric]]) -> None:
+        self._sources.append(source)
+
+    def collect(self) -> Iterator[Metric]:
+        for source in self._sources:
+            try:
+                yield from source()
+            except Exception:
+                continue
+
+
+_collector = _StatsCollector()
+REGISTRY.register(_collector)
+
+
+def add_source(source: Callable[[], Iterable[Metric]]) -> None:
+    _collector.add_source(source)
+
+
+def gauge(name: str, documentation: str, value: float) -> GaugeMetricFamily:
+    return GaugeMetricFamily(name, documentation, value=value)
+
+
+def counter(name: str, documentation: str, value: float) -> CounterMetricFamily:
+    return CounterMetricFamily(name, documentation, value=value)
+
+
+def labeled_gauge(
+    name: str, documentation: str, label: str, values: dict[str, float]
+) -> GaugeMetricFamily:
+    family = GaugeMetricFamily(name, documentation, labels=[label])
+    for key, value in values.items():
+        family.add_metric([key], value)
+    return family
+
+
+def labeled_counter(
+    name: str, documentation: str, label: str, values: dict[str, float]
+) -> CounterMetricFamily:
+    family = CounterMetricFamily(name, documentation, labels=[label])
+    for key, value in values.items():
+        family.add_metric([key], value)
+    return family
+
+
+# --- Профилирование по запросу (заголовок X-RISQ-Profile) ---
+
+PROFILING_ENABLED = os.getenv("RISQ_PROFILING", "0") == "1"
+PROFILE_DIR = Path(os.getenv("RISQ_PROFILE_DIR", "data/profiles"))
+PROFILE_HEADER = "x-risq-profile"
+PROFILERS = ("cprofile", "pyinstrument")
+# pyinstrument необязателен (requirements-dev.txt): без него доступен только cProfile
+AVAILABLE_PROFILERS = tuple(
+    kind for kind in PROFILERS if kind == "cprofile" or importlib.util.find_spec(kind) is not None
+)
+
+
+class ProfilerUnavailableError(ValueError):
+    pass
+
+
+class ProfilerBusyError(RuntimeError):
+    pass
+
+
+# Профилируется не больше одного запроса или задачи на процесс: два профиля на одном
+# потоке перебивают друг другу хук (на Python 3.12+ второй cProfile падает), а
+# параллельные профили event loop смешали бы работу разных запросов
+_active_profile = threading.Lock()
+
+
+def requested_profiler(headers: Any) -> Optional[str]:
+    """
+    Профилировщик из заголовка X-RISQ-Profile; неизвестный или не установленный —
+    ProfilerUnavailableError (ответ 400, а не падение запроса на импорте)
+    """
+    if not PROFILING_ENABLED:
+        return None
+    kind = (headers.get(PROFILE_HEADER) or "").strip().lower()
+    if not kind:
+        return None
+    if kind not in AVAILABLE_PROFILERS:
+        raise ProfilerUnavailableError(
+            f"Профилировщик {kind} недоступен; доступны: {', '.join(AVAILABLE_PROFILERS)}"
+        )
+    return kind
+
+
+class Profiler:
+    """
+    Обёртка над cProfile / pyinstrument; результат сохраняется в PROFILE_DIR
+    """
+
+    def __init__(self, kind: str, name: str, async_mode: bool = False) -> None:
+        self.kind = kind
+        self.name = name
+        self.path: Optional[Path] = None
+        if kind == "pyinstrument":
+            from pyinstrument import Profiler as _Pyinstrument
+
+            self._profiler: Any = _Pyinstrument(async_mode="enabled" if async_mode else "disabled")
+        else:
+            self._profiler = cProfile.Profile()
+
+    def start(self) -> None:
+        """
+        ProfilerBusyError — если в процессе уже идёт другое профилирование
+        """
+        if not _active_profile.acquire(blocking=False):
+            raise ProfilerBusyError("Уже идёт профилирование другого запроса, повторите позже")
+        try:
+            if self.kind == "pyinstrument":
+                self._profiler.start()
+            else:
+                self._profiler.enable()
+        except BaseException:
+            _active_profile.release()
+            raise
+
+    def disable(self) -> None:
+        """
+        Останавливает сбор; вызывать в том же потоке, что и start() (хук cProfile — поточный)
+        """
+        try:
+            if self.kind == "pyinstrument":
+                self._profiler.stop()
+            else:
+                self._profiler.disable()
+        finally:
+            _active_profile.release()
+
+    def stop(self) -> Path:
+        self.disable()
+        return self.save()
+
+    def save(self) -> Path:
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        if self.kind == "pyinstrument":
+            self.path = PROFILE_DIR / f"{stamp}-{self.name}.html"
+            self.path.write_text(self._profiler.output_html(), encoding="utf-8")
+        else:
+            self.path = PROFILE_DIR / f"{stamp}-{self.name}.prof"
+            self._profiler.dump_stats(str(self.path))
+        return self.path
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional
+
+from backend.app.services.parser import MAX_CHARS, SCANNED_PAGE_MIN_CHARS, ParseResult
+
+# OCR страниц без текстового слоя (Tesseract + pypdfium2 для растеризации)
+OCR_ENABLED = os.getenv("RISQ_OCR", "1") == "1"
+OCR_LANG = os.getenv("RISQ_OCR_LANG", "rus+eng")
+OCR_DPI = int(os.getenv("RISQ_OCR_DPI", "300"))
+OCR_WORKERS = int(os.getenv("RISQ_OCR_WORKERS", "2"))
+OCR_CACHE_DIR = Path(os.getenv("RISQ_OCR_CACHE_DIR", "data/ocr_cache"))
+
+# Сколько страниц одной задачи одновременно в пуле: большой скан не занимает
+# очередь целиком, страницы других задач идут вперемешку
+_WINDOW_PER_WORKER = 2
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class OcrUnavailableError(ValueError):
+    pass
+
+
+@lru_cache(maxsize=1)
+def ocr_available() -> bool:
+    if not OCR_ENABLED or shutil.which("tesseract") is None:
+        return False
+    try:
+        import pypdfium2  # noqa: F401
+        import pytesseract  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _image_key(image, lang: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size}:{lang}".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def _ocr_page(path: Path, index: int, dpi: int, lang: str, cache_dir: Path) -> tuple[str, bool]:
+    """
+    Растеризует страницу и распознаёт её; (текст, взят_из_кэша).
+    Кэш — по хэшу изображения страницы: повторная загрузка того же скана
+    (в том числе внутри другого PDF) не распознаётся заново.
+    """
+    import pypdfium2 as pdfium
+    import pytesseract
+
+    pdf = pdfium.PdfDocument(str(path))
+    try:
+        page = pdf[index]
+        try:
+            image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+
+    cached = cache_dir / f"{_image_key(image, lang)}.txt"
+    if cached.exists():
+        return cached.read_text(encoding="utf-8"), True
+
+    text = pytesseract.image_to_string(image, lang=lang)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    partial = cached.with_name(f"{cached.name}.{os.getpid()}.part")
+    partial.write_text(text, encoding="utf-8")
+    partial.replace(cached)
+    return text, False
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _ocr_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max(1, OCR_WORKERS))
+        return _pool
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def recognize_pages(
+    path: Path, pages: list[int], on_progress: Optional[ProgressCallback] = None
+) -> tuple[dict[int, str], int]:
+    """
+    Распознаёт страницы в общем пуле процессов; ({страница: текст}, из_кэша)
+    """
+    pool = _ocr_pool()
+    window = max(1, OCR_WORKERS) * _WINDOW_PER_WORKER
+    pending = list(reversed(pages))
+    running: dict[Future, int] = {}
+    texts: dict[int, str] = {}
+    cached = 0
+    try:
+        while pending or running:
+            while pending and len(running) < window:
+                index = pending.pop()
+                future = pool.submit(_ocr_page, path, index, OCR_DPI, OCR_LANG, OCR_CACHE_DIR)
+                running[future] = index
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                text, from_cache = future.result()
+                texts[index] = text
+                cached += from_cache
+            if on_progress is not None:
+                on_progress(len(texts), len(pages))
+    finally:
+        for future in running:
+            future.cancel()
+    return texts, cached
+
+
+def fill_scanned_pages(
+    path: Path, parsed: ParseResult, on_progress: Optional[ProgressCallback] = None
+) -> ParseResult:
+    """
+    Подставляет OCR-текст для страниц без текстового слоя; страницы с текстом не трогаем.
+    Если текста нет совсем, а OCR недоступен — ошибка: иначе LLM «додумает» отчёт по пустому файлу.
+    """
+    if not parsed.empty_pages:
+        return parsed
+
+    if not ocr_available():
+        if len(parsed.text.strip()) < len(parsed.page_texts) * SCANNED_PAGE_MIN_CHARS:
+            raise OcrUnavailableError(
+                "В PDF нет текстового слоя (скан), а распознавание текста (Tesseract) недоступно"
+            )
+        return parsed
+
+    started = time.perf_counter()
+    texts, cached = recognize_pages(path, parsed.empty_pages, on_progress)
+    page_texts = [texts.get(i, text) for i, text in enumerate(parsed.page_texts)]
+    return replace(
+        parsed,
+        text="\n".join(page_texts).strip()[:MAX_CHARS],
+        page_texts=page_texts,
+        ocr_pages=len(texts),
+        ocr_cached=cached,
+        ocr_seconds=time.perf_counter() - started,
+    )
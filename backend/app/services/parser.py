@@ -1,55 +1,271 @@
 from __future__ import annotations
 
+import io
+import os
+import time
+import zipfile
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Iterator, Optional
 
-import pdfplumber
-from docx import Document
+from backend.app.services.docx_reader import extract_docx
 
-MAX_CHARS = 200_000
+# Страховочный предел против патологических файлов; длинные договоры
+# больше не обрезаются — анализатор делит их на фрагменты
+MAX_CHARS = int(os.getenv("RISQ_MAX_CHARS", "5000000"))
+
+# Бэкенд извлечения текста из PDF: pdfplumber (по умолчанию) / pdfminer / pdfium
+PDF_BACKEND = os.getenv("RISQ_PDF_BACKEND", "pdfplumber")
+# Параллельное извлечение по диапазонам страниц в пуле процессов (пул передаёт вызывающий:
+# у сервиса это пул парсинга планировщика, у CLI — свой на время пакета)
+PDF_WORKERS = int(os.getenv("RISQ_PDF_WORKERS") or os.cpu_count() or 1)
+PDF_PAGES_PER_TASK = int(os.getenv("RISQ_PDF_PAGES_PER_TASK", "8"))
+
+PDF_BACKENDS = ("pdfplumber", "pdfminer", "pdfium")
+
+# Страница с меньшим числом символов считается сканом без текстового слоя -> OCR
+SCANNED_PAGE_MIN_CHARS = int(os.getenv("RISQ_OCR_MIN_CHARS", "20"))
+
+
+@dataclass
+class ParseResult:
+    text: str
+    pages: int
+    backend: str = ""
+    pages_extracted: int = 0
+    page_seconds: list[float] = field(default_factory=list)
+    seconds: float = 0.0
+    # Тексты страниц PDF (для подстановки OCR) и номера страниц без текстового слоя
+    page_texts: list[str] = field(default_factory=list, repr=False)
+    empty_pages: list[int] = field(default_factory=list)
+    ocr_pages: int = 0
+    ocr_cached: int = 0
+    ocr_seconds: float = 0.0
+
+    def info(self) -> dict:
+        info = {
+            "backend": self.backend,
+            "pages": self.pages,
+            "pages_extracted": self.pages_extracted,
+            "seconds": round(self.seconds, 4),
+            "page_seconds": [round(s, 4) for s in self.page_seconds],
+        }
+        if self.empty_pages:
+            info["scanned_pages"] = len(self.empty_pages)
+            info["ocr_pages"] = self.ocr_pages
+            info["ocr_cached"] = self.ocr_cached
+            info["ocr_seconds"] = round(self.ocr_seconds, 4)
+        return info
 
 
 def _truncate(text: str) -> str:
     return text[:MAX_CHARS]
 
 
-def parse_pdf(path: Path) -> tuple[str, int]:
-    text_parts: list[str] = []
+# Процесс пула парсинга (ставит initializer пула). Проверять родительский процесс нельзя:
+# воркеры uvicorn (--workers, --reload) тоже дочерние, но пул им нужен
+_PARSE_WORKER = False
+
+
+def mark_parse_worker() -> None:
+    global _PARSE_WORKER
+    _PARSE_WORKER = True
+
+
+def create_parse_pool(workers: int = PDF_WORKERS) -> ProcessPoolExecutor:
+    return ProcessPoolExecutor(max_workers=max(1, workers), initializer=mark_parse_worker)
+
+
+def _in_worker_process() -> bool:
+    return _PARSE_WORKER
+
+
+def _pdf_page_count(path: Path, backend: str) -> int:
+    if backend == "pdfium":
+        import pypdfium2 as pdfium
+
+        pdf = pdfium.PdfDocument(str(path))
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    import pdfplumber
+
     with pdfplumber.open(path) as pdf:
-        pages = len(pdf.pages)
+        return len(pdf.pages)
+
+
+def _iter_pdfplumber(path: Path, start: int, stop: int) -> Iterator[str]:
+    import pdfplumber
+
+    # pdfplumber нумерует страницы с 1
+    with pdfplumber.open(path, pages=list(range(start + 1, stop + 1))) as pdf:
         for page in pdf.pages:
-            page_text = page.extract_text() or ""
-            text_parts.append(page_text)
-    text = "\n".join(text_parts).strip()
-    return _truncate(text), pages
+            yield page.extract_text() or ""
+            page.close()
+
+
+def _iter_pdfminer(path: Path, start: int, stop: int) -> Iterator[str]:
+    # Низкоуровневый pdfminer без построения объектов pdfplumber
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    resources = PDFResourceManager(caching=True)
+    with open(path, "rb") as fp:
+        for page in PDFPage.get_pages(fp, pagenos=set(range(start, stop))):
+            out = io.StringIO()
+            device = TextConverter(resources, out, laparams=LAParams())
+            PDFPageInterpreter(resources, device).process_page(page)
+            device.close()
+            yield out.getvalue()
+
+
+def _iter_pdfium(path: Path, start: int, stop: int) -> Iterator[str]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(str(path))
+    try:
+        for index in range(start, stop):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_bounded()
+            finally:
+                textpage.close()
+                page.close()
+    finally:
+        pdf.close()
+
+
+_PAGE_ITERATORS = {
+    "pdfplumber": _iter_pdfplumber,
+    "pdfminer": _iter_pdfminer,
+    "pdfium": _iter_pdfium,
+}
+
+
+def _extract_range(
+    path: Path, backend: str, start: int, stop: int, budget: int
+) -> list[tuple[str, float]]:
+    """
+    Извлекает страницы [start, stop); останавливается, когда набран budget символов
+    """
+    result: list[tuple[str, float]] = []
+    chars = 0
+    started = time.perf_counter()
+    for text in _PAGE_ITERATORS[backend](path, start, stop):
+        now = time.perf_counter()
+        result.append((text, now - started))
+        started = now
+        chars += len(text)
+        if chars >= budget:
+            break
+    return result
+
+
+def extract_pdf(
+    path: Path, backend: str = PDF_BACKEND, executor: Optional[Executor] = None
+) -> ParseResult:
+    """
+    executor — пул процессов: диапазоны страниц читаются в его процессах параллельно.
+    Без пула (и внутри процесса пула: вложенных пулов не создаём) — последовательно.
+    """
+    if backend not in PDF_BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд PDF: {backend}")
+
+    started = time.perf_counter()
+    pages = _pdf_page_count(path, backend)
+
+    ranges = [
+        (a, min(a + PDF_PAGES_PER_TASK, pages)) for a in range(0, pages, PDF_PAGES_PER_TASK)
+    ]
+    if executor is None or _in_worker_process():
+        extracted = [_extract_range(path, backend, 0, pages, MAX_CHARS)]
+    else:
+        futures: list[Future] = [
+            executor.submit(_extract_range, path, backend, a, b, MAX_CHARS) for a, b in ranges
+        ]
+        extracted = []
+        chars = 0
+        # Собираем по порядку; как только бюджет символов набран — отменяем хвост
+        for i, future in enumerate(futures):
+            part = future.result()
+            extracted.append(part)
+            chars += sum(len(text) for text, _ in part)
+            if chars >= MAX_CHARS:
+                for rest in futures[i + 1:]:
+                    rest.cancel()
+                break
+
+    page_texts = [text for part in extracted for text, _ in part]
+    text = "\n".join(page_texts).strip()
+    return ParseResult(
+        text=_truncate(text),
+        pages=pages,
+        backend=backend,
+        pages_extracted=len(page_texts),
+        page_seconds=[seconds for part in extracted for _, seconds in part],
+        seconds=time.perf_counter() - started,
+        page_texts=page_texts,
+        empty_pages=[
+            i for i, page in enumerate(page_texts) if len(page.strip()) < SCANNED_PAGE_MIN_CHARS
+        ],
+    )
+
+
+def parse_pdf(path: Path) -> tuple[str, int]:
+    result = extract_pdf(path)
+    return result.text, result.pages
 
 
 def parse_docx(path: Path) -> tuple[str, int]:
-    # Word/DOCX: нормальное количество страниц вытащить нельзя -> ставим 1
-    document = Document(str(path))
+    result = extract_docx(path, MAX_CHARS)
+    return result.text, result.pages
 
-    parts: list[str] = []
-    for p in document.paragraphs:
-        t = (p.text or "").strip()
-        if t:
-            parts.append(t)
 
-    text = "\n".join(parts).strip()
-    return _truncate(text), 1
+def _parse_docx_detailed(path: Path) -> ParseResult:
+    started = time.perf_counter()
+    try:
+        result = extract_docx(path, MAX_CHARS)
+    except zipfile.BadZipFile:
+        raise ValueError("Файл DOCX повреждён или не является архивом Word")
+    return ParseResult(
+        text=result.text,
+        pages=result.pages,
+        backend="docx-stream",
+        pages_extracted=result.pages,
+        seconds=time.perf_counter() - started,
+    )
 
 
-def parse_document(path: Path) -> tuple[str, int]:
+def parse_document_detailed(path: Path, executor: Optional[Executor] = None) -> ParseResult:
+    """
+    executor — пул процессов для CPU-тяжёлого разбора: страницы PDF делятся на диапазоны
+    по его процессам, DOCX разбирается в нём целиком
+    """
+    if executor is not None and _in_worker_process():
+        executor = None
     suffix = path.suffix.lower()
 
     if suffix == ".pdf":
-        return parse_pdf(path)
+        return extract_pdf(path, executor=executor)
 
-    # ВАЖНО: python-docx НЕ читает .doc (старый Word). Только .docx.
-    # Поэтому .doc — сразу ошибка, чтобы было понятно почему не работает.
+    # ВАЖНО: читаем только .docx (zip + XML). Старый бинарный .doc — не поддерживается,
+    # поэтому .doc — сразу ошибка, чтобы было понятно почему не работает.
     if suffix == ".docx":
-        return parse_docx(path)
+        if executor is not None:
+            return executor.submit(_parse_docx_detailed, path).result()
+        return _parse_docx_detailed(path)
 
     if suffix == ".doc":
         raise ValueError("Формат .doc (старый Word) не поддерживается. Сохрани файл как .docx.")
 
     raise ValueError("Неподдерживаемый формат файла. Поддерживаются: .pdf, .docx")
 
+
+def parse_document(path: Path) -> tuple[str, int]:
+    result = parse_document_detailed(path)
+    return result.text, result.pages
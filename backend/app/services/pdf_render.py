@@ -1,10 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 from jinja2 import Environment, FileSystemLoader, select_autoescape
-from weasyprint import HTML
+
+from backend.app.schemas.report import Report
+from backend.app.services.profiles import registry as profiles
+
+
+def report_context(report: Report) -> dict[str, Any]:
+    """
+    Контекст для HTML / PDF отчёта
+    """
+    rules = profiles.get(report.cover.contract_type).rules
+    return {
+        "report": report,
+        "parties": {"customer": rules.customer_label, "provider": rules.provider_label},
+        "analysis_date": report.cover.analysis_date,
+        "text_chars": getattr(report.cover, "chars", None),
+        "text_words": getattr(report.cover, "words", None),
+    }
 
 
 class PdfRenderer:
@@ -17,6 +37,83 @@ class PdfRenderer:
         )
 
     def render(self, template_name: str, context: dict[str, Any]) -> bytes:
+        # WeasyPrint (Pango/cairo, шрифты) грузится только в процессах пула рендера
+        from weasyprint import HTML
+
         template = self.env.get_template(template_name)
         html = template.render(**context, for_pdf=True)
         return HTML(string=html, base_url=str(self.static_path)).write_pdf()
+
+
+# Рендерер внутри процесса пула: создаётся один раз на процесс
+_process_renderer: Optional[PdfRenderer] = None
+
+
+def _process_renderer_for(templates_path: Path, static_path: Path) -> PdfRenderer:
+    global _process_renderer
+    if _process_renderer is None:
+        _process_renderer = PdfRenderer(templates_path, static_path)
+    return _process_renderer
+
+
+def _render_in_process(
+    templates_path: Path,
+    static_path: Path,
+    template_name: str,
+    context: dict[str, Any],
+) -> bytes:
+    return _process_renderer_for(templates_path, static_path).render(template_name, context)
+
+
+def _warmup_in_process(templates_path: Path, static_path: Path, template_name: str) -> float:
+    """
+    Загружает WeasyPrint и компилирует шаблон в процессе пула; время прогрева, сек
+    """
+    started = time.perf_counter()
+    import weasyprint  # noqa: F401
+
+    _process_renderer_for(templates_path, static_path).env.get_template(template_name)
+    return time.perf_counter() - started
+
+
+class PdfRenderPool:
+    """
+    Рендер PDF в пуле процессов: WeasyPrint не блокирует event loop
+    """
+
+    def __init__(self, templates_path: Path, static_path: Path, workers: int = 2) -> None:
+        self.templates_path = templates_path
+        self.static_path = static_path
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def submit(self, template_name: str, context: dict[str, Any]) -> Future:
+        return self._executor().submit(
+            _render_in_process, self.templates_path, self.static_path, template_name, context
+        )
+
+    def warmup(self, template_name: str) -> list[Future]:
+        """
+        Запускает процессы пула и прогревает в каждом WeasyPrint до первого запроса
+        """
+        executor = self._executor()
+        return [
+            executor.submit(_warmup_in_process, self.templates_path, self.static_path, template_name)
+            for _ in range(self.workers)
+        ]
+
+    async def render(self, template_name: str, context: dict[str, Any]) -> bytes:
+        return await asyncio.wrap_future(self.submit(template_name, context))
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
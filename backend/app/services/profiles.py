@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+from backend.app.schemas.report import Report
+from backend.app.services.rules import RULES_VERSION, RuleSet, make_rules
+
+# Профили анализаторов по типам договоров (промпт, разделы, стороны, модель)
+PROFILES_PATH = Path(
+    os.getenv(
+        "RISQ_PROFILES_PATH",
+        str(Path(__file__).resolve().parent.parent / "analyzer_profiles.json"),
+    )
+)
+
+# Structured output: структура задаётся JSON-схемой Report, длинный пример не отправляется
+STRUCTURED_OUTPUT = os.getenv("OPENAI_STRUCTURED_OUTPUT", "1") == "1"
+REPORT_SCHEMA = Report.model_json_schema()
+
+# Модель по классу профиля: простые типы договоров можно отправлять в более быструю модель
+DEFAULT_MODEL = "gpt-4o-mini"
+MODEL_TIERS = {"default": "OPENAI_MODEL", "fast": "OPENAI_MODEL_FAST"}
+
+OVERALL_STATUSES = [
+    "Низкий уровень внимания",
+    "Средний уровень внимания",
+    "Повышенное внимание",
+]
+
+SYSTEM_PROMPT = (
+    "Ты формируешь автоматический предварительный отчёт по {subject}. "
+    "Сервис НЕ является юридической консультацией.\n\n"
+    "Запрещено:\n"
+    "- рекомендации (\"следует\", \"рекомендуется\", \"нужно сделать\")\n"
+    "- оценка законности (\"незаконно\", \"нарушает\")\n"
+    "- выводы о выгоде/невыгоде\n\n"
+    "Разрешено:\n"
+    "- нейтральные наблюдения (\"обратите внимание\", \"может содержать риск\", "
+    "\"требует дополнительной проверки\", \"отсутствует раздел\")\n\n"
+    "Формат ответа: ТОЛЬКО валидный JSON. Без Markdown. Без комментариев. Без лишних полей.\n"
+)
+
+# Жёсткий шаблон ответа: модель должна заполнить поля внутри этой структуры
+JSON_TEMPLATE_EXAMPLE = """{
+  "cover": {
+    "contract_type": "Договор оказания услуг",
+    "analysis_date": "2026-01-21",
+    "pages": 2,
+    "overall_status": "Средний уровень внимания"
+  },
+  "summary": [
+    "Обратите внимание на сроки оказания услуг и порядок согласования этапов.",
+    "Может содержать риск из-за отсутствия/неясности порядка приёмки результата.",
+    "Уточните условия оплаты (сроки, основания для удержаний, штрафы).",
+    "Проверьте условия ответственности и ограничения ответственности сторон.",
+    "Обратите внимание на условия расторжения и сроки уведомления."
+  ],
+  "risk_map": [
+    {
+      "category": "сроки",
+      "description": "Сроки выполнения сформулированы неоднозначно, может потребоваться уточнение механизма продления/переноса.",
+      "clause_ref": "п. —"
+    }
+  ],
+  "atypical": [
+    {
+      "quote": "Исполнитель вправе изменять условия оказания услуг в одностороннем порядке…",
+      "note": "Нетипично: одностороннее изменение условий может требовать дополнительной проверки."
+    }
+  ],
+  "contradictions": [
+    {
+      "description": "В разных пунктах указаны разные сроки оплаты (например, 5 и 10 рабочих дней).",
+      "clause_refs": ["п. —", "п. —"]
+    }
+  ],
+  "duties_balance": {
+    "customer_count": 0,
+    "provider_count": 0,
+    "note": "Требуется дополнительная проверка распределения обязанностей: количество обязанностей сторон может быть неравномерным."
+  },
+  "needs_specialist": [
+    {
+      "item": "Сложная формулировка ответственности/штрафов — требуется проверка специалистом.",
+      "clause_ref": "п. —"
+    }
+  ],
+  "missing_sections": ["форс-мажор"],
+  "disclaimer": "Отчёт сформирован автоматически и не является юридической консультацией."
+}"""
+
+INSTRUCTIONS = (
+    "Сформируй отчёт строго по заданной структуре и типам.\n"
+    "Правила заполнения:\n"
+    "- summary: строго 5–7 пунктов.\n"
+    "- clause_ref, если неизвестно: ставь \"—\".\n"
+    "- risk_map/atypical/contradictions/needs_specialist/missing_sections могут быть пустыми, "
+    "но старайся найти хотя бы 2–4 элемента в risk_map, если в тексте есть материал.\n"
+    "- duties_balance: customer_count — обязанности стороны «{customer}», provider_count — "
+    "«{provider}»; заполни численно (примерно), если нельзя — поставь 0 и нейтральную note.\n"
+    "- overall_status выбирай из: {statuses}.\n"
+    "- missing_sections выбирай из: {sections}.\n"
+    "Обрати особое внимание на:\n{focus}\n"
+)
+
+
+def _quoted(values: list[str]) -> str:
+    return " / ".join(f"\"{value}\"" for value in values)
+
+
+@dataclass(eq=False)
+class AnalyzerProfile:
+    """
+    Скомпилированный профиль типа договора. Всё, что не зависит от конкретного
+    договора, собирается один раз при загрузке: системное сообщение — общий
+    неизменный префикс всех запросов этого типа (кэш промптов на стороне провайдера).
+    """
+
+    key: str
+    name: str
+    rules: RuleSet
+    summary_fill: tuple[str, ...]
+    system_prompt: str
+    response_format: dict[str, Any]
+    version: str
+    # Явная модель из конфига; иначе — модель класса model_tier из окружения
+    model: Optional[str] = None
+    model_tier: str = "default"
+
+    @property
+    def sections(self) -> list[str]:
+        return list(self.rules.sections)
+
+    def model_name(self) -> str:
+        if self.model:
+            return self.model
+        tier_env = MODEL_TIERS.get(self.model_tier, MODEL_TIERS["default"])
+        return os.getenv(tier_env) or os.getenv(MODEL_TIERS["default"], DEFAULT_MODEL)
+
+
+def _schema_for(sections: list[str]) -> dict[str, Any]:
+    # Допустимые значения прямо в схеме: модель не придумывает свои разделы и статусы
+    schema = copy.deepcopy(REPORT_SCHEMA)
+    schema["properties"]["missing_sections"]["items"] = {"type": "string", "enum": sections}
+    schema["$defs"]["ReportCover"]["properties"]["overall_status"]["enum"] = OVERALL_STATUSES
+    return schema
+
+
+def _example_for(name: str, sections: list[str]) -> str:
+    example = json.loads(JSON_TEMPLATE_EXAMPLE)
+    example["cover"]["contract_type"] = name
+    example["missing_sections"] = sections[:1]
+    return json.dumps(example, ensure_ascii=False, indent=2)
+
+
+def compile_profile(raw: dict[str, Any]) -> AnalyzerProfile:
+    try:
+        key, name, subject = raw["key"], raw["name"], raw["subject"]
+        customer, provider = raw["parties"]["customer"], raw["parties"]["provider"]
+        sections: dict[str, str] = raw["sections"]
+    except KeyError as exc:
+        raise ValueError(f"Профиль {raw.get('key', '?')}: нет поля {exc.args[0]}") from exc
+    if raw.get("model_tier", "default") not in MODEL_TIERS:
+        raise ValueError(f"Профиль {key}: неизвестный model_tier {raw['model_tier']}")
+
+    rules = make_rules(
+        sections,
+        customer=customer["pattern"],
+        provider=provider["pattern"],
+        customer_label=customer["label"],
+        provider_label=provider["label"],
+    )
+    names = list(sections)
+    instructions = INSTRUCTIONS.format(
+        customer=customer["label"],
+        provider=provider["label"],
+        statuses=_quoted(OVERALL_STATUSES),
+        sections=_quoted(names),
+        focus="\n".join(f"- {item}" for item in raw.get("focus", [])),
+    )
+    if STRUCTURED_OUTPUT:
+        schema = _schema_for(names)
+        structure = "Структура ответа задана JSON-схемой.\n\n"
+        response_format: dict[str, Any] = {
+            "type": "json_schema",
+            "json_schema": {"name": "contract_report", "schema": schema},
+        }
+        structure_version = json.dumps(schema, sort_keys=True)
+    else:
+        example = _example_for(name, names)
+        structure = f"Ниже пример СТРОГОЙ структуры JSON (ориентир по полям и типам):\n{example}\n\n"
+        response_format = {"type": "json_object"}
+        structure_version = example
+
+    system_prompt = (
+        SYSTEM_PROMPT.format(subject=subject)
+        + f"\nТип договора: {name}\n\n"
+        + structure
+        + instructions
+    )
+    summary_fill = tuple(raw.get("summary_fill") or ())
+    version = hashlib.sha256(
+        "\x1f".join(
+            [
+                system_prompt,
+                structure_version,
+                json.dumps(sections, sort_keys=True, ensure_ascii=False),
+                json.dumps([customer, provider], sort_keys=True, ensure_ascii=False),
+                *summary_fill,
+                RULES_VERSION,
+            ]
+        ).encode("utf-8")
+    ).hexdigest()[:16]
+
+    return AnalyzerProfile(
+        key=key,
+        name=name,
+        rules=rules,
+        summary_fill=summary_fill,
+        system_prompt=system_prompt,
+        response_format=response_format,
+        version=version,
+        model=raw.get("model"),
+        model_tier=raw.get("model_tier", "default"),
+    )
+
+
+class ProfileRegistry:
+    def __init__(self, profiles: list[AnalyzerProfile], default: str) -> None:
+        if not profiles:
+            raise ValueError("Нет ни одного профиля анализатора")
+        self._by_key = {profile.key: profile for profile in profiles}
+        self._by_name = {profile.name: profile for profile in profiles}
+        if default not in self._by_key:
+            raise ValueError(f"Профиль по умолчанию {default} не найден")
+        self.default = self._by_key[default]
+        # Действующие версии промптов: у каждого типа договора своя, правка одного
+        # профиля инвалидирует в кэше только отчёты этого типа
+        self.versions = frozenset(profile.version for profile in profiles)
+
+    def names(self) -> list[str]:
+        return list(self._by_name)
+
+    def __contains__(self, contract_type: object) -> bool:
+        return contract_type in self._by_name or contract_type in self._by_key
+
+    def get(self, contract_type: Optional[str] = None) -> AnalyzerProfile:
+        """
+        Профиль по названию или ключу типа договора; неизвестный тип — профиль по умолчанию
+        """
+        if not contract_type:
+            return self.default
+        return self._by_name.get(contract_type) or self._by_key.get(contract_type) or self.default
+
+
+def load_profiles(path: Path = PROFILES_PATH) -> ProfileRegistry:
+    config = json.loads(path.read_text(encoding="utf-8"))
+    profiles = [compile_profile(raw) for raw in config["profiles"]]
+    return ProfileRegistry(profiles, config.get("default") or profiles[0].key)
+
+
+# Загружаются и компилируются один раз при старте процесса
+registry = load_profiles()
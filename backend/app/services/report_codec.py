@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, Iterable, Union
+
+from backend.app.schemas.report import Report
+
+try:
+    import msgpack
+except ImportError:  # msgpack необязателен: без него — сжатый JSON
+    msgpack = None
+
+# Первый байт закодированного отчёта — формат. Старые записи (zlib JSON без
+# префикса) начинаются с заголовка zlib 0x78 и читаются как раньше.
+_MSGPACK = b"\x01"
+_JSON = b"\x02"
+
+_ZLIB_LEVEL = 6
+
+
+def encode_report(report: Union[Report, dict[str, Any]]) -> bytes:
+    """
+    Компактное представление отчёта: msgpack (или JSON) от model_dump, сжатый zlib
+    """
+    data = report.model_dump(mode="json", warnings=False) if isinstance(report, Report) else report
+    if msgpack is not None:
+        return _MSGPACK + zlib.compress(msgpack.packb(data, use_bin_type=True), _ZLIB_LEVEL)
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _JSON + zlib.compress(payload, _ZLIB_LEVEL)
+
+
+def decode_report_data(payload: Union[bytes, str]) -> dict[str, Any]:
+    """
+    Отчёт как dict без построения pydantic-модели (для JSON API)
+    """
+    if isinstance(payload, str):
+        return json.loads(payload)
+    payload = bytes(payload)
+    prefix, body = payload[:1], payload[1:]
+    if prefix == _MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("Отчёт сохранён в msgpack, а пакет msgpack не установлен")
+        return msgpack.unpackb(zlib.decompress(body), raw=False)
+    if prefix == _JSON:
+        return json.loads(zlib.decompress(body))
+    return json.loads(zlib.decompress(payload))
+
+
+def decode_report(payload: Union[bytes, str]) -> Report:
+    return Report.model_validate(decode_report_data(payload))
+
+
+def select_fields(data: dict[str, Any], fields: Iterable[str]) -> dict[str, Any]:
+    """
+    Подмножество отчёта по путям вида "cover" или "cover.overall_status".
+    Неизвестное поле — KeyError с его путём.
+    """
+    result: dict[str, Any] = {}
+    for path in fields:
+        source: Any = data
+        target = result
+        parts = path.split(".")
+        for depth, part in enumerate(parts):
+            if not isinstance(source, dict) or part not in source:
+                raise KeyError(".".join(parts[: depth + 1]))
+            source = source[part]
+            if depth == len(parts) - 1:
+                target[part] = source
+            else:
+                target = target.setdefault(part, {})
+    return result
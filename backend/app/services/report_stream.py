@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from backend.app.schemas.report import Report
+from backend.app.services.json_repair import coerce_field, coerce_item
+
+# (kind, key, value): kind — "field" (готовое поле верхнего уровня) или "item" (элемент списка)
+StreamEvent = tuple[str, str, Any]
+
+_WHITESPACE = " \t\r\n"
+
+
+class ReportStreamParser:
+    """
+    Инкрементальный разбор JSON-отчёта по мере генерации: отдаёт готовые поля
+    верхнего уровня и готовые элементы списков, не дожидаясь конца ответа.
+    Каждый символ просматривается один раз.
+    """
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._key: Optional[str] = None
+        self._after_colon = False
+        self._value_start: Optional[int] = None
+        self._in_array = False
+        self._item_start: Optional[int] = None
+        self.done = False
+
+    def feed(self, chunk: str) -> list[StreamEvent]:
+        self._buf += chunk
+        events: list[StreamEvent] = []
+        buf = self._buf
+        for i in range(self._pos, len(buf)):
+            if self.done:
+                break
+            self._step(buf, i, buf[i], events)
+        self._pos = len(buf)
+        return events
+
+    def _step(self, buf: str, i: int, ch: str, events: list[StreamEvent]) -> None:
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif ch == "\\":
+                self._escaped = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 1 and not self._after_colon:
+                    self._key = self._loads(buf[self._string_start:i + 1])
+            return
+
+        if ch in _WHITESPACE:
+            return
+
+        if self._depth == 0:
+            # Всё до корневого объекта (```json и т.п.) пропускаем
+            if ch == "{":
+                self._depth = 1
+            return
+
+        if self._depth == 1:
+            if ch == ":":
+                self._after_colon = True
+            elif ch in ",}":
+                self._emit_field(buf, i, events)
+                if ch == "}":
+                    self._depth = 0
+                    self.done = True
+            elif self._after_colon and self._value_start is None:
+                self._value_start = i
+                self._open(ch, i)
+            elif ch == '"':
+                self._open(ch, i)
+            return
+
+        # Глубже корня: следим за элементами списка верхнего уровня
+        top_array = self._depth == 2 and self._in_array
+        if ch == '"':
+            if top_array and self._item_start is None:
+                self._item_start = i
+            self._open(ch, i)
+        elif ch in "[{":
+            if top_array and self._item_start is None:
+                self._item_start = i
+            self._depth += 1
+        elif ch in "]}":
+            if top_array:
+                self._emit_item(buf, i, events)
+                self._in_array = False
+            self._depth -= 1
+        elif ch == "," and top_array:
+            self._emit_item(buf, i, events)
+        elif top_array and self._item_start is None:
+            self._item_start = i
+
+    def _open(self, ch: str, i: int) -> None:
+        if ch == '"':
+            self._in_string = True
+            self._string_start = i
+        elif ch in "[{":
+            self._depth += 1
+            self._in_array = ch == "[" and self._depth == 2
+
+    def _emit_field(self, buf: str, end: int, events: list[StreamEvent]) -> None:
+        if self._key is not None and self._value_start is not None:
+            value = self._loads(buf[self._value_start:end])
+            if value is not None:
+                events.append(("field", self._key, value))
+        self._key = None
+        self._after_colon = False
+        self._value_start = None
+
+    def _emit_item(self, buf: str, end: int, events: list[StreamEvent]) -> None:
+        if self._key is not None and self._item_start is not None:
+            value = self._loads(buf[self._item_start:end])
+            if value is not None:
+                events.append(("item", self._key, value))
+        self._item_start = None
+
+    @staticmethod
+    def _loads(text: str) -> Any:
+        try:
+            return json.loads(text, strict=False)
+        except json.JSONDecodeError:
+            return None
+
+
+class PartialReport:
+    """
+    Черновик отчёта из потоковых ответов (по одному потоку на фрагмент договора).
+    Списки собираются из всех фрагментов, прочие поля — из первого, где они готовы.
+    """
+
+    def __init__(
+        self,
+        contract_type: str,
+        pages: int,
+        on_change: Optional[Callable[[dict], None]] = None,
+        min_interval: float = 0.3,
+    ) -> None:
+        self.contract_type = contract_type
+        self.pages = pages
+        self.on_change = on_change
+        # Не чаще раза в min_interval: on_change вызывается в LLM-loop (см. LatestDraft)
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._parts: dict[int, dict[str, Any]] = {}
+        self._published = 0.0
+
+    def reset(self, part: int) -> None:
+        """
+        Поток фрагмента начинается заново (повтор запроса после обрыва)
+        """
+        with self._lock:
+            self._parts.pop(part, None)
+
+    def apply(self, part: int, events: list[StreamEvent]) -> None:
+        changed = False
+        with self._lock:
+            data = self._parts.setdefault(part, {})
+            for kind, key, value in events:
+                if key not in Report.model_fields:
+                    continue
+                if kind == "item":
+                    item = coerce_item(Report, key, value)
+                    if item is not None:
+                        data.setdefault(key, []).append(item)
+                        changed = True
+                elif key not in data or not isinstance(data[key], list):
+                    # Готовый список целиком уже пришёл поэлементно
+                    data[key] = coerce_field(Report, key, value)
+                    changed = True
+        if not changed or self.on_change is None:
+            return
+        now = time.monotonic()
+        if now - self._published >= self.min_interval:
+            self._published = now
+            self.on_change(self.snapshot())
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            parts = [self._parts[i] for i in sorted(self._parts)]
+        result: dict[str, Any] = {}
+        for data in parts:
+            for key, value in data.items():
+                if isinstance(value, list):
+                    seen = result.setdefault(key, [])
+                    seen.extend(v for v in value if v not in seen)
+                else:
+                    result.setdefault(key, value)
+        cover = dict(result.get("cover") or {})
+        cover.update({"contract_type": self.contract_type, "pages": self.pages})
+        result["cover"] = cover
+        return result
+
+
+class LatestDraft:
+    """
+    Передача черновиков из LLM-loop в поток-писатель. Loop только кладёт снимок
+    (без I/O), писатель забирает самый свежий — промежуточные снимки отбрасываются,
+    поэтому медленная запись в storage не копит очередь и не держит loop.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._draft: Optional[dict] = None
+        self._closed = False
+
+    def put(self, draft: dict) -> None:
+        with self._cond:
+            self._draft = draft
+            self._cond.notify()
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def drain(self, write: Callable[[dict], None]) -> None:
+        """
+        Пишет черновики до close(); после close() неотправленный снимок не нужен —
+        следом сохраняется готовый отчёт
+        """
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._draft is not None or self._closed)
+                if self._closed:
+                    return
+                draft, self._draft = self._draft, None
+            try:
+                write(draft)
+            except Exception:
+                # Черновик — не результат: ошибка записи не должна ронять анализ
+                continue
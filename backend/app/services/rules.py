@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from datetime import date
+
+from backend.app.schemas.report import DutiesBalance, Report, ReportCover, RiskItem
+
+# Меняется при изменении правил или формата подсказок -> входит в версию промпта
+RULES_VERSION = "1"
+
+# Номер пункта в начале строки: "5", "5.", "5.2", "5.2.1."
+_CLAUSE = re.compile(r"^\s*(\d{1,3}(?:\.\d{1,3}){0,3})\.?\s+(\S.*)$")
+# Заголовок раздела: "5. ОТВЕТСТВЕННОСТЬ СТОРОН" / "Раздел 5. Ответственность сторон"
+_HEADING_WORD = re.compile(r"^\s*(?:раздел|статья|глава)\s+(\S+?)\.?\s+(\S.{1,100})$", re.IGNORECASE)
+
+_DUTY = r"(?:обязан\w*|обязуется|обязуются|должен|должна|должны)"
+# Подпункт перечня: "а)", "1)", "-", "•", "5.2.1."
+_LIST_ITEM = re.compile(r"^\s*(?:[а-яa-z]\)|\d{1,2}\)|[-–—•]|\d{1,3}(?:\.\d{1,3}){2,3}\.?)\s+\S", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """
+    Правила локального разбора для типа договора: обязательные разделы и стороны
+    (customer — сторона-«заказчик»: покупатель, арендатор…; provider — «исполнитель»)
+    """
+
+    sections: dict[str, re.Pattern[str]]
+    obligation: re.Pattern[str]
+    obligation_heading: re.Pattern[str]
+    customer_label: str = "заказчик"
+    provider_label: str = "исполнитель"
+
+
+def make_rules(
+    sections: dict[str, str],
+    customer: str,
+    provider: str,
+    customer_label: str = "заказчик",
+    provider_label: str = "исполнитель",
+) -> RuleSet:
+    """
+    sections — {раздел: regex}; customer/provider — regex начала названия стороны ("заказчик")
+    """
+    party = rf"(?:(?P<customer>(?:{customer})\w*)|(?P<provider>(?:{provider})\w*))"
+    return RuleSet(
+        sections={name: re.compile(pattern, re.IGNORECASE) for name, pattern in sections.items()},
+        # "Исполнитель обязан ..." / "Исполнитель обязуется:"
+        obligation=re.compile(
+            rf"\b{party}\s+(?:\w+\s+){{0,2}}?{_DUTY}\b(?P<colon>[^.]*:\s*$)?", re.IGNORECASE
+        ),
+        # "Обязанности Исполнителя" (заголовок перечня)
+        obligation_heading=re.compile(rf"\bобязанности\s+{party}", re.IGNORECASE),
+        customer_label=customer_label,
+        provider_label=provider_label,
+    )
+
+
+# Договор оказания услуг: правила по умолчанию
+DEFAULT_RULES = make_rules(
+    {
+        "форс-мажор": r"форс[\s-]*мажор|непреодолим\w*\s+сил",
+        "ответственность": r"ответственност\w*\s+сторон|\bнеустойк|\bштраф\w*|\bпени\b",
+        "порядок расторжения": r"расторж\w*|отказ\w*\s+от\s+(?:исполнения\s+)?договора",
+    },
+    customer="заказчик",
+    provider="исполнител",
+)
+SECTION_PATTERNS = DEFAULT_RULES.sections
+
+
+@dataclass
+class RuleFindings:
+    clauses: list[str] = field(default_factory=list)
+    headings: list[tuple[str, str]] = field(default_factory=list)
+    customer_count: int = 0
+    provider_count: int = 0
+    customer_refs: list[str] = field(default_factory=list)
+    provider_refs: list[str] = field(default_factory=list)
+    section_refs: dict[str, str] = field(default_factory=dict)
+    # Обязательные разделы для типа договора
+    sections: tuple[str, ...] = tuple(SECTION_PATTERNS)
+
+    @property
+    def missing_sections(self) -> list[str]:
+        return [name for name in self.sections if name not in self.section_refs]
+
+
+def _is_heading(title: str) -> bool:
+    letters = [c for c in title if c.isalpha()]
+    if not letters or len(title) > 100 or title.rstrip().endswith((".", ";", ",", ":")):
+        return False
+    upper = sum(1 for c in letters if c.isupper())
+    return upper / len(letters) > 0.7 or len(title.split()) <= 6
+
+
+def _party_key(match: re.Match[str]) -> str:
+    return "customer" if match.group("customer") else "provider"
+
+
+def analyze_rules(text: str, rules: RuleSet = DEFAULT_RULES) -> RuleFindings:
+    """
+    Один линейный проход по строкам: нумерация, заголовки, обязанности сторон, разделы
+    """
+    findings = RuleFindings(sections=tuple(rules.sections))
+    current_ref = "—"
+    # Сторона, чей перечень обязанностей сейчас идёт подпунктами
+    listing: str | None = None
+
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+
+        clause = _CLAUSE.match(line)
+        heading_word = _HEADING_WORD.match(line)
+        if clause:
+            current_ref = clause.group(1)
+            findings.clauses.append(current_ref)
+            if "." not in current_ref and _is_heading(clause.group(2)):
+                findings.headings.append((current_ref, clause.group(2).strip()))
+        elif heading_word:
+            findings.headings.append((heading_word.group(1), heading_word.group(2).strip()))
+
+        ref = f"п. {current_ref}"
+        for name, pattern in rules.sections.items():
+            if name not in findings.section_refs and pattern.search(stripped):
+                findings.section_refs[name] = ref
+
+        obligations = list(rules.obligation.finditer(stripped))
+        if obligations:
+            listing = None
+            parties = []
+            for match in obligations:
+                party = _party_key(match)
+                # "Исполнитель обязуется:" — дальше идут подпункты, считаем их
+                if match.group("colon"):
+                    listing = party
+                else:
+                    parties.append(party)
+        elif heading := rules.obligation_heading.search(stripped):
+            listing = _party_key(heading)
+            continue
+        elif listing and _LIST_ITEM.match(line):
+            parties = [listing]
+        else:
+            if clause and "." not in current_ref:
+                listing = None
+            continue
+
+        for party in parties:
+            if party == "customer":
+                findings.customer_count += 1
+                findings.customer_refs.append(ref)
+            else:
+                findings.provider_count += 1
+                findings.provider_refs.append(ref)
+
+    return findings
+
+
+def hints_message(findings: RuleFindings) -> str:
+    """
+    Компактные подсказки для модели: то, что уже посчитано локально
+    """
+    hints = {
+        "headings": [f"{num}. {title}" for num, title in findings.headings[:40]],
+        "duties": {
+            "customer_count": findings.customer_count,
+            "provider_count": findings.provider_count,
+        },
+        "sections_found": findings.section_refs,
+        "missing_sections": findings.missing_sections,
+    }
+    return (
+        "Локальный разбор (уже посчитано, не пересчитывай; duties_balance и "
+        "missing_sections будут подставлены автоматически; для clause_ref используй номера пунктов):\n"
+        + json.dumps(hints, ensure_ascii=False, separators=(",", ":"))
+    )
+
+
+def apply_findings(report: Report, findings: RuleFindings) -> Report:
+    """
+    Детерминированные поля отчёта берём из локального разбора
+    """
+    report.missing_sections = findings.missing_sections
+    if findings.customer_count or findings.provider_count:
+        report.duties_balance.customer_count = findings.customer_count
+        report.duties_balance.provider_count = findings.provider_count
+    return report
+
+
+def _overall_status(findings: RuleFindings) -> str:
+    missing = len(findings.missing_sections)
+    if missing >= 2:
+        return "Повышенное внимание"
+    if missing == 1:
+        return "Средний уровень внимания"
+    return "Низкий уровень внимания"
+
+
+def rule_report(
+    findings: RuleFindings, contract_type: str, pages: int, rules: RuleSet = DEFAULT_RULES
+) -> Report:
+    """
+    Быстрый режим: отчёт только по правилам, без обращения к LLM
+    """
+    risk_map = [
+        RiskItem(
+            category=name,
+            description=f"Отсутствует раздел «{name}» — требует дополнительной проверки.",
+            clause_ref="п. —",
+        )
+        for name in findings.missing_sections
+    ]
+
+    customer, provider = findings.customer_count, findings.provider_count
+    if customer or provider:
+        note = (
+            f"Найдено обязанностей: {rules.customer_label} — {customer}, "
+            f"{rules.provider_label} — {provider} "
+            "(автоматический подсчёт, требует дополнительной проверки)."
+        )
+    else:
+        note = "Обязанности сторон автоматически выделить не удалось — требуется дополнительная проверка."
+
+    summary = [
+        f"Структура договора: найдено пунктов — {len(findings.clauses)}, разделов — {len(findings.headings)}.",
+    ]
+    if findings.missing_sections:
+        summary.append("Отсутствуют разделы: " + ", ".join(findings.missing_sections) + ".")
+    else:
+        summary.append(
+            "Разделы " + ", ".join(f"«{name}»" for name in findings.sections) + " присутствуют."
+        )
+
+    return Report(
+        cover=ReportCover(
+            contract_type=contract_type,
+            analysis_date=date.today().isoformat(),
+            overall_status=_overall_status(findings),
+            pages=pages,
+        ),
+        summary=summary,
+        risk_map=risk_map,
+        duties_balance=DutiesBalance(
+            customer_count=customer,
+            provider_count=provider,
+            note=note,
+        ),
+        missing_sections=findings.missing_sections,
+        disclaimer=(
+            "Отчёт сформирован автоматически по формальным признакам (быстрый режим, без ИИ) "
+            "и не является юридической консультацией."
+        ),
+    )
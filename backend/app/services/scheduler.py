@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+@dataclass(order=True)
+class _Task:
+    priority: int
+    seq: int
+    job_id: str = field(compare=False)
+    fn: Callable[..., Any] = field(compare=False)
+    args: tuple = field(compare=False, default=())
+    kwargs: dict = field(compare=False, default_factory=dict)
+
+
+class JobScheduler:
+    """
+    Планировщик задач анализа.
+
+    - фиксированное число воркеров (потоки: ожидание LLM — I/O)
+    - очередь ограниченной длины с приоритетами (меньше число — раньше)
+    - отдельный пул процессов для CPU-тяжёлого парсинга
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        max_queue: int = 32,
+        parse_workers: int = 2,
+        parse_initializer: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.parse_workers = max(1, parse_workers)
+        # Выполняется в каждом процессе пула парсинга при запуске
+        self.parse_initializer = parse_initializer
+
+        self._heap: list[_Task] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._active = 0
+        # Задачи, которые выполняются воркерами этого процесса прямо сейчас
+        self._running: set[str] = set()
+        self._stopping = False
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self) -> None:
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers, initializer=self.parse_initializer
+            )
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._worker_loop, name=f"risq-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+            pool, self._parse_pool = self._parse_pool, None
+        if wait:
+            for thread in threads:
+                thread.join(timeout=5)
+        if pool:
+            pool.shutdown(wait=wait, cancel_futures=True)
+
+    def submit(
+        self,
+        job_id: str,
+        fn: Callable[..., Any],
+        *args: Any,
+        priority: int = 0,
+        **kwargs: Any,
+    ) -> int:
+        """
+        Ставит задачу в очередь, возвращает позицию (1 — следующая на запуск)
+        """
+        with self._cond:
+            if len(self._heap) >= self.max_queue:
+                raise QueueFullError("Очередь анализа переполнена")
+            heapq.heappush(
+                self._heap, _Task(priority, next(self._seq), job_id, fn, args, kwargs)
+            )
+            self._cond.notify()
+            return self._position_locked(job_id) or len(self._heap)
+
+    def position(self, job_id: str) -> Optional[int]:
+        with self._cond:
+            return self._position_locked(job_id)
+
+    def has_job(self, job_id: str) -> bool:
+        """
+        Задача в очереди или выполняется в этом процессе (о её изменениях придут события)
+        """
+        with self._cond:
+            return job_id in self._running or any(t.job_id == job_id for t in self._heap)
+
+    def _position_locked(self, job_id: str) -> Optional[int]:
+        for index, task in enumerate(sorted(self._heap)):
+            if task.job_id == job_id:
+                return index + 1
+        return None
+
+    @property
+    def parse_pool(self) -> Optional[ProcessPoolExecutor]:
+        """
+        Пул процессов парсинга (None до start): в него же уходят диапазоны страниц PDF
+        """
+        return self._parse_pool
+
+    def warmup(self, fn: Callable[..., Any], *args: Any) -> list[Future]:
+        """
+        Запускает процессы парсинга заранее: fn (например, импорт тяжёлых модулей)
+        по разу на каждый процесс пула
+        """
+        pool = self._parse_pool
+        if pool is None:
+            return []
+        return [pool.submit(fn, *args) for _ in range(self.parse_workers)]
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "alive": sum(1 for t in self._threads if t.is_alive()),
+                "active": self._active,
+                "queued": len(self._heap),
+                "max_queue": self.max_queue,
+                "parse_workers": self.parse_workers,
+            }
+
+    def _worker_loop(self) -> None:
+        while True:
+            with self._cond:
+                while not self._heap and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                task = heapq.heappop(self._heap)
+                self._active += 1
+                self._running.add(task.job_id)
+            try:
+                task.fn(task.job_id, *task.args, **task.kwargs)
+            except Exception:
+                # Ошибки фиксирует сама задача (storage.set_status), воркер не должен падать
+                pass
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._running.discard(task.job_id)
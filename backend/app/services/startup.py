@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from backend.app.services import metrics
+
+# Тяжёлые зависимости: при импорте приложения не загружаются, их грузит фоновый прогрев
+HEAVY_MODULES = ("openai", "pdfplumber", "pypdfium2", "tiktoken")
+WARMUP_ENABLED = os.getenv("RISQ_WARMUP", "1") == "1"
+# Сколько ждать прогрева пулов процессов, сек
+WARMUP_TIMEOUT = float(os.getenv("RISQ_WARMUP_TIMEOUT", "120"))
+
+_STARTED_AT = time.perf_counter()
+
+
+def import_modules(names: Iterable[str]) -> tuple[dict[str, float], dict[str, str]]:
+    """
+    Импортирует модули по очереди: ({модуль: сек}, {модуль: ошибка}).
+    Уже загруженный модуль стоит ~0 — время честное только в свежем процессе.
+    """
+    seconds: dict[str, float] = {}
+    errors: dict[str, str] = {}
+    for name in names:
+        started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as exc:  # WeasyPrint без Pango падает с OSError, не ImportError
+            errors[name] = f"{type(exc).__name__}: {exc}"
+            continue
+        seconds[name] = round(time.perf_counter() - started, 4)
+    return seconds, errors
+
+
+def wait_futures(futures: list[Future], timeout: float = WARMUP_TIMEOUT) -> list[Any]:
+    done, pending = wait(futures, timeout=timeout)
+    if pending:
+        raise TimeoutError(f"Прогрев не завершился за {timeout:.0f} с")
+    return [future.result() for future in done]
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    fn: Callable[[], Any]
+    # Без обязательных шагов сервис не готов принимать задачи (readiness = 503)
+    required: bool = True
+
+
+@dataclass
+class _StepState:
+    status: str = "pending"
+    seconds: float = 0.0
+    error: Optional[str] = None
+
+
+@dataclass
+class Warmup:
+    """
+    Прогрев после старта: /health (liveness) отвечает сразу, /health/ready — когда
+    обязательные шаги выполнены. Необязательный шаг с ошибкой (например, PDF без Pango)
+    не блокирует готовность, но виден в состоянии.
+    """
+
+    steps: dict[str, _StepState] = field(default_factory=dict)
+    import_seconds: dict[str, float] = field(default_factory=dict)
+    ready_at: Optional[float] = None
+    failed: bool = False
+    _ready: threading.Event = field(default_factory=threading.Event, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def record_imports(self, seconds: dict[str, float]) -> None:
+        with self._lock:
+            self.import_seconds.update(seconds)
+
+    def start(self, steps: list[WarmupStep]) -> threading.Thread:
+        with self._lock:
+            for step in steps:
+                self.steps[step.name] = _StepState()
+        thread = threading.Thread(target=self._run, args=(steps,), name="risq-warmup", daemon=True)
+        thread.start()
+        return thread
+
+    def mark_ready(self) -> None:
+        with self._lock:
+            self.ready_at = time.perf_counter() - _STARTED_AT
+        self._ready.set()
+
+    def _run(self, steps: list[WarmupStep]) -> None:
+        # Готовность — сразу после последнего обязательного шага, необязательные догреваются
+        last_required = max((i for i, step in enumerate(steps) if step.required), default=-1)
+        if last_required < 0:
+            self.mark_ready()
+        for index, step in enumerate(steps):
+            state = self.steps[step.name]
+            state.status = "running"
+            started = time.perf_counter()
+            try:
+                step.fn()
+                state.status = "done"
+            except Exception as exc:
+                state.status = "error"
+                state.error = f"{type(exc).__name__}: {exc}"
+                if step.required:
+                    self.failed = True
+            finally:
+                state.seconds = round(time.perf_counter() - started, 4)
+            if index == last_required and not self.failed:
+                self.mark_ready()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def state(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self.ready,
+                "failed": self.failed,
+                "uptime": round(time.perf_counter() - _STARTED_AT, 3),
+                "ready_after": round(self.ready_at, 3) if self.ready_at is not None else None,
+                "steps": {
+                    name: {k: v for k, v in vars(step).items() if v is not None}
+                    for name, step in self.steps.items()
+                },
+                "imports": dict(self.import_seconds),
+            }
+
+    def collect(self) -> Iterator[metrics.Metric]:
+        yield metrics.gauge("risq_ready", "Прогрев завершён, сервис готов", float(self.ready))
+        with self._lock:
+            imports = dict(self.import_seconds)
+        yield metrics.labeled_gauge(
+            "risq_import_seconds", "Время импорта модуля при прогреве", "module", imports
+        )
+
+
+def measure_imports(modules: Iterable[str]) -> dict[str, Any]:
+    """
+    Холодный импорт каждого модуля в отдельном свежем процессе, сек.
+    Включает зависимости модуля, уже загруженные интерпретатором при старте не считаются.
+    """
+    # Замер без импорта самого приложения: иначе его зависимости уже загружены
+    code = (
+        "import importlib, json, sys, time\n"
+        "started = time.perf_counter()\n"
+        "try:\n"
+        "    importlib.import_module(sys.argv[1])\n"
+        "except Exception as exc:\n"
+        "    print(json.dumps({'error': f'{type(exc).__name__}: {exc}'}))\n"
+        "else:\n"
+        "    print(json.dumps({'import': round(time.perf_counter() - started, 4)}))\n"
+    )
+    result: dict[str, Any] = {}
+    for module in modules:
+        started = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", code, module], capture_output=True, text=True, check=False
+        )
+        row: dict[str, Any]
+        try:
+            row = json.loads(proc.stdout.strip().splitlines()[-1])
+        except (IndexError, ValueError):
+            row = {"error": (proc.stderr.strip().splitlines() or ["?"])[-1]}
+        row["process"] = round(time.perf_counter() - started, 4)
+        result[module] = row
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.app.services.startup",
+        description="Время холодного импорта модулей приложения и тяжёлых зависимостей",
+    )
+    parser.add_argument(
+        "modules",
+        nargs="*",
+        default=["backend.app.main", *HEAVY_MODULES, "weasyprint"],
+        help="модули (по умолчанию — приложение и тяжёлые зависимости)",
+    )
+    args = parser.parse_args(argv)
+    for module, row in measure_imports(args.modules).items():
+        if "error" in row:
+            print(f"{module:<24} ошибка: {row['error']}")
+        else:
+            print(f"{module:<24} {row['import']:8.3f} с  (процесс целиком {row['process']:.3f} с)")
+
+
+if __name__ == "__main__":
+    main()
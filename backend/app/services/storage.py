@@ -1,11 +1,27 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Optional
 from uuid import uuid4
 
 from backend.app.schemas.report import Report
+from backend.app.services.report_codec import decode_report, decode_report_data, encode_report
+
+FINISHED_STATUSES = ("done", "error")
+
+# Незавершённая задача без изменений дольше этого срока считается брошенной
+# (процесс упал или перезапущен посреди анализа) и помечается ошибкой
+STALE_JOB_SECONDS = int(os.getenv("RISQ_STALE_JOB_SECONDS", "1800"))
+STALE_JOB_ERROR = "Анализ прерван (сервис перезапущен или задача зависла). Загрузите договор повторно."
 
 
 @dataclass
@@ -16,13 +32,117 @@ class Job:
     created_at: datetime
     error: Optional[str] = None
     report: Optional[Report] = None
+    parse_info: Optional[dict[str, Any]] = None
+    usage: Optional[dict[str, Any]] = None
+    timings: Optional[dict[str, float]] = None
+    # Черновик отчёта при потоковом ответе LLM (до готовности report)
+    partial: Optional[dict[str, Any]] = None
+    # Отличия от предыдущей редакции договора (для /analyze/revision)
+    diff: Optional[dict[str, Any]] = None
+    finished_at: Optional[datetime] = None
+
+
+class BaseStorage(ABC):
+    """
+    Хранилище задач анализа. Завершённые задачи живут ttl_seconds.
+    """
+
+    def __init__(
+        self, ttl_seconds: int = 24 * 3600, stale_seconds: int = STALE_JOB_SECONDS
+    ) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.stale_seconds = stale_seconds
+        self._listeners: list[Callable[[str], None]] = []
+
+    def add_listener(self, callback: Callable[[str], None]) -> None:
+        """
+        callback(job_id) вызывается после каждого изменения статуса/отчёта
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, job_id: str) -> None:
+        for callback in self._listeners:
+            try:
+                callback(job_id)
+            except Exception:
+                pass
+
+    @abstractmethod
+    def create_job(self) -> Job: ...
+
+    @abstractmethod
+    def get_job(self, job_id: str) -> Optional[Job]: ...
+
+    @abstractmethod
+    def set_status(self, job_id: str, status: str, step: str, error: str | None = None) -> None: ...
+
+    @abstractmethod
+    def set_parse_info(self, job_id: str, info: dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def set_usage(self, job_id: str, usage: dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def set_timings(self, job_id: str, timings: dict[str, float]) -> None: ...
+
+    @abstractmethod
+    def set_partial(self, job_id: str, partial: dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def set_diff(self, job_id: str, diff: dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    def set_report(self, job_id: str, report: Report) -> None: ...
+
+    @abstractmethod
+    def get_report_data(self, job_id: str) -> Optional[dict[str, Any]]:
+        """
+        Отчёт как dict (для JSON API), без построения модели Report
+        """
+
+    @abstractmethod
+    def get_text(self, job_id: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def set_text(self, job_id: str, text: str) -> None: ...
 
+    @abstractmethod
+    def get_pdf(self, job_id: str) -> Optional[bytes]: ...
 
-class InMemoryStorage:
-    def __init__(self) -> None:
+    @abstractmethod
+    def set_pdf(self, job_id: str, pdf: bytes) -> None: ...
+
+    @abstractmethod
+    def fail_stale(self) -> int:
+        """
+        Помечает ошибкой queued/processing задачи, не менявшиеся дольше stale_seconds
+        """
+
+    @abstractmethod
+    def purge_expired(self) -> int: ...
+
+
+class InMemoryStorage(BaseStorage):
+    """
+    Хранилище в памяти одного процесса (для тестов и локального запуска).
+    Отчёты держим закодированными (report_codec), а не графом pydantic-объектов:
+    память почти не растёт с числом хранимых задач.
+    """
+
+    def __init__(
+        self, ttl_seconds: int = 24 * 3600, stale_seconds: int = STALE_JOB_SECONDS
+    ) -> None:
+        super().__init__(ttl_seconds, stale_seconds)
+        # Задачи меняют воркеры планировщика, читают обработчики запросов
+        self._lock = threading.Lock()
         self._jobs: dict[str, Job] = {}
+        self._updated: dict[str, float] = {}
+        self._reports: dict[str, bytes] = {}
+        self._pdfs: dict[str, bytes] = {}
+        self._texts: dict[str, str] = {}
 
     def create_job(self) -> Job:
+        self.purge_expired()
         job_id = str(uuid4())
         job = Job(
             job_id=job_id,
@@ -30,20 +150,383 @@ class InMemoryStorage:
             step="Ожидание запуска…",
             created_at=datetime.utcnow(),
         )
-        self._jobs[job_id] = job
+        with self._lock:
+            self._jobs[job_id] = job
+            self._updated[job_id] = time.time()
+        return replace(job)
+
+    def get_job(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = replace(job)
+            payload = self._reports.get(job_id)
+        if payload is not None:
+            job.report = decode_report(payload)
+        return job
+
+    def set_status(self, job_id: str, status: str, step: str, error: str | None = None) -> None:
+        with self._lock:
+            job = self._jobs[job_id]
+            job.status = status
+            job.step = step
+            job.error = error
+            if status in FINISHED_STATUSES:
+                job.finished_at = datetime.utcnow()
+            self._updated[job_id] = time.time()
+        self._notify(job_id)
+
+    def set_parse_info(self, job_id: str, info: dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id].parse_info = info
+
+    def set_usage(self, job_id: str, usage: dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id].usage = usage
+
+    def set_timings(self, job_id: str, timings: dict[str, float]) -> None:
+        with self._lock:
+            self._jobs[job_id].timings = timings
+
+    def set_partial(self, job_id: str, partial: dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id].partial = partial
+            self._updated[job_id] = time.time()
+        self._notify(job_id)
+
+    def set_diff(self, job_id: str, diff: dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job_id].diff = diff
+
+    def set_report(self, job_id: str, report: Report) -> None:
+        payload = encode_report(report)
+        with self._lock:
+            job = self._jobs[job_id]
+            self._reports[job_id] = payload
+            job.partial = None
+            self._pdfs.pop(job_id, None)
+            job.status = "done"
+            job.step = "Готово"
+            job.error = None
+            job.finished_at = datetime.utcnow()
+            self._updated[job_id] = time.time()
+        self._notify(job_id)
+
+    def get_report_data(self, job_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            payload = self._reports.get(job_id)
+        return decode_report_data(payload) if payload is not None else None
+
+    def get_pdf(self, job_id: str) -> Optional[bytes]:
+        with self._lock:
+            return self._pdfs.get(job_id)
+
+    def set_pdf(self, job_id: str, pdf: bytes) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._pdfs[job_id] = pdf
+
+    def get_text(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            return self._texts.get(job_id)
+
+    def set_text(self, job_id: str, text: str) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._texts[job_id] = text
+
+    def fail_stale(self) -> int:
+        deadline = time.time() - self.stale_seconds
+        with self._lock:
+            stale = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.status not in FINISHED_STATUSES and self._updated[job_id] < deadline
+            ]
+            for job_id in stale:
+                job = self._jobs[job_id]
+                job.status, job.step, job.error = "error", "Ошибка анализа", STALE_JOB_ERROR
+                job.finished_at = datetime.utcnow()
+        for job_id in stale:
+            self._notify(job_id)
+        return len(stale)
+
+    def purge_expired(self) -> int:
+        self.fail_stale()
+        deadline = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < deadline
+            ]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+                self._updated.pop(job_id, None)
+                self._reports.pop(job_id, None)
+                self._pdfs.pop(job_id, None)
+                self._texts.pop(job_id, None)
+        return len(expired)
+
+
+class SqliteStorage(BaseStorage):
+    """
+    Хранилище в SQLite (WAL): общее для нескольких процессов uvicorn.
+    Отчёт хранится в компактном виде (report_codec), текст договора — сжатым zlib.
+    """
+
+    PURGE_INTERVAL = 60.0
+
+    def __init__(
+        self, path: Path, ttl_seconds: int = 24 * 3600, stale_seconds: int = STALE_JOB_SECONDS
+    ) -> None:
+        super().__init__(ttl_seconds, stale_seconds)
+        self.path = path
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    step TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL,
+                    finished_at REAL,
+                    error TEXT,
+                    parse_info TEXT,
+                    usage TEXT,
+                    timings TEXT,
+                    partial TEXT,
+                    diff TEXT,
+                    report BLOB,
+                    pdf BLOB,
+                    text BLOB
+                )
+                """
+            )
+            # Миграция баз, созданных до появления колонок
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, kind in (
+                ("updated_at", "REAL"),
+                ("usage", "TEXT"),
+                ("timings", "TEXT"),
+                ("partial", "TEXT"),
+                ("diff", "TEXT"),
+                ("pdf", "BLOB"),
+                ("text", "BLOB"),
+            ):
+                if name not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status_finished ON jobs (status, finished_at)"
+            )
+
+    def _conn(self) -> sqlite3.Connection:
+        # Одно соединение на поток: sqlite3 не любит делить соединение между потоками
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.path), timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _row_to_job(self, row: tuple) -> Job:
+        (
+            job_id,
+            status,
+            step,
+            created_at,
+            finished_at,
+            error,
+            parse_info,
+            usage,
+            timings,
+            partial,
+            diff,
+            report,
+        ) = row
+        return Job(
+            job_id=job_id,
+            status=status,
+            step=step,
+            created_at=datetime.utcfromtimestamp(created_at),
+            error=error,
+            report=decode_report(report) if report else None,
+            parse_info=json.loads(parse_info) if parse_info else None,
+            usage=json.loads(usage) if usage else None,
+            timings=json.loads(timings) if timings else None,
+            partial=json.loads(partial) if partial else None,
+            diff=json.loads(diff) if diff else None,
+            finished_at=datetime.utcfromtimestamp(finished_at) if finished_at else None,
+        )
+
+    def create_job(self) -> Job:
+        if time.time() - self._last_purge > self.PURGE_INTERVAL:
+            self.purge_expired()
+
+        job = Job(
+            job_id=str(uuid4()),
+            status="queued",
+            step="Ожидание запуска…",
+            created_at=datetime.utcnow(),
+        )
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, status, step, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job.job_id, job.status, job.step, now, now),
+            )
         return job
 
     def get_job(self, job_id: str) -> Optional[Job]:
-        return self._jobs.get(job_id)
+        row = self._conn().execute(
+            "SELECT job_id, status, step, created_at, finished_at, error, "
+            "parse_info, usage, timings, partial, diff, report FROM jobs WHERE job_id = ?",
+            (job_id,),
+        ).fetchone()
+        return self._row_to_job(row) if row else None
 
     def set_status(self, job_id: str, status: str, step: str, error: str | None = None) -> None:
-        job = self._jobs[job_id]
-        job.status = status
-        job.step = step
-        job.error = error
+        now = time.time()
+        finished_at = now if status in FINISHED_STATUSES else None
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, step = ?, error = ?, finished_at = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                (status, step, error, finished_at, now, job_id),
+            )
+        self._notify(job_id)
+
+    def set_parse_info(self, job_id: str, info: dict[str, Any]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET parse_info = ? WHERE job_id = ?",
+                (json.dumps(info, ensure_ascii=False), job_id),
+            )
+
+    def set_usage(self, job_id: str, usage: dict[str, Any]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET usage = ? WHERE job_id = ?",
+                (json.dumps(usage), job_id),
+            )
+
+    def set_timings(self, job_id: str, timings: dict[str, float]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET timings = ? WHERE job_id = ?",
+                (json.dumps(timings), job_id),
+            )
+
+    def set_partial(self, job_id: str, partial: dict[str, Any]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET partial = ?, updated_at = ? WHERE job_id = ?",
+                (json.dumps(partial, ensure_ascii=False), time.time(), job_id),
+            )
+        self._notify(job_id)
+
+    def set_diff(self, job_id: str, diff: dict[str, Any]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET diff = ? WHERE job_id = ?",
+                (json.dumps(diff, ensure_ascii=False), job_id),
+            )
 
     def set_report(self, job_id: str, report: Report) -> None:
-        job = self._jobs[job_id]
-        job.report = report
-        job.status = "done"
-        job.step = "Готово"
+        payload = encode_report(report)
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET report = ?, pdf = NULL, partial = NULL, status = 'done', step = 'Готово', "
+                "error = NULL, finished_at = ?, updated_at = ? WHERE job_id = ?",
+                (payload, now, now, job_id),
+            )
+        self._notify(job_id)
+
+    def get_report_data(self, job_id: str) -> Optional[dict[str, Any]]:
+        row = self._conn().execute(
+            "SELECT report FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return decode_report_data(row[0]) if row and row[0] is not None else None
+
+    def get_pdf(self, job_id: str) -> Optional[bytes]:
+        row = self._conn().execute("SELECT pdf FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return bytes(row[0]) if row and row[0] is not None else None
+
+    def set_pdf(self, job_id: str, pdf: bytes) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE jobs SET pdf = ? WHERE job_id = ?", (pdf, job_id))
+
+    def get_text(self, job_id: str) -> Optional[str]:
+        row = self._conn().execute("SELECT text FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row and row[0] is not None else None
+
+    def set_text(self, job_id: str, text: str) -> None:
+        payload = zlib.compress(text.encode("utf-8"))
+        conn = self._conn()
+        with conn:
+            conn.execute("UPDATE jobs SET text = ? WHERE job_id = ?", (payload, job_id))
+
+    def fail_stale(self) -> int:
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            stale = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT job_id FROM jobs WHERE status NOT IN (?, ?) "
+                    "AND COALESCE(updated_at, created_at) < ?",
+                    (*FINISHED_STATUSES, now - self.stale_seconds),
+                )
+            ]
+            conn.executemany(
+                "UPDATE jobs SET status = 'error', step = 'Ошибка анализа', error = ?, "
+                "finished_at = ?, updated_at = ? WHERE job_id = ?",
+                [(STALE_JOB_ERROR, now, now, job_id) for job_id in stale],
+            )
+        for job_id in stale:
+            self._notify(job_id)
+        return len(stale)
+
+    def purge_expired(self) -> int:
+        self._last_purge = time.time()
+        self.fail_stale()
+        deadline = self._last_purge - self.ttl_seconds
+        conn = self._conn()
+        with conn:
+            return conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (*FINISHED_STATUSES, deadline),
+            ).rowcount
+
+
+def create_storage() -> BaseStorage:
+    """
+    Выбор хранилища по RISQ_STORAGE: sqlite (по умолчанию) или memory
+    """
+    ttl_seconds = int(os.getenv("RISQ_JOB_TTL", str(24 * 3600)))
+    backend = os.getenv("RISQ_STORAGE", "sqlite")
+    if backend == "memory":
+        return InMemoryStorage(ttl_seconds=ttl_seconds)
+    if backend == "sqlite":
+        path = Path(os.getenv("RISQ_STORAGE_PATH", "data/jobs.sqlite3"))
+        return SqliteStorage(path, ttl_seconds=ttl_seconds)
+    raise ValueError(f"Неизвестное хранилище задач: {backend}")
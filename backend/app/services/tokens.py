@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any
+
+try:
+    import tiktoken
+except ImportError:  # токенизатор необязателен: без него — грубая оценка по символам
+    tiktoken = None
+
+# Для русского текста BPE-токенизаторы дают примерно 3 символа на токен
+_CHARS_PER_TOKEN_FALLBACK = 3
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> Any:
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # Словарь BPE скачивается при первом обращении; без сети — оценка по символам
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // _CHARS_PER_TOKEN_FALLBACK + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+# Номера страниц: "- 3 -", "3", "Страница 3 из 10", "стр. 3"
+_PAGE_NUMBER = re.compile(
+    r"^\s*(?:[-–—]?\s*\d{1,4}\s*[-–—]?|(?:страница|стр\.?)\s*\d{1,4}(?:\s*(?:из|/)\s*\d{1,4})?)\s*$",
+    re.IGNORECASE,
+)
+# Линии под подпись / заполнители: "________", "…………", "......"
+_FILLER = re.compile(r"[_….]{4,}")
+_SPACES = re.compile(r"[ \t\u00a0\u2000-\u200b]+")
+
+
+def compact_text(text: str) -> str:
+    """
+    Убирает из извлечённого текста то, что не несёт смысла для анализа:
+    номера страниц, повторяющиеся колонтитулы, линии под подпись, лишние пробелы
+    """
+    lines = [_SPACES.sub(" ", _FILLER.sub(" ", line)).strip() for line in text.splitlines()]
+
+    # Короткие строки, повторяющиеся много раз, — колонтитулы
+    counts = Counter(line for line in lines if line and len(line) <= 80)
+    repeated = {line for line, n in counts.items() if n >= 3}
+
+    result: list[str] = []
+    seen_repeated: set[str] = set()
+    for line in lines:
+        if not line or _PAGE_NUMBER.match(line):
+            continue
+        if line in repeated:
+            if line in seen_repeated:
+                continue
+            seen_repeated.add(line)
+        result.append(line)
+    return "\n".join(result)
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CHUNK_SIZE = 1024 * 1024
+MAX_UPLOAD_BYTES = int(os.getenv("RISQ_MAX_UPLOAD_MB", "50")) * 1024 * 1024
+# Предел тела пакетной загрузки (все файлы и архивы запроса вместе)
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("RISQ_MAX_BATCH_UPLOAD_MB", "500")) * 1024 * 1024
+# Запас на поля формы и границы multipart сверх размера файла
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Сигнатуры форматов: PDF, DOCX (zip), старый .doc (OLE2)
+_PDF_MAGIC = b"%PDF-"
+_ZIP_MAGIC = b"PK\x03\x04"
+_OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+
+class UploadError(ValueError):
+    status_code = 400
+
+
+class UploadTooLargeError(UploadError):
+    status_code = 413
+
+
+def check_magic(suffix: str, head: bytes, allow_zip: bool = False) -> None:
+    """
+    Проверка сигнатуры по первым байтам файла — до создания задачи
+    """
+    if head.startswith(_OLE_MAGIC) or suffix == ".doc":
+        raise UploadError("Формат .doc (старый Word) не поддерживается. Сохрани файл как .docx.")
+    if suffix == ".pdf":
+        # Спецификация допускает мусор перед заголовком в пределах первого килобайта
+        if _PDF_MAGIC not in head[:1024]:
+            raise UploadError("Файл не похож на PDF")
+        return
+    if suffix == ".docx":
+        if not head.startswith(_ZIP_MAGIC):
+            raise UploadError("Файл не похож на DOCX")
+        return
+    if suffix == ".zip" and allow_zip:
+        if not head.startswith(_ZIP_MAGIC):
+            raise UploadError("Файл не похож на ZIP-архив")
+        return
+    raise UploadError("Неподдерживаемый формат файла. Поддерживаются: .pdf, .docx")
+
+
+async def save_upload(
+    file: UploadFile,
+    suffix: str,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_size: int = CHUNK_SIZE,
+    allow_zip: bool = False,
+) -> tuple[Path, str]:
+    """
+    Потоково пишет загрузку во временный файл, попутно считая sha256.
+    Возвращает путь к файлу и хэш содержимого.
+    """
+    too_large = f"Файл больше {max_bytes // (1024 * 1024)} МБ"
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(too_large)
+
+    digest = hashlib.sha256()
+    written = 0
+    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    path = Path(tmp.name)
+    try:
+        with tmp:
+            first = True
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                if first:
+                    check_magic(suffix, chunk, allow_zip)
+                    first = False
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(too_large)
+                digest.update(chunk)
+                await run_in_threadpool(tmp.write, chunk)
+            if first:
+                raise UploadError("Файл пустой")
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+
+    return path, digest.hexdigest()
+
+
+class UploadLimitMiddleware:
+    """
+    Отказ в слишком большой загрузке до разбора формы: Starlette сначала целиком
+    спулит multipart-тело и только потом вызывает обработчик. По Content-Length
+    отвечаем 413 сразу, не читая тело; без него — как только тело превысит предел.
+    """
+
+    def __init__(self, app: ASGIApp, limits: dict[str, int]) -> None:
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Запрос больше {limit // (1024 * 1024)} МБ"
+        length = Headers(scope=scope).get("content-length", "")
+        if length.isdigit() and int(length) > limit + MULTIPART_OVERHEAD:
+            response = JSONResponse({"detail": detail}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit + MULTIPART_OVERHEAD:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
@@ -1,18 +1,63 @@
 const stepEl = document.getElementById("step");
 const errorEl = document.getElementById("error");
 
-const steps = [
-  "Извлечение текста…",
-  "Анализ структуры…",
-  "Формирование отчёта…",
-];
-
-let stepIndex = 0;
-
-function rotateStep() {
-  if (!stepEl) return;
-  stepEl.textContent = steps[stepIndex % steps.length];
-  stepIndex += 1;
+const partialEl = document.getElementById("partial");
+
+let pollTimer = null;
+
+function fillList(container, items, render) {
+  container.replaceChildren(...items.map(render));
+}
+
+function renderPartial(partial) {
+  if (!partial || !partialEl) return;
+  partialEl.classList.remove("hidden");
+
+  const cover = partial.cover || {};
+  document.getElementById("partial-status").textContent = cover.overall_status || "";
+
+  fillList(document.getElementById("partial-summary"), partial.summary || [], (text) => {
+    const li = document.createElement("li");
+    li.textContent = text;
+    return li;
+  });
+
+  fillList(document.getElementById("partial-risks"), partial.risk_map || [], (risk) => {
+    const item = document.createElement("div");
+    item.className = "risk-item";
+    const title = document.createElement("strong");
+    title.textContent = risk.category || "";
+    const description = document.createElement("p");
+    description.textContent = risk.description || "";
+    item.append(title, description);
+    if (risk.clause_ref) {
+      const ref = document.createElement("div");
+      ref.className = "muted";
+      ref.textContent = `Ссылка: ${risk.clause_ref}`;
+      item.append(ref);
+    }
+    return item;
+  });
+}
+
+function handleJob(data) {
+  if (data.step) {
+    stepEl.textContent = data.step;
+  }
+  renderPartial(data.partial);
+  if (data.status === "queued" && data.queue_position) {
+    stepEl.textContent = `В очереди: ${data.queue_position}`;
+  }
+  if (data.status === "done") {
+    window.location.href = `/report/${window.RISQ_JOB_ID}`;
+    return true;
+  }
+  if (data.status === "error") {
+    errorEl.textContent = data.error || "Произошла ошибка";
+    errorEl.classList.remove("hidden");
+    return true;
+  }
+  return false;
 }
 
 async function pollJob() {
@@ -21,22 +66,38 @@ async function pollJob() {
     const response = await fetch(`/api/job/${window.RISQ_JOB_ID}`);
     if (!response.ok) return;
     const data = await response.json();
-    if (data.step) {
-      stepEl.textContent = data.step;
-    }
-    if (data.status === "done") {
-      window.location.href = `/report/${window.RISQ_JOB_ID}`;
-      return;
-    }
-    if (data.status === "error") {
-      errorEl.textContent = data.error || "Произошла ошибка";
-      errorEl.classList.remove("hidden");
+    if (handleJob(data) && pollTimer) {
+      clearInterval(pollTimer);
+      pollTimer = null;
     }
   } catch (error) {
     console.error(error);
   }
 }
 
-rotateStep();
-setInterval(rotateStep, 2400);
-setInterval(pollJob, 2000);
+function startPolling() {
+  if (pollTimer) return;
+  pollJob();
+  pollTimer = setInterval(pollJob, 2000);
+}
+
+// Push-канал (SSE); опрос — только если EventSource недоступен или соединение упало
+function subscribe() {
+  if (!window.RISQ_JOB_ID) return;
+  if (!window.EventSource) {
+    startPolling();
+    return;
+  }
+  const source = new EventSource(`/api/job/${window.RISQ_JOB_ID}/events`);
+  source.onmessage = (event) => {
+    if (handleJob(JSON.parse(event.data))) {
+      source.close();
+    }
+  };
+  source.onerror = () => {
+    source.close();
+    startPolling();
+  };
+}
+
+subscribe();
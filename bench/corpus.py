@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import html
+import random
+from pathlib import Path
+
+# Меняется при изменении генератора: старые файлы корпуса не переиспользуются
+CORPUS_VERSION = 2
+
+# Примерно столько строк текста помещается на страницу A4 шрифтом 11pt
+LINES_PER_PAGE = 34
+
+SECTIONS = (
+    "ПРЕДМЕТ ДОГОВОРА",
+    "ПРАВА И ОБЯЗАННОСТИ СТОРОН",
+    "СТОИМОСТЬ УСЛУГ И ПОРЯДОК РАСЧЁТОВ",
+    "ПОРЯДОК СДАЧИ И ПРИЁМКИ УСЛУГ",
+    "ОТВЕТСТВЕННОСТЬ СТОРОН",
+    "ФОРС-МАЖОР",
+    "КОНФИДЕНЦИАЛЬНОСТЬ",
+    "ПОРЯДОК РАСТОРЖЕНИЯ ДОГОВОРА",
+    "ПОРЯДОК РАЗРЕШЕНИЯ СПОРОВ",
+    "ЗАКЛЮЧИТЕЛЬНЫЕ ПОЛОЖЕНИЯ",
+)
+
+_SUBJECTS = ("Исполнитель", "Заказчик", "Стороны", "Каждая из Сторон")
+_DUTIES = (
+    "обязуется оказать услуги надлежащего качества в сроки, согласованные в Приложении № {n}",
+    "обязан своевременно предоставлять информацию и документы, необходимые для оказания услуг",
+    "обязуется принять оказанные услуги по акту сдачи-приёмки в течение {n} рабочих дней",
+    "обязан оплатить услуги в размере и порядке, предусмотренных разделом 3 настоящего Договора",
+    "вправе привлекать третьих лиц для исполнения обязательств с письменного согласия другой Стороны",
+    "должен уведомить другую Сторону об изменении реквизитов не позднее {n} календарных дней",
+    "несёт ответственность за сохранность документов и материалов, переданных для оказания услуг",
+)
+_PENALTIES = (
+    "За нарушение сроков оплаты Заказчик уплачивает пени в размере 0,{n} % от суммы задолженности "
+    "за каждый день просрочки.",
+    "За нарушение сроков оказания услуг Исполнитель уплачивает неустойку в размере {n} % "
+    "от стоимости услуг.",
+    "Сторона освобождается от ответственности, если неисполнение вызвано обстоятельствами "
+    "непреодолимой силы.",
+    "Договор может быть расторгнут по соглашению Сторон или в одностороннем порядке "
+    "с уведомлением за {n} дней.",
+)
+
+
+def contract_pages(pages: int, seed: int = 0) -> list[list[str]]:
+    """
+    Текст условного договора оказания услуг: список страниц, на каждой — строки.
+    Одинаковые pages/seed дают одинаковый текст.
+    """
+    rng = random.Random(f"{pages}:{seed}")
+    lines = [
+        "ДОГОВОР ОКАЗАНИЯ УСЛУГ № " + str(rng.randint(1, 999)),
+        "г. Москва",
+        "ООО «Заказчик», именуемое в дальнейшем «Заказчик», и ООО «Исполнитель», именуемое "
+        "в дальнейшем «Исполнитель», заключили настоящий Договор о нижеследующем.",
+    ]
+    total_lines = pages * LINES_PER_PAGE
+    section = 0
+    while len(lines) < total_lines - 4:
+        section += 1
+        lines.append(f"{section}. {SECTIONS[(section - 1) % len(SECTIONS)]}")
+        for clause in range(1, rng.randint(4, 9)):
+            template = rng.choice(_PENALTIES if rng.random() < 0.25 else _DUTIES)
+            text = template.format(n=rng.randint(1, 30))
+            if template in _DUTIES:
+                text = f"{rng.choice(_SUBJECTS)} {text}."
+            lines.append(f"{section}.{clause}. {text}")
+    lines += ["ПОДПИСИ СТОРОН", "Заказчик: ____________", "Исполнитель: ____________"]
+    lines = lines[:total_lines]
+    return [lines[i:i + LINES_PER_PAGE] for i in range(0, len(lines), LINES_PER_PAGE)]
+
+
+def write_docx(path: Path, pages: int, seed: int = 0) -> Path:
+    from docx import Document
+
+    document = Document()
+    section = document.sections[0]
+    section.header.paragraphs[0].text = "Договор оказания услуг — конфиденциально"
+    section.footer.paragraphs[0].text = "Заказчик ________  Исполнитель ________"
+    for index, page in enumerate(contract_pages(pages, seed)):
+        if index:
+            document.add_page_break()
+        for line in page:
+            document.add_paragraph(line)
+        if index == 0:
+            # График платежей — таблицей, как в реальных договорах
+            table = document.add_table(rows=1, cols=3)
+            for cell, title in zip(table.rows[0].cells, ("Этап", "Срок", "Сумма, руб.")):
+                cell.text = title
+            for stage in range(1, 4):
+                row = table.add_row().cells
+                row[0].text, row[1].text, row[2].text = (
+                    f"Этап {stage}", f"{stage * 30} дней", f"{stage * 100000}"
+                )
+    document.save(str(path))
+    return path
+
+
+def write_pdf(path: Path, pages: int, seed: int = 0) -> Path:
+    from weasyprint import HTML
+
+    body = "".join(
+        '<section class="page">' + "".join(f"<p>{html.escape(line)}</p>" for line in page) + "</section>"
+        for page in contract_pages(pages, seed)
+    )
+    style = (
+        "@page { size: A4; margin: 2cm; }"
+        "body { font-family: 'DejaVu Sans', sans-serif; font-size: 9pt; }"
+        "p { margin: 0 0 2pt; }"
+        ".page { page-break-after: always; }"
+        ".page:last-child { page-break-after: auto; }"
+    )
+    document = f"<html><head><meta charset='utf-8'><style>{style}</style></head><body>{body}</body></html>"
+    HTML(string=document).write_pdf(str(path))
+    return path
+
+
+WRITERS = {".pdf": write_pdf, ".docx": write_docx}
+
+
+def build_corpus(
+    target_dir: Path,
+    sizes: list[int],
+    suffixes: tuple[str, ...] = (".pdf", ".docx"),
+    seed: int = 0,
+) -> dict[tuple[str, int], Path]:
+    """
+    Генерирует (или берёт уже сгенерированные) файлы корпуса: {(suffix, pages): path}
+    """
+    target_dir.mkdir(parents=True, exist_ok=True)
+    corpus: dict[tuple[str, int], Path] = {}
+    for suffix in suffixes:
+        for pages in sizes:
+            path = target_dir / f"contract-v{CORPUS_VERSION}-{pages:03d}p-s{seed}{suffix}"
+            if not path.exists():
+                partial = path.with_name(path.name + ".part")
+                WRITERS[suffix](partial, pages, seed)
+                partial.replace(path)
+            corpus[(suffix, pages)] = path
+    return corpus
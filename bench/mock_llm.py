@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.requests import Request
+
+from backend.app.services.profiles import OVERALL_STATUSES
+
+
+def _schema_statuses(body: dict) -> list[str]:
+    """
+    Допустимые overall_status из response_format запроса (json_schema), иначе — из профилей
+    """
+    schema = ((body.get("response_format") or {}).get("json_schema") or {}).get("schema") or {}
+    cover = (schema.get("$defs") or {}).get("ReportCover") or {}
+    status = (cover.get("properties") or {}).get("overall_status") or {}
+    return list(status.get("enum") or OVERALL_STATUSES)
+
+
+def _report_for(prompt: str, statuses: list[str] = OVERALL_STATUSES) -> dict[str, Any]:
+    """
+    Детерминированный отчёт: содержимое зависит только от текста запроса
+    """
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    risks = [
+        {
+            "category": category,
+            "description": f"Условие требует дополнительной проверки ({category}).",
+            "clause_ref": f"п. {rng.randint(1, 10)}.{rng.randint(1, 8)}",
+        }
+        for category in rng.sample(["оплата", "сроки", "приёмка", "ответственность", "споры"], 3)
+    ]
+    return {
+        "cover": {
+            "contract_type": "Договор оказания услуг",
+            "analysis_date": "2024-01-01",
+            "overall_status": rng.choice(statuses),
+        },
+        "summary": ["Договор оказания услуг между юридическими лицами.", "Оплата после приёмки услуг."],
+        "risk_map": risks,
+        "atypical": [],
+        "contradictions": [],
+        "duties_balance": {
+            "customer_count": rng.randint(3, 20),
+            "provider_count": rng.randint(3, 20),
+            "note": "Баланс обязанностей сторон примерно равный.",
+        },
+        "needs_specialist": [{"item": "Порядок приёмки услуг", "clause_ref": "п. 4.1"}],
+        "missing_sections": [],
+        "disclaimer": "Отчёт сформирован автоматически.",
+    }
+
+
+# Размер фрагмента потокового ответа, символов
+STREAM_CHUNK = 32
+
+
+def _stream(body: dict, content: str, usage: dict, delay: float) -> AsyncIterator[str]:
+    """
+    Потоковый ответ: задержка распределяется по фрагментам, как при генерации токенов
+    """
+    pieces = [content[i:i + STREAM_CHUNK] for i in range(0, len(content), STREAM_CHUNK)]
+    base = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "model": body.get("model", "mock")}
+
+    async def events() -> AsyncIterator[str]:
+        for index, piece in enumerate(pieces):
+            await asyncio.sleep(delay / len(pieces))
+            delta = {"content": piece} if index else {"role": "assistant", "content": piece}
+            chunk = {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        last = {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        yield f"data: {json.dumps(last)}\n\n"
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield f"data: {json.dumps({**base, 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return events()
+
+
+def create_app(
+    latency: float = 0.5, jitter: float = 0.0, seed: int = 0, rate_limited: int = 0
+) -> FastAPI:
+    """
+    Имитация OpenAI Chat Completions: фиксированная задержка ± jitter (сек).
+    При stream=True задержка растягивается на весь потоковый ответ.
+    Первые rate_limited запросов получают 429 с Retry-After: 0 (проверка ретраев клиента).
+    """
+    app = FastAPI()
+    rng = random.Random(seed)
+    app.state.requests = 0
+    app.state.throttled = 0
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request) -> Any:
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        app.state.requests += 1
+        if app.state.throttled < rate_limited:
+            app.state.throttled += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": "0"},
+            )
+
+        delay = max(0.0, latency + rng.uniform(-jitter, jitter))
+        content = json.dumps(_report_for(prompt, _schema_statuses(body)), ensure_ascii=False)
+        # Для русского текста ~3 символа на токен — как в tokens.count_tokens без tiktoken
+        prompt_tokens = len(prompt) // 3 + 1
+        completion_tokens = len(content) // 3 + 1
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        if body.get("stream"):
+            return StreamingResponse(
+                _stream(body, content, usage, delay), media_type="text/event-stream"
+            )
+
+        await asyncio.sleep(delay)
+        return JSONResponse(
+            {
+                "id": f"chatcmpl-mock-{app.state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+        )
+
+    return app
+
+
+class BackgroundServer:
+    """
+    uvicorn в фоновом потоке (для mock LLM и для e2e-прогона приложения)
+    """
+
+    def __init__(self, app: Any, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.config = uvicorn.Config(app, host=host, port=port, log_level="warning", access_log=False)
+        self.server = uvicorn.Server(self.config)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        sock = self.server.servers[0].sockets[0]
+        host, port = sock.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "BackgroundServer":
+        self._thread = threading.Thread(target=self.server.run, daemon=True)
+        self._thread.start()
+        while not self.server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Сервер не запустился")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.server.should_exit = True
+        if self._thread:
+            self._thread.join(timeout=10)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.mock_llm",
+        description="Локальный mock OpenAI API для бенчмарков (OPENAI_BASE_URL=http://host:port/v1)",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--latency", type=float, default=0.5, help="задержка ответа, сек")
+    parser.add_argument("--jitter", type=float, default=0.0, help="разброс задержки, сек")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rate-limited", type=int, default=0, help="сколько первых запросов получают 429")
+    args = parser.parse_args(argv)
+    uvicorn.run(
+        create_app(args.latency, args.jitter, args.seed, args.rate_limited),
+        host=args.host,
+        port=args.port,
+        log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
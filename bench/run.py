@@ -0,0 +1,419 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from bench.corpus import build_corpus, contract_pages
+
+DEFAULT_SIZES = [2, 10, 50, 150, 300]
+SUITES = ("parse", "analyze", "render", "e2e")
+CONTRACT_TYPE = "Договор оказания услуг"
+APP_DIR = Path(__file__).resolve().parent.parent / "backend" / "app"
+# Предел ожидания одной задачи в e2e: зависшая задача — ошибка замера, а не зависший прогон
+E2E_JOB_TIMEOUT = 120.0
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    Перцентиль с линейной интерполяцией (q от 0 до 100)
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {}
+    return {
+        "min": round(min(samples), 6),
+        "mean": round(sum(samples) / len(samples), 6),
+        "p50": round(percentile(samples, 50), 6),
+        "p95": round(percentile(samples, 95), 6),
+        "p99": round(percentile(samples, 99), 6),
+        "max": round(max(samples), 6),
+    }
+
+
+def _peak_rss_mb(who: int) -> float:
+    # ru_maxrss: килобайты в Linux, байты в macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _timed_loop(fn: Callable[[], Any], iterations: int, warmup: int) -> tuple[list[float], int]:
+    for _ in range(warmup):
+        fn()
+    samples: list[float] = []
+    errors = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception:
+            errors += 1
+            continue
+        samples.append(time.perf_counter() - started)
+    return samples, errors
+
+
+# --- Сценарии. Выполняются в отдельном процессе, импорт backend — внутри ---
+
+
+def _bench_parse(case: dict) -> dict:
+    from backend.app.services.parser import create_parse_pool, parse_document_detailed
+
+    path = Path(case["path"])
+    # Как в сервисе: диапазоны страниц PDF и DOCX — в пуле процессов парсинга
+    # (процессы пула запускаются на прогреве)
+    pool = create_parse_pool()
+    try:
+        samples, errors = _timed_loop(
+            lambda: parse_document_detailed(path, pool), case["iterations"], case["warmup"]
+        )
+    finally:
+        pool.shutdown(cancel_futures=True)
+    return {"samples": samples, "errors": errors, "units": len(samples)}
+
+
+def _bench_analyze(case: dict) -> dict:
+    from backend.app.services import llm_client
+    from backend.app.services.analyzer_llm import analyze_contract
+    from backend.app.services.llm_client import TokenUsage
+
+    pages = case["pages"]
+    text = "\n".join(line for page in contract_pages(pages) for line in page)
+    usage = TokenUsage()
+    # Время до первого черновика отчёта (потоковый ответ LLM)
+    first_partial: list[float] = []
+
+    def run() -> None:
+        started = time.perf_counter()
+        marks: list[float] = []
+
+        def on_partial(_: dict) -> None:
+            if not marks:
+                marks.append(time.perf_counter() - started)
+
+        analyze_contract(CONTRACT_TYPE, text, pages, case["mode"], usage, on_partial=on_partial)
+        first_partial.extend(marks)
+
+    try:
+        samples, errors = _timed_loop(run, case["iterations"], case["warmup"])
+    finally:
+        llm_client.shutdown()
+    return {
+        "samples": samples,
+        "errors": errors,
+        "units": len(samples),
+        "usage": usage.as_dict(),
+        "first_partial_seconds": summarize(first_partial[case["warmup"]:]),
+    }
+
+
+def _mock_report(risks: int):
+    from backend.app.schemas.report import Report
+    from bench.mock_llm import _report_for
+
+    data = _report_for("render")
+    data["risk_map"] = [dict(data["risk_map"][i % len(data["risk_map"])]) for i in range(risks)]
+    return Report.model_validate(data)
+
+
+def _bench_render(case: dict) -> dict:
+    from backend.app.services.pdf_render import PdfRenderer, report_context
+
+    report = _mock_report(case["risks"])
+    renderer = PdfRenderer(APP_DIR / "templates", APP_DIR / "static")
+    # Тот же контекст, что у /report/{job_id}/pdf
+    context = report_context(report)
+    samples, errors = _timed_loop(
+        lambda: renderer.render("report.html", context), case["iterations"], case["warmup"]
+    )
+    return {"samples": samples, "errors": errors, "units": len(samples)}
+
+
+async def _e2e_one(client, path: Path, poll: float) -> float:
+    started = time.perf_counter()
+    with open(path, "rb") as fh:
+        response = await client.post(
+            "/analyze",
+            data={"contract_type": CONTRACT_TYPE, "mode": "full"},
+            files={"file": (path.name, fh.read(), "application/octet-stream")},
+        )
+    if response.status_code != 303:
+        raise RuntimeError(f"/analyze вернул {response.status_code}")
+    job_id = response.headers["location"].rstrip("/").rsplit("/", 1)[-1]
+    while True:
+        job = (await client.get(f"/api/job/{job_id}")).json()
+        if job["status"] == "done":
+            return time.perf_counter() - started
+        if job["status"] == "error":
+            raise RuntimeError(job.get("error") or "Ошибка анализа")
+        if time.perf_counter() - started > E2E_JOB_TIMEOUT:
+            raise TimeoutError(f"Задача {job_id} не завершилась за {E2E_JOB_TIMEOUT:.0f} с")
+        await asyncio.sleep(poll)
+
+
+async def _e2e_load(base_url: str, paths: list[Path], concurrency: int) -> tuple[list[float], int, float]:
+    import httpx
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+    errors = 0
+
+    async def worker(client, path: Path) -> None:
+        nonlocal errors
+        async with semaphore:
+            try:
+                samples.append(await _e2e_one(client, path, poll=0.05))
+            except Exception:
+                errors += 1
+
+    limits = httpx.Limits(max_connections=concurrency * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=600, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client, path) for path in paths))
+        wall = time.perf_counter() - started
+    return samples, errors, wall
+
+
+def _bench_e2e(case: dict) -> dict:
+    import httpx
+
+    from backend.app.main import app
+    from bench.mock_llm import BackgroundServer
+
+    paths = [Path(p) for p in case["paths"]]
+    with BackgroundServer(app) as server:
+        # Нагрузку даём после прогрева: время старта замеряется отдельно
+        started = time.perf_counter()
+        while httpx.get(f"{server.url}/health/ready").status_code != 200:
+            if time.perf_counter() - started > 120:
+                raise RuntimeError("Приложение не стало готовым за 120 с")
+            time.sleep(0.05)
+        ready_seconds = time.perf_counter() - started
+        samples, errors, wall = asyncio.run(_e2e_load(server.url, paths, case["concurrency"]))
+    return {
+        "samples": samples,
+        "errors": errors,
+        "units": len(samples),
+        "wall": wall,
+        "ready_seconds": round(ready_seconds, 4),
+    }
+
+
+BENCHES = {
+    "parse": _bench_parse,
+    "analyze": _bench_analyze,
+    "render": _bench_render,
+    "e2e": _bench_e2e,
+}
+
+
+def _run_case(case: dict, env: dict[str, str]) -> dict:
+    """
+    Точка входа процесса-изолятора: свой процесс на каждый сценарий -> честный peak RSS
+    """
+    os.environ.update(env)
+    outcome = BENCHES[case["suite"]](case)
+    samples = outcome.pop("samples")
+    # Последовательные замеры: пропускная способность по чистому времени без прогрева
+    wall = outcome.pop("wall", sum(samples))
+    units = outcome.pop("units")
+    return {
+        "seconds": summarize(samples),
+        "iterations": len(samples),
+        "errors": outcome.pop("errors"),
+        "throughput_per_s": round(units / wall, 4) if wall else 0.0,
+        "peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF),
+        "children_peak_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN),
+        **outcome,
+    }
+
+
+def _isolated(case: dict, env: dict[str, str]) -> dict:
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_run_case, case, env).result()
+
+
+# --- Планирование прогона ---
+
+
+def _plan(args: argparse.Namespace, corpus_dir: Path) -> list[dict]:
+    common = {"iterations": args.iterations, "warmup": args.warmup}
+    cases: list[dict] = []
+
+    if "parse" in args.suites:
+        corpus = build_corpus(corpus_dir, args.sizes, tuple(args.formats))
+        for (suffix, pages), path in sorted(corpus.items()):
+            name = "parse_pdf" if suffix == ".pdf" else "parse_docx"
+            cases.append(
+                {"suite": "parse", "name": name, "params": {"pages": pages},
+                 "suffix": suffix, "pages": pages, "path": str(path), **common}
+            )
+
+    if "analyze" in args.suites:
+        for pages in args.sizes:
+            cases.append(
+                {"suite": "analyze", "name": "analyze_contract",
+                 "params": {"pages": pages, "mode": args.mode, "llm_latency": args.llm_latency},
+                 "pages": pages, "mode": args.mode, **common}
+            )
+
+    if "render" in args.suites:
+        for risks in (5, 100):
+            cases.append(
+                {"suite": "render", "name": "pdf_render", "params": {"risks": risks},
+                 "risks": risks, **common}
+            )
+
+    if "e2e" in args.suites:
+        suffix = args.formats[0]
+        # Разные seed -> разные файлы: отчёты не берутся из кэша
+        paths = [
+            build_corpus(corpus_dir, [args.e2e_pages], (suffix,), seed=seed)[(suffix, args.e2e_pages)]
+            for seed in range(1, args.e2e_requests + 1)
+        ]
+        cases.append(
+            {"suite": "e2e", "name": "analyze_endpoint",
+             "params": {"pages": args.e2e_pages, "format": suffix, "requests": args.e2e_requests,
+                        "concurrency": args.concurrency, "llm_latency": args.llm_latency},
+             "paths": [str(p) for p in paths], "concurrency": args.concurrency}
+        )
+    return cases
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Сравнение p95 с базовым прогоном; возвращает список регрессий
+    """
+    def key(result: dict) -> str:
+        return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+    previous = {key(r): r for r in baseline.get("results", [])}
+    regressions: list[str] = []
+    for result in current["results"]:
+        old = previous.get(key(result))
+        if not old or not old.get("seconds") or not result.get("seconds"):
+            continue
+        before, after = old["seconds"]["p95"], result["seconds"]["p95"]
+        delta = (after - before) / before if before else 0.0
+        line = f"{result['name']} {result['params']}: p95 {before:.4f}s -> {after:.4f}s ({delta:+.1%})"
+        print(line, file=sys.stderr)
+        if delta > threshold:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.run",
+        description="Бенчмарк конвейера parse → analyze → render и /analyze под нагрузкой; результат — JSON",
+    )
+    parser.add_argument("--suites", type=lambda s: s.split(","), default=list(SUITES),
+                        help=f"через запятую: {','.join(SUITES)}")
+    parser.add_argument("--sizes", type=lambda s: [int(x) for x in s.split(",")], default=DEFAULT_SIZES,
+                        help="размеры документов в страницах")
+    parser.add_argument("--formats", type=lambda s: [f".{x.lstrip('.')}" for x in s.split(",")],
+                        default=[".pdf", ".docx"])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--mode", choices=("full", "fast"), default="full")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="задержка mock LLM, сек")
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--e2e-pages", type=int, default=10)
+    parser.add_argument("--e2e-requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--corpus-dir", default="data/bench/corpus")
+    parser.add_argument("--output", "-o", help="файл JSON (по умолчанию stdout)")
+    parser.add_argument("--baseline", help="JSON прошлого прогона для сравнения")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="допустимый рост p95 относительно baseline")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"неизвестные сценарии: {', '.join(sorted(unknown))}")
+
+    # .env — до импорта backend (и в окружение процессов сценариев): настройки сервисов
+    # читаются при импорте; параметры прогона из env ниже имеют приоритет
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    from bench.mock_llm import BackgroundServer, create_app
+
+    workdir = Path(tempfile.mkdtemp(prefix="risq-bench-"))
+    results: list[dict] = []
+    with BackgroundServer(create_app(args.llm_latency, args.llm_jitter)) as mock:
+        env = {
+            "OPENAI_BASE_URL": mock.url + "/v1",
+            "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "mock",
+            "RISQ_STORAGE": "memory",
+            "RISQ_CACHE_PATH": str(workdir / "report_cache.sqlite3"),
+            # Рендер PDF замеряется сценарием render; фоновый пререндер в e2e
+            # только конкурирует с анализом и держит задачи
+            "RISQ_PDF_PRERENDER": "0",
+        }
+        for case in _plan(args, Path(args.corpus_dir)):
+            label = f"{case['name']} {case['params']}"
+            print(f"… {label}", file=sys.stderr)
+            try:
+                measured = _isolated(case, env)
+            except Exception as exc:
+                measured = {"error": f"{type(exc).__name__}: {exc}"}
+            results.append({"name": case["name"], "params": case["params"], **measured})
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": results,
+    }
+    payload = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(payload + "\n", encoding="utf-8")
+    else:
+        print(payload)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        if compare(report, baseline, args.max_regression):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
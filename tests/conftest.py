@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import os
+import tempfile
+
+# Окружение задаётся до импорта приложения: хранилище в памяти, кэш во временном
+# каталоге, без фонового прогрева и пререндера PDF
+_DATA_DIR = tempfile.mkdtemp(prefix="risq-tests-")
+os.environ.update(
+    {
+        "RISQ_STORAGE": "memory",
+        "RISQ_CACHE_PATH": os.path.join(_DATA_DIR, "report_cache.sqlite3"),
+        "RISQ_OCR_CACHE_DIR": os.path.join(_DATA_DIR, "ocr_cache"),
+        "RISQ_WARMUP": "0",
+        "RISQ_PDF_PRERENDER": "0",
+        "RISQ_PARSE_WORKERS": "2",
+        "OPENAI_API_KEY": "test",
+    }
+)
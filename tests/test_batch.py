@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import io
+import json
+import zipfile
+from pathlib import Path
+
+from docx import Document
+from fastapi.testclient import TestClient
+
+from backend.app import cli, main
+from backend.app.services.batch import expand_zip
+
+CONTRACT_TYPE = "Договор оказания услуг"
+
+
+def _docx_bytes(*paragraphs: str) -> bytes:
+    document = Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+def _zip_bytes(files: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+FIRST = _docx_bytes(
+    "ПЕРВЫЙ договор оказания услуг",
+    "1. Исполнитель обязан оказать услуги.",
+    "2. Стороны освобождаются от ответственности при форс-мажоре.",
+)
+SECOND = _docx_bytes("ВТОРОЙ договор")
+
+
+def test_expand_zip_keeps_archives_apart(tmp_path: Path) -> None:
+    first = tmp_path / "a.zip"
+    second = tmp_path / "b.zip"
+    first.write_bytes(_zip_bytes({"a.docx": FIRST}))
+    second.write_bytes(_zip_bytes({"b.docx": SECOND}))
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+
+    items = expand_zip(first, workdir, 10 * 1024 * 1024) + expand_zip(
+        second, workdir, 10 * 1024 * 1024
+    )
+
+    assert [item.name for item in items] == ["a.docx", "b.docx"]
+    assert items[0].path != items[1].path
+    assert items[0].path.read_bytes() == FIRST
+    assert items[1].path.read_bytes() == SECOND
+    assert items[0].file_hash != items[1].file_hash
+
+
+def test_cli_collect_counts_archives_independently(tmp_path: Path) -> None:
+    empty = tmp_path / "empty.zip"
+    empty.write_bytes(_zip_bytes({"readme.txt": b"-"}))
+    folder = tmp_path / "dir"
+    folder.mkdir()
+    (folder / "b.zip").write_bytes(_zip_bytes({"b.docx": SECOND}))
+    workdir = tmp_path / "work"
+    workdir.mkdir()
+
+    items = cli._collect([empty, folder], workdir)
+
+    assert [item.name for item in items] == ["b.docx"]
+
+
+def test_batch_two_zips_are_analyzed_separately() -> None:
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/api/batch",
+            data={"contract_type": CONTRACT_TYPE, "mode": "fast"},
+            files=[
+                ("files", ("a.zip", _zip_bytes({"a.docx": FIRST}), "application/zip")),
+                ("files", ("b.zip", _zip_bytes({"b.docx": SECOND}), "application/zip")),
+            ],
+        )
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    results = {r["file"]: r for r in records if "file" in r}
+    assert set(results) == {"a.docx", "b.docx"}
+    assert all(r["status"] == "done" and r["job_id"] for r in results.values())
+
+    first, second = results["a.docx"]["report"], results["b.docx"]["report"]
+    assert first["cover"]["chars"] > second["cover"]["chars"]
+    assert "форс-мажор" not in first["missing_sections"]
+    assert "форс-мажор" in second["missing_sections"]
+    assert records[-1]["summary"]["analyzed"] == 2
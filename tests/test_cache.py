@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from backend.app.schemas.report import DutiesBalance, Report, ReportCover
+from backend.app.services.cache import ReportCache, cache_key
+
+
+def _report(contract_type: str) -> Report:
+    return Report(
+        cover=ReportCover(
+            contract_type=contract_type,
+            analysis_date="2026-01-21",
+            overall_status="Средний уровень внимания",
+        ),
+        duties_balance=DutiesBalance(customer_count=1, provider_count=1),
+    )
+
+
+def test_profile_change_invalidates_only_its_contract_type(tmp_path: Path) -> None:
+    path = tmp_path / "cache.sqlite3"
+    cache = ReportCache(path, prompt_versions={"nda-v1", "services-v1"})
+    nda_key = cache_key("hash", "NDA", "gpt-4o-mini", "nda-v1:full")
+    services_key = cache_key("hash", "Договор оказания услуг", "gpt-4o-mini", "services-v1:full")
+    cache.put(nda_key, "gpt-4o-mini", "nda-v1", _report("NDA"), "текст NDA")
+    cache.put(services_key, "gpt-4o-mini", "services-v1", _report("Договор оказания услуг"))
+
+    # Правка профиля NDA: у него новая версия, у услуг — прежняя
+    reopened = ReportCache(path, prompt_versions={"nda-v2", "services-v1"})
+
+    assert reopened.get(nda_key) is None
+    assert reopened.get_text(nda_key) is None
+    assert reopened.get(services_key).cover.contract_type == "Договор оказания услуг"
+    assert reopened.stats()["entries"] == 1
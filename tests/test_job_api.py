@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+import json
+
+from fastapi.testclient import TestClient
+
+from backend.app import main
+
+
+def test_job_api_reports_workers_but_sse_events_do_not() -> None:
+    with TestClient(main.app) as client:
+        job = main.storage.create_job()
+        main.storage.set_status(job.job_id, "error", "Ошибка анализа", "boom")
+
+        payload = client.get(f"/api/job/{job.job_id}").json()
+        assert payload["status"] == "error"
+        assert payload["workers"]["workers"] == main.scheduler.workers
+
+        events = client.get(f"/api/job/{job.job_id}/events").text
+        event = json.loads(events.split("data: ", 1)[1].split("\n", 1)[0])
+        assert event["status"] == "error"
+        assert "workers" not in event
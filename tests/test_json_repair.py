@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from backend.app.services import analyzer_llm
+from backend.app.services.json_repair import repair_report
+from backend.app.services.profiles import registry
+
+VALID = {
+    "cover": {
+        "contract_type": "Договор оказания услуг",
+        "analysis_date": "2026-01-21",
+        "overall_status": "Средний уровень внимания",
+    },
+    "summary": ["Обратите внимание на сроки оказания услуг."],
+    "risk_map": [{"category": "сроки", "description": "Сроки не определены.", "clause_ref": "п. 2"}],
+    "duties_balance": {"customer_count": 1, "provider_count": 2},
+    "missing_sections": ["форс-мажор"],
+}
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "{}",
+        '{"error": "rate limited"}',
+        '{"cover": {"contract_ty',
+        '{"summary": "x"}',
+        '{"cover": {}, "summary": ["x"], "risk_map": []}',
+        '{"cover": {"overall_status": "Повышенное внимание"}, "summary": "x", "risk_map": []}',
+        '{"cover": {"overall_status": "Повышенное внимание"}, "summary": ["x"]}',
+        "Извините, не могу помочь",
+    ],
+)
+def test_repair_rejects_garbage_and_truncated_output(content: str) -> None:
+    assert repair_report(content) is None
+
+
+def test_repair_fixes_fenced_json_with_trailing_comma() -> None:
+    content = "```json\n" + json.dumps(VALID, ensure_ascii=False)[:-1] + ",}\n```"
+    report = repair_report(content)
+    assert report is not None
+    assert report.risk_map[0].category == "сроки"
+
+
+def test_repair_closes_report_truncated_at_the_tail() -> None:
+    content = json.dumps(VALID, ensure_ascii=False)
+    truncated = content[: content.index('"missing_sections"') + len('"missing_sections": ["фор')]
+    report = repair_report(truncated)
+    assert report is not None
+    assert report.summary == VALID["summary"]
+    assert report.duties_balance.provider_count == 2
+
+
+def test_repair_unwraps_nested_report() -> None:
+    report = repair_report(json.dumps({"report": VALID}, ensure_ascii=False))
+    assert report is not None
+    assert report.cover.contract_type == "Договор оказания услуг"
+
+
+def test_unrepairable_output_triggers_llm_retry(monkeypatch: pytest.MonkeyPatch) -> None:
+    calls: list[list[dict]] = []
+
+    async def fake_chat(**kwargs) -> str:
+        calls.append(kwargs["messages"])
+        return json.dumps(VALID, ensure_ascii=False)
+
+    monkeypatch.setattr(analyzer_llm.llm_client, "chat", fake_chat)
+    report = asyncio.run(
+        analyzer_llm._validate_or_repair('{"error": "rate limited"}', registry.default, None)
+    )
+
+    assert len(calls) == 1
+    assert report.risk_map[0].description == "Сроки не определены."
+
+
+@pytest.mark.parametrize(
+    ("status", "expected"),
+    [
+        ("Повышенное внимание", "Повышенное внимание"),
+        ("Высокий уровень внимания", "Повышенное внимание"),
+        ("низкий", "Низкий уровень внимания"),
+        ("unknown", "Средний уровень внимания"),
+    ],
+)
+def test_post_fix_normalizes_overall_status(status: str, expected: str) -> None:
+    report = repair_report(json.dumps({**VALID, "cover": {**VALID["cover"], "overall_status": status}}))
+    fixed = analyzer_llm._post_fix(report, "Договор оказания услуг", 3)
+    assert fixed.cover.overall_status == expected
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Iterator, Optional
+
+import pytest
+
+from backend.app.services.llm_client import LLMClient, TokenUsage
+from backend.app.services.profiles import OVERALL_STATUSES
+from bench.mock_llm import BackgroundServer, create_app
+
+MESSAGES = [{"role": "user", "content": "Договор оказания услуг: оплата после приёмки."}]
+
+
+@pytest.fixture
+def mock_llm(monkeypatch: pytest.MonkeyPatch) -> Iterator[BackgroundServer]:
+    app = create_app(latency=0.05, rate_limited=2)
+    with BackgroundServer(app) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.url + "/v1")
+        yield server
+
+
+def _client() -> LLMClient:
+    client = LLMClient()
+    # Retry-After: 0 от mock — без секундных пауз между повторами
+    client.backoff_base = 0.01
+    return client
+
+
+def _chat(client: LLMClient, **kwargs) -> str:
+    async def run() -> str:
+        try:
+            return await client.chat(model="mock", messages=MESSAGES, **kwargs)
+        finally:
+            await client.aclose()
+
+    return asyncio.run(run())
+
+
+def test_chat_retries_after_rate_limit(mock_llm: BackgroundServer) -> None:
+    client = _client()
+    usage = TokenUsage()
+
+    content = _chat(client, usage=usage)
+
+    report = json.loads(content)
+    assert report["cover"]["overall_status"] in OVERALL_STATUSES
+    assert mock_llm.config.app.state.requests == 3
+    assert client.limiter.stats()["throttled"] == 2
+    assert usage.requests == 1 and usage.completion_tokens > 0
+
+
+def test_chat_gives_up_after_max_retries(mock_llm: BackgroundServer) -> None:
+    client = _client()
+    client.max_retries = 1
+
+    with pytest.raises(RuntimeError, match="превышено число повторных попыток"):
+        _chat(client)
+    assert mock_llm.config.app.state.requests == 2
+
+
+def test_chat_streams_deltas(mock_llm: BackgroundServer) -> None:
+    client = _client()
+    client.streaming = True
+    usage = TokenUsage()
+    deltas: list[Optional[str]] = []
+
+    content = _chat(client, usage=usage, on_delta=deltas.append)
+
+    # Каждый 429 сбрасывает черновик (None), затем приходит ответ фрагментами
+    assert deltas[:2] == [None, None]
+    pieces = deltas[2:]
+    assert len(pieces) > 1 and None not in pieces
+    assert "".join(pieces) == content
+    assert json.loads(content)["summary"]
+    # Usage приходит последним чанком (stream_options.include_usage)
+    assert usage.prompt_tokens > 0 and usage.completion_tokens > 0
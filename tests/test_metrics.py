@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+
+from backend.app.services import analyzer_llm, metrics
+from backend.app.services.metrics import Profiler, ProfilerBusyError
+
+REPORT = {
+    "cover": {"contract_type": "Договор оказания услуг", "overall_status": "Повышенное внимание"},
+    "summary": ["Оплата после приёмки услуг."],
+    "risk_map": [],
+    "duties_balance": {"customer_count": 1, "provider_count": 1},
+}
+
+
+def test_only_one_profile_runs_at_a_time(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(metrics, "PROFILE_DIR", tmp_path)
+    first = Profiler("cprofile", "first")
+    first.start()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            Profiler("cprofile", "second").start()
+    finally:
+        path = first.stop()
+    assert path.exists()
+
+    second = Profiler("cprofile", "second")
+    second.start()
+    assert second.stop().exists()
+
+
+def test_parallel_chunks_record_wall_time_of_llm_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def slow_chat(**kwargs) -> str:
+        await asyncio.sleep(0.2)
+        return json.dumps(REPORT, ensure_ascii=False)
+
+    monkeypatch.setattr(analyzer_llm.llm_client, "chat", slow_chat)
+    prepared = analyzer_llm.prepare_contract(
+        "Договор оказания услуг", "1. Исполнитель оказывает услуги.", 1, "full"
+    )
+    prepared.parts = prepared.parts * 4
+    timings = metrics.StageTimings()
+
+    reports = asyncio.run(analyzer_llm.analyze_prepared_async(prepared, timings=timings))
+
+    assert len(reports) == 4
+    # Четыре фрагмента по 0.2 с параллельно: в задаче ~0.2 с, а не сумма 0.8 с
+    assert 0.2 <= timings.seconds["llm_request"] < 0.6
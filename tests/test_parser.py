@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from backend.app.services import parser
+
+
+def test_only_parse_pool_processes_skip_the_pool() -> None:
+    # Дочерний процесс, как воркер uvicorn (--workers / --reload): пул ему нужен
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as child:
+        assert child.submit(parser._in_worker_process).result() is False
+
+    with parser.create_parse_pool(1) as pool:
+        assert pool.submit(parser._in_worker_process).result() is True
+    assert parser._in_worker_process() is False
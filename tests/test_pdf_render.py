@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from backend.app.schemas.report import DutiesBalance, Report, ReportCover
+from backend.app.services.pdf_render import PdfRenderer, report_context
+
+APP_DIR = Path(__file__).resolve().parents[1] / "backend" / "app"
+
+
+def test_report_template_renders_with_shared_context() -> None:
+    report = Report(
+        cover=ReportCover(
+            contract_type="Договор оказания услуг",
+            analysis_date="2026-01-21",
+            overall_status="Средний уровень внимания",
+        ),
+        duties_balance=DutiesBalance(customer_count=1, provider_count=2),
+    )
+    # Только Jinja: WeasyPrint здесь не нужен, проверяется полнота контекста
+    renderer = PdfRenderer(APP_DIR / "templates", APP_DIR / "static")
+    html = renderer.env.get_template("report.html").render(**report_context(report), for_pdf=True)
+
+    assert "Обязанности — заказчик" in html
+    assert "Обязанности — исполнитель" in html
@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from backend.app.services import analyzer_llm
+from backend.app.services.report_stream import LatestDraft
+
+REPORT = {
+    "cover": {"contract_type": "Договор оказания услуг", "overall_status": "Повышенное внимание"},
+    "summary": ["Оплата после приёмки услуг."],
+    "risk_map": [{"category": "оплата", "description": "Срок оплаты не указан.", "clause_ref": "п. 3"}],
+    "duties_balance": {"customer_count": 2, "provider_count": 3},
+    "missing_sections": [],
+}
+
+TEXT = (
+    "Договор оказания услуг. 1. Исполнитель оказывает услуги. "
+    "2. Заказчик оплачивает услуги после подписания акта приёмки. "
+    "3. Споры рассматриваются в суде по месту нахождения ответчика."
+)
+
+
+def test_latest_draft_keeps_only_the_newest_snapshot() -> None:
+    drafts = LatestDraft()
+    written: list[dict] = []
+
+    def slow_write(draft: dict) -> None:
+        written.append(draft)
+        time.sleep(0.05)
+
+    writer = threading.Thread(target=drafts.drain, args=(slow_write,))
+    writer.start()
+    for n in range(20):
+        drafts.put({"n": n})
+        time.sleep(0.005)
+    time.sleep(0.1)
+    drafts.close()
+    writer.join(timeout=5)
+
+    assert not writer.is_alive()
+    assert 0 < len(written) < 20
+    assert written[-1] == {"n": 19}
+
+
+def test_partial_reports_are_written_off_the_llm_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    content = json.dumps(REPORT, ensure_ascii=False)
+
+    async def fake_chat(on_delta=None, **kwargs) -> str:
+        if on_delta is not None:
+            for i in range(0, len(content), 16):
+                on_delta(content[i:i + 16])
+            # Черновик, не записанный до конца анализа, отбрасывается — даём писателю время
+            await asyncio.sleep(0.1)
+        return content
+
+    monkeypatch.setattr(analyzer_llm.llm_client, "chat", fake_chat)
+    monkeypatch.setattr(analyzer_llm.llm_client, "streaming", True)
+    writers: list[str] = []
+
+    report = analyzer_llm.analyze_contract(
+        "Договор оказания услуг",
+        TEXT,
+        1,
+        on_partial=lambda draft: writers.append(threading.current_thread().name),
+    )
+
+    assert report.risk_map
+    assert writers
+    assert set(writers) == {threading.current_thread().name}
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from backend.app.schemas.report import DutiesBalance, Report, ReportCover, RiskItem
+from backend.app.services import analyzer_llm
+from backend.app.services.contract_diff import diff_clauses
+
+CONTRACT_TYPE = "Договор оказания услуг"
+
+OLD_TEXT = """1. Исполнитель оказывает услуги по уборке помещений Заказчика.
+2. Заказчик вправе в одностороннем порядке изменить стоимость услуг без согласования.
+3. Исполнитель несёт неограниченную ответственность за любые убытки Заказчика.
+4. Споры рассматриваются в суде по месту нахождения Заказчика."""
+
+NEW_TEXT = """1. Исполнитель оказывает услуги по уборке помещений Заказчика.
+4. Споры рассматриваются в суде по месту нахождения Заказчика."""
+
+
+def _previous() -> Report:
+    return Report(
+        cover=ReportCover(
+            contract_type=CONTRACT_TYPE,
+            analysis_date="2026-01-21",
+            overall_status="Повышенное внимание",
+        ),
+        risk_map=[
+            RiskItem(category="цена", description="Одностороннее изменение цены.", clause_ref="п. 2"),
+            RiskItem(category="ответственность", description="Неограниченная ответственность.", clause_ref="п. 3"),
+        ],
+        duties_balance=DutiesBalance(customer_count=1, provider_count=2),
+    )
+
+
+def test_revision_without_the_risky_clauses_lowers_the_status() -> None:
+    diff = diff_clauses(OLD_TEXT, NEW_TEXT)
+    prepared = analyzer_llm.prepare_revision(CONTRACT_TYPE, _previous(), diff, NEW_TEXT, 1)
+
+    assert prepared.kept.risk_map == []
+    assert prepared.kept.cover.overall_status == "Низкий уровень внимания"
+    report = analyzer_llm.finish_analysis(prepared, [])
+    assert report.cover.overall_status == "Низкий уровень внимания"
+
+
+def test_revision_keeps_status_for_remaining_risks() -> None:
+    text = OLD_TEXT.replace("неограниченную ответственность", "ответственность в пределах цены")
+    diff = diff_clauses(OLD_TEXT, text)
+    previous = _previous()
+    prepared = analyzer_llm.prepare_revision(CONTRACT_TYPE, previous, diff, text, 1)
+
+    # Один из двух рисков остался: статус не выше прошлого, но и не сброшен
+    assert len(prepared.kept.risk_map) == 1
+    assert prepared.kept.cover.overall_status == "Средний уровень внимания"
+    assert previous.cover.overall_status == "Повышенное внимание"
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from pathlib import Path
+
+from backend.app.schemas.report import DutiesBalance, Report, ReportCover
+from backend.app.services.storage import STALE_JOB_ERROR, SqliteStorage
+
+
+def _report() -> Report:
+    return Report(
+        cover=ReportCover(
+            contract_type="Договор оказания услуг",
+            analysis_date="2026-01-21",
+            overall_status="Средний уровень внимания",
+        ),
+        summary=["Оплата после приёмки услуг."],
+        duties_balance=DutiesBalance(customer_count=1, provider_count=2),
+    )
+
+
+def test_job_written_by_one_process_is_visible_to_another(tmp_path: Path) -> None:
+    # Два экземпляра на одном файле — как два воркера uvicorn
+    path = tmp_path / "jobs.sqlite3"
+    writer, reader = SqliteStorage(path), SqliteStorage(path)
+
+    job = writer.create_job()
+    writer.set_status(job.job_id, "processing", "Анализ структуры…")
+    writer.set_partial(job.job_id, {"summary": ["черновик"]})
+    assert reader.get_job(job.job_id).step == "Анализ структуры…"
+    assert reader.get_job(job.job_id).partial == {"summary": ["черновик"]}
+
+    writer.set_text(job.job_id, "Текст договора")
+    writer.set_report(job.job_id, _report())
+    writer.set_pdf(job.job_id, b"%PDF-1.7")
+
+    seen = reader.get_job(job.job_id)
+    assert seen.status == "done"
+    assert seen.report.cover.overall_status == "Средний уровень внимания"
+    assert reader.get_text(job.job_id) == "Текст договора"
+    assert reader.get_pdf(job.job_id) == b"%PDF-1.7"
+    assert reader.get_job("missing") is None
+
+
+def test_purge_removes_only_finished_jobs_past_ttl(tmp_path: Path) -> None:
+    storage = SqliteStorage(tmp_path / "jobs.sqlite3", ttl_seconds=0, stale_seconds=3600)
+    done = storage.create_job()
+    storage.set_report(done.job_id, _report())
+    running = storage.create_job()
+    storage.set_status(running.job_id, "processing", "Анализ структуры…")
+    time.sleep(0.01)
+
+    assert storage.purge_expired() == 1
+    assert storage.get_job(done.job_id) is None
+    assert storage.get_job(running.job_id).status == "processing"
+
+
+def test_stale_jobs_of_another_process_are_failed(tmp_path: Path) -> None:
+    path = tmp_path / "jobs.sqlite3"
+    crashed = SqliteStorage(path)
+    fresh = crashed.create_job()
+    stale = crashed.create_job()
+    crashed.set_status(stale.job_id, "processing", "Анализ структуры…")
+    finished = crashed.create_job()
+    crashed.set_report(finished.job_id, _report())
+
+    # Новый процесс с порогом 0.05 с: задача, не обновлявшаяся дольше, брошена
+    time.sleep(0.1)
+    crashed.set_status(fresh.job_id, "processing", "Извлечение текста…")
+    restarted = SqliteStorage(path, stale_seconds=0.05)
+    notified: list[str] = []
+    restarted.add_listener(notified.append)
+
+    assert restarted.fail_stale() == 1
+    assert notified == [stale.job_id]
+    failed = crashed.get_job(stale.job_id)
+    assert (failed.status, failed.error) == ("error", STALE_JOB_ERROR)
+    assert failed.finished_at is not None
+    assert crashed.get_job(fresh.job_id).status == "processing"
+    assert crashed.get_job(finished.job_id).status == "done"
+
+
+def test_old_database_is_migrated(tmp_path: Path) -> None:
+    path = tmp_path / "jobs.sqlite3"
+    conn = sqlite3.connect(str(path))
+    with conn:
+        conn.execute(
+            "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, status TEXT NOT NULL, "
+            "step TEXT NOT NULL, created_at REAL NOT NULL, finished_at REAL, error TEXT, "
+            "parse_info TEXT, report BLOB)"
+        )
+        conn.execute(
+            "INSERT INTO jobs (job_id, status, step, created_at) VALUES (?, ?, ?, ?)",
+            ("old", "processing", "Анализ структуры…", time.time() - 3600),
+        )
+    conn.close()
+
+    storage = SqliteStorage(path, stale_seconds=60)
+    assert storage.get_job("old").usage is None
+    # Без updated_at возраст задачи считается от created_at
+    assert storage.fail_stale() == 1
+    storage.set_text("old", "Текст")
+    assert storage.get_text("old") == "Текст"
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+from typing import Iterator
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from backend.app.services.uploads import MULTIPART_OVERHEAD, UploadLimitMiddleware
+
+LIMIT = 1024
+
+
+def _client() -> tuple[TestClient, list[int]]:
+    app = FastAPI()
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload": LIMIT})
+    handled: list[int] = []
+
+    @app.post("/upload")
+    async def upload(request: Request) -> dict:
+        body = await request.body()
+        handled.append(len(body))
+        return {"size": len(body)}
+
+    @app.post("/other")
+    async def other(request: Request) -> dict:
+        return {"size": len(await request.body())}
+
+    return TestClient(app), handled
+
+
+def test_oversized_upload_is_rejected_by_content_length() -> None:
+    client, handled = _client()
+    response = client.post("/upload", content=b"x" * (LIMIT + MULTIPART_OVERHEAD + 1))
+    assert response.status_code == 413
+    assert handled == []
+
+
+def test_oversized_chunked_upload_is_rejected_while_streaming() -> None:
+    client, handled = _client()
+
+    def chunks() -> Iterator[bytes]:
+        for _ in range(100):
+            yield b"x" * 1024
+
+    response = client.post("/upload", content=chunks())
+    assert response.status_code == 413
+    assert handled == []
+
+
+def test_upload_within_limit_and_other_paths_pass() -> None:
+    client, handled = _client()
+    assert client.post("/upload", content=b"x" * LIMIT).json() == {"size": LIMIT}
+    assert handled == [LIMIT]
+    big = b"x" * (LIMIT + MULTIPART_OVERHEAD + 1)
+    assert client.post("/other", content=big).json() == {"size": len(big)}